@@ -0,0 +1,261 @@
+import json
+import os
+import sys
+import time
+import numpy as np
+from helper_dataset import concat_columns, generate_mixed, room_specs, stage1_columns, stage2_columns, targets
+from helper_placement_array import WALLS
+from helper_roomspec import RoomSpecBatch
+
+# -------------------------------
+# Model vs rules audit
+# -------------------------------
+# python audit.py [--samples 2000000] [--model best_model.pth] [--json audit.json] [--baseline base.json]
+#
+# Checks how closely a model export reproduces the rules in helper_placement.py
+# (place_furniture_fixed, place_nightstand_left / _right_of_bed,
+# place_table_near_door, place_dresser_right_of_door, place_desk_near_window).
+# By default it checks every room of the input space: room sizes on a --step
+# grid (the 1 cm the generators round to), x 4 door walls, x Stage 1 / Stage 2
+# with either window blocked. That is 122,412 rooms at 1 cm. --samples instead
+# draws that many random rooms of both stages, as training does.
+#
+# The rule layouts come from helper_dataset (vectorized helper_placement_array),
+# the predictions from one predict_batch call per chunk, and the checks from
+# helper_validate, so a million rooms take seconds. The report has, per stage
+# and piece:
+#   - the distribution of the centre error in metres (mean, p50, p90, p99, max)
+#   - the share of rooms within --tolerance (5 cm by default)
+# and per stage the share of rooms with every piece within tolerance, the
+# share of invalid layouts, and how many of those the rules place validly.
+# It also lists the --worst rooms by largest error. With --baseline (an earlier
+# --json report), a stage / piece whose error or within-tolerance share got
+# worse by more than --threshold is flagged and the exit status is 1, so the
+# audit can run after every export_models.py.
+
+furniture = ['bed', 'dresser', 'nightstand', 'table', 'desk']
+# Stage 1 rooms have no desk; its (0, 0) target is a placeholder and is not audited.
+stage_pieces = {1: ['bed', 'dresser', 'nightstand', 'table'], 2: furniture}
+percentiles = (50, 90, 99)
+
+
+def grid_columns(step=0.01, low=6.0, high=7.0):
+    """
+    Every room of the input space on a step grid, as one dict of helper_dataset column arrays.
+    """
+    sizes = np.round(low + step * np.arange(int(round((high - low) / step)) + 1), 6)
+    room_length, room_width, door_wall = (a.ravel() for a in np.meshgrid(sizes, sizes, np.arange(len(WALLS)),
+                                                                         indexing='ij'))
+    door_wall = door_wall.astype(np.int8)
+    n = len(room_length)
+    return concat_columns([stage1_columns(room_length, room_width, door_wall),
+                           stage2_columns(room_length, room_width, door_wall, np.zeros(n, dtype=bool)),
+                           stage2_columns(room_length, room_width, door_wall, np.ones(n, dtype=bool))])
+
+
+def iter_chunks(samples=None, step=0.01, seed=0, chunk_size=262144):
+    """
+    Yields column dicts of at most chunk_size rooms: the grid, or samples random rooms of both stages.
+    """
+    if samples is None:
+        columns = grid_columns(step)
+        for start in range(0, len(columns['stage']), chunk_size):
+            yield {name: values[start:start + chunk_size] for name, values in columns.items()}
+        return
+    seeds = np.random.SeedSequence(seed).spawn(-(-samples // chunk_size))
+    for chunk, start in enumerate(range(0, samples, chunk_size)):
+        yield generate_mixed(min(chunk_size, samples - start), np.random.default_rng(seeds[chunk]))
+
+
+def _valid(specs, placements, chunk_size=16384):
+    from helper_validate import validate
+
+    valid = np.empty(len(specs), dtype=bool)
+    for start in range(0, len(specs), chunk_size):
+        stop = min(start + chunk_size, len(specs))
+        chunk = RoomSpecBatch(**{name: getattr(specs, name)[start:stop] for name in RoomSpecBatch.fields})
+        valid[start:stop] = validate(chunk, placements[start:stop]).valid
+    return valid
+
+
+def _describe_room(columns, i):
+    stage = int(columns['stage'][i])
+    room = {"stage": stage, "room_length": float(columns['room_length'][i]),
+            "room_width": float(columns['room_width'][i]), "door_wall": WALLS[columns['door_wall'][i]]}
+    if stage == 2:
+        blocked = int(columns['window_wall'][i]) != int(np.argmax([columns[f'window2_wall_{w}'][i] for w in WALLS]))
+        room["blocked_window"] = "Window 2" if blocked else "Window 1"
+    return room
+
+
+def audit(predictor, samples=None, step=0.01, seed=0, tolerance=0.05, worst=10, chunk_size=262144):
+    """
+    Runs the audit (see the module comment) with a helper_predict.Predictor. Returns the report dict.
+    """
+    start = time.perf_counter()
+    errors = {1: [], 2: []}
+    valid = {1: [], 2: []}
+    candidates = []
+    seen = set()
+    seconds = {"rules": 0.0, "predict": 0.0, "validate": 0.0}
+    for columns in iter_chunks(samples, step, seed, chunk_size):
+        t = time.perf_counter()
+        specs, truth = room_specs(columns), targets(columns, dtype=np.float64)
+        seconds["rules"] += time.perf_counter() - t
+        t = time.perf_counter()
+        pred = predictor.predict_batch(specs).astype(np.float64)
+        seconds["predict"] += time.perf_counter() - t
+
+        # (N, 5) distance between predicted and rule centres.
+        diff = (pred - truth).reshape(len(pred), len(furniture), 2)
+        error = np.hypot(diff[..., 0], diff[..., 1])
+        stage = np.asarray(columns['stage'])
+        error[stage == 1, furniture.index('desk')] = 0.0
+
+        t = time.perf_counter()
+        model_valid, rules_valid = _valid(specs, pred), _valid(specs, truth)
+        seconds["validate"] += time.perf_counter() - t
+        for s in (1, 2):
+            rows = stage == s
+            errors[s].append(error[rows].astype(np.float32))
+            valid[s].append(np.stack([model_valid[rows], rules_valid[rows]], axis=1))
+
+        # Random rooms repeat (sizes are on a 1 cm grid), so each room is listed once.
+        room_error = error.max(axis=1)
+        added = 0
+        for i in np.argsort(room_error)[::-1].tolist():
+            if added == worst:
+                break
+            room = _describe_room(columns, i)
+            key = tuple(room.values())
+            if key in seen:
+                continue
+            seen.add(key)
+            added += 1
+            piece = int(np.argmax(error[i]))
+            name = furniture[piece]
+            candidates.append(dict(room, **{
+                "piece": name, "error_m": float(error[i, piece]),
+                "predicted": [round(float(v), 3) for v in pred[i, 2 * piece:2 * piece + 2]],
+                "rules": [float(v) for v in truth[i, 2 * piece:2 * piece + 2]]}))
+
+    stages = {}
+    for s in (1, 2):
+        if not errors[s]:
+            continue
+        error = np.concatenate(errors[s])
+        model_valid, rules_valid = np.concatenate(valid[s]).T
+        pieces = {}
+        for name in stage_pieces[s]:
+            e = error[:, furniture.index(name)]
+            pieces[name] = {"mean_m": float(e.mean()),
+                            **{f"p{q}_m": float(v) for q, v in zip(percentiles, np.percentile(e, percentiles))},
+                            "max_m": float(e.max()), "within": float((e <= tolerance).mean())}
+        room_error = error[:, [furniture.index(name) for name in stage_pieces[s]]].max(axis=1)
+        stages[str(s)] = {"rooms": len(error), "within": float((room_error <= tolerance).mean()),
+                          "invalid": float((~model_valid).mean()), "invalid_rules": float((~rules_valid).mean()),
+                          "broken": int((rules_valid & ~model_valid).sum()), "pieces": pieces}
+
+    candidates.sort(key=lambda room: room["error_m"], reverse=True)
+    rooms = sum(stage["rooms"] for stage in stages.values())
+    seconds["total"] = time.perf_counter() - start
+    return {
+        "meta": {"mode": "grid" if samples is None else "random", "step": step if samples is None else None,
+                 "seed": seed, "rooms": rooms, "tolerance_m": tolerance, "model": predictor.model_path,
+                 "backend": predictor.backend, "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")},
+        "seconds": seconds,
+        "stages": stages,
+        "worst": candidates[:worst]
+    }
+
+
+def compare(report, baseline, threshold=0.1, min_delta=0.005):
+    """
+    Returns {"stage <s> <piece> <metric>": (baseline, now)} for errors that grew by more than threshold
+    (relative) and min_delta metres, and within-tolerance shares that dropped by more than min_delta.
+    """
+    regressions = {}
+    for s, stage in report["stages"].items():
+        base_stage = baseline.get("stages", {}).get(s)
+        if base_stage is None:
+            continue
+        checks = [(f"stage {s} rooms within", base_stage["within"], stage["within"], True),
+                  (f"stage {s} invalid", base_stage["invalid"], stage["invalid"], False)]
+        for name, piece in stage["pieces"].items():
+            base = base_stage["pieces"].get(name)
+            if base is None:
+                continue
+            checks.append((f"stage {s} {name} within", base["within"], piece["within"], True))
+            for metric in ("mean_m", "p99_m", "max_m"):
+                checks.append((f"stage {s} {name} {metric}", base[metric], piece[metric], False))
+        for label, before, now, higher_is_better in checks:
+            if higher_is_better:
+                worse = before - now > min_delta
+            else:
+                worse = now - before > min_delta and now > before * (1 + threshold)
+            if worse:
+                regressions[label] = (before, now)
+    return regressions
+
+
+def print_report(report, file=sys.stdout):
+    meta = report["meta"]
+    print(f"{meta['rooms']:,} rooms ({meta['mode']}), {meta['model']} [{meta['backend']}], "
+          f"{report['seconds']['total']:.2f} s "
+          f"(rules {report['seconds']['rules']:.2f}, predict {report['seconds']['predict']:.2f}, "
+          f"validate {report['seconds']['validate']:.2f})", file=file)
+    for s, stage in report["stages"].items():
+        print(f"\nStage {s}: {stage['rooms']:,} rooms, {stage['within']:.1%} with every piece within "
+              f"{meta['tolerance_m'] * 100:g} cm, {stage['invalid']:.1%} invalid "
+              f"(rules {stage['invalid_rules']:.1%}, {stage['broken']:,} valid under the rules)", file=file)
+        print(f"  {'piece':<11}{'mean':>8}{'p50':>8}{'p90':>8}{'p99':>8}{'max':>8}{'within':>9}", file=file)
+        for name, piece in stage["pieces"].items():
+            print(f"  {name:<11}" + "".join(f"{piece[key]:8.3f}" for key in ("mean_m", "p50_m", "p90_m", "p99_m",
+                                                                              "max_m"))
+                  + f"{piece['within']:9.1%}", file=file)
+    print("\nWorst rooms:", file=file)
+    for room in report["worst"]:
+        where = f"stage {room['stage']}, {room['room_length']:.2f} x {room['room_width']:.2f} m, " \
+                f"door {room['door_wall']}" + (f", {room['blocked_window']} blocked" if room['stage'] == 2 else "")
+        print(f"  {room['error_m']:.3f} m {room['piece']} at {room['predicted']} instead of {room['rules']} "
+              f"({where})", file=file)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Audit the model against the placement rules")
+    parser.add_argument('--samples', type=int, default=None, help="random rooms instead of the full grid")
+    parser.add_argument('--step', type=float, default=0.01, help="grid spacing of the room sizes in metres")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--model', default='best_model.pth')
+    parser.add_argument('--backend', default=None, help="exported variant to audit (see helper_backends.py)")
+    parser.add_argument('--tolerance', type=float, default=0.05, help="metres a centre may be off and count")
+    parser.add_argument('--worst', type=int, default=10, help="how many worst rooms to list")
+    parser.add_argument('--chunk-size', type=int, default=262144)
+    parser.add_argument('--json', default=None, help="also write the report to this file")
+    parser.add_argument('--baseline', default=None, help="earlier --json report to compare against")
+    parser.add_argument('--threshold', type=float, default=0.1, help="allowed relative error growth")
+    parser.add_argument('--min-delta', type=float, default=0.005,
+                        help="smallest change (metres, or share of rooms) worth flagging")
+    args = parser.parse_args()
+
+    from helper_predict import Predictor
+
+    directory = os.path.dirname(args.model)
+    predictor = Predictor(args.model, os.path.join(directory, "scaler_X.joblib"),
+                          os.path.join(directory, "scaler_y.joblib"), backend=args.backend)
+    report = audit(predictor, args.samples, args.step, args.seed, args.tolerance, args.worst, args.chunk_size)
+    print_report(report)
+    status = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.threshold, args.min_delta)
+        report["regressions"] = {label: list(values) for label, values in regressions.items()}
+        for label, (before, now) in regressions.items():
+            print(f"REGRESSION {label}: {before:.4f} -> {now:.4f}", file=sys.stderr)
+        status = 1 if regressions else 0
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    sys.exit(status)
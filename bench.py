@@ -0,0 +1,359 @@
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+# -------------------------------
+# Benchmark suite
+# -------------------------------
+# python bench.py [--filter NAME] [--json out.json] [--baseline base.json --threshold 0.1]
+#
+# Every case reports seconds per operation (min / median / mean over repeats).
+# With --baseline, cases whose median is more than --threshold slower than the
+# baseline are flagged and the exit status is 1. The same cases run under
+# pytest-benchmark with `python -m pytest tests/test_bench.py --benchmark-only`.
+
+cases = {}
+
+
+def case(name, repeat=5, number=1):
+    """
+    Registers a benchmark. The decorated function does any setup and returns the callable to time.
+    """
+    def register(setup):
+        cases[name] = (setup, repeat, number)
+        return setup
+    return register
+
+
+def _example_input():
+    from helper_index import build_training_input
+
+    stage, training_input, walls = build_training_input(6.5, 6.5, 'bottom', '2', 'Window 1')
+    return stage, training_input, walls
+
+
+def _random_inputs(n):
+    from helper_dataset import generate_dataset, room_specs
+
+    return room_specs(generate_dataset(n, stage=2, seed=1)).encode()
+
+
+# --- prediction ---
+cold_predict_script = """
+from helper_index import build_training_input
+from helper_predict import predict_optimal_placements
+
+stage, training_input, walls = build_training_input(6.5, 6.5, 'bottom', '2', 'Window 1')
+predict_optimal_placements(training_input, stage, 'bottom', **walls)
+"""
+
+
+@case("predict_optimal_placements/cold", repeat=3)
+def _predict_cold():
+    import subprocess
+
+    def run():
+        # A fresh interpreter pays for the imports (torch and joblib included), joblib.load, torch.load
+        # and the first forward pass; resetting the Predictor in this process would find them all cached.
+        subprocess.run([sys.executable, "-c", cold_predict_script], capture_output=True, check=True,
+                       cwd=os.path.dirname(os.path.abspath(__file__)))
+    return run
+
+
+@case("predict_optimal_placements/warm", number=200)
+def _predict_warm():
+    from helper_predict import predict_optimal_placements
+
+    stage, training_input, walls = _example_input()
+    predict_optimal_placements(training_input, stage, 'bottom', **walls)
+    return lambda: predict_optimal_placements(training_input, stage, 'bottom', **walls)
+
+
+@case("predict_room/warm", number=200)
+def _predict_room_warm():
+    from helper_predict import predict_room
+    from helper_roomspec import RoomSpec
+
+    spec = RoomSpec.from_ui(6.5, 6.5, 'bottom', '2', 'Window 1')
+    predict_room(spec)
+    return lambda: predict_room(spec)
+
+
+@case("grid_solver/solve", number=50)
+def _grid_solve():
+    from helper_grid_solver import solve_spec
+    from helper_roomspec import RoomSpec
+
+    spec = RoomSpec.from_ui(6.5, 6.5, 'bottom', '2', 'Window 1')
+    return lambda: solve_spec(spec)
+
+
+@case("relayout/toggle_blocked_window", number=1000)
+def _relayout_toggle():
+    from helper_relayout import Relayout
+    from helper_roomspec import RoomSpec
+
+    specs = [RoomSpec.from_ui(6.5, 6.5, 'bottom', '2', choice) for choice in ("Window 1", "Window 2")]
+    layout = Relayout(specs[0])
+    state = {'i': 0}
+
+    def toggle():
+        state['i'] ^= 1
+        layout.update(specs[state['i']])
+    return toggle
+
+
+@case("roomspec/encode_batch_100k", repeat=3)
+def _encode_batch():
+    from helper_dataset import generate_dataset, room_specs
+    import numpy as np
+
+    batch = room_specs(generate_dataset(100000, stage=2, seed=1))
+    out = np.empty((len(batch), 23))
+    return lambda: batch.encode(out)
+
+
+def _forward_case(batch_size):
+    @case(f"mlp_forward/batch_{batch_size}", number=max(1, 4096 // batch_size))
+    def setup():
+        from helper_predict import get_predictor
+
+        predictor = get_predictor()
+        X = _random_inputs(batch_size)
+        return lambda: predictor.predict_batch(X, batch_size=batch_size)
+
+
+for _batch_size in (1, 64, 1024, 16384):
+    _forward_case(_batch_size)
+
+
+# --- placement rules ---
+def _placement_case(name, call):
+    @case(f"placement/{name}", number=10000)
+    def setup():
+        import helper_placement as hp
+
+        return lambda: call(hp)
+
+
+_placement_case("place_furniture_fixed", lambda hp: hp.place_furniture_fixed(6.5, 6.3, 'bed', 'top'))
+_placement_case("place_nightstand_left", lambda hp: hp.place_nightstand_left((3.25, 5.4), 'top'))
+_placement_case("place_nightstand_right_of_bed", lambda hp: hp.place_nightstand_right_of_bed((3.25, 5.4), 'top'))
+_placement_case("place_table_near_door", lambda hp: hp.place_table_near_door(6.5, 6.3, 'bottom'))
+_placement_case("place_dresser_right_of_door", lambda hp: hp.place_dresser_right_of_door(6.5, 6.3, 'bottom', 3.25))
+_placement_case("place_desk_near_window", lambda hp: hp.place_desk_near_window(6.5, 6.3, 'left'))
+_placement_case("place_pillar_at_window", lambda hp: hp.place_pillar_at_window(6.5, 6.3, 'right'))
+
+
+# --- dataset generation ---
+def _dataset_case(n, label):
+    @case(f"dataset/stage2_{label}", repeat=3)
+    def setup():
+        from helper_dataset import generate_dataset
+
+        return lambda: generate_dataset(n, stage=2, seed=0)
+
+
+_dataset_case(1000, "1k")
+_dataset_case(100000, "100k")
+
+
+# --- validation and repair ---
+@case("repair/rules_100k", repeat=3)
+def _repair_rules():
+    from helper_dataset import generate_mixed, room_specs, targets
+    from helper_repair import repair
+    import numpy as np
+
+    columns = generate_mixed(100000, np.random.default_rng(1))
+    specs, placements = room_specs(columns), targets(columns)
+    return lambda: repair(specs, placements, time_budget_ms=1000)
+
+
+@case("repair/sample", number=200)
+def _repair_sample():
+    from helper_repair import repair_sample
+    from helper_roomspec import RoomSpec
+    from helper_predict import predict_room
+
+    sample, _ = predict_room(RoomSpec.from_ui(6.0, 6.0, 'top', '1', None))
+    repair_sample(sample)
+    return lambda: repair_sample(sample)
+
+
+# --- rendering ---
+def _render_samples(stage, n):
+    from helper_dataset import generate_dataset, to_frame
+
+    return to_frame(generate_dataset(n, stage=stage, seed=2)).to_dict('records')
+
+
+@case("render/visualize_layout", repeat=3, number=5)
+def _render_stage1():
+    from helper_visualize import visualize_layout
+
+    samples = iter(_render_samples(1, 100) * 10)
+    out = tempfile.mkdtemp() + os.sep
+    return lambda: visualize_layout(next(samples), name="bench", save_path=out)
+
+
+@case("render/visualize_layout_stage2", repeat=3, number=5)
+def _render_stage2():
+    from helper_visualize import visualize_layout_stage2
+
+    samples = iter(_render_samples(2, 100) * 10)
+    out = tempfile.mkdtemp() + os.sep
+    return lambda: visualize_layout_stage2(next(samples), name="bench", save_path=out)
+
+
+@case("render/layout_renderer_stage2", repeat=3, number=5)
+def _render_reused():
+    from helper_visualize import LayoutRenderer
+
+    renderer = LayoutRenderer()
+    samples = iter(_render_samples(2, 100) * 10)
+    return lambda: renderer.render(next(samples))
+
+
+@case("render/raster_128_stage2", repeat=5, number=500)
+def _render_raster():
+    from helper_raster import render_raster
+
+    samples = iter(_render_samples(2, 1000) * 10)
+    return lambda: render_raster(next(samples), size=(128, 128))
+
+
+# --- startup ---
+# What main.py (and every bulk / serve worker) imports before the first request.
+app_modules = ['helper_predict', 'helper_visualize', 'helper_index', 'helper_validate', 'helper_repair',
+               'helper_relayout', 'helper_roomspec', 'helper_instrument']
+heavy_modules = {'torch', 'matplotlib', 'pandas', 'sklearn', 'joblib', 'tqdm'}
+
+
+def import_time(modules):
+    """
+    Imports modules in a fresh interpreter under `python -X importtime`. Returns (seconds spent importing,
+    the heavy packages that got imported along the way).
+    """
+    import subprocess
+
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import " + ", ".join(modules)],
+                            capture_output=True, text=True, check=True)
+    total_us, loaded = 0, set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Nested imports are indented; the top-level ones add up to the total.
+        if not name[1:].startswith(" "):
+            total_us += int(cumulative)
+        loaded.add(name.strip().split(".")[0])
+    return total_us / 1e6, loaded & heavy_modules
+
+
+@case("startup/app_imports", repeat=5)
+def _app_imports():
+    def run():
+        _, loaded = import_time(app_modules)
+        if loaded:
+            raise RuntimeError(f"importing the app helpers loaded {', '.join(sorted(loaded))}")
+    return run
+
+
+# -------------------------------
+# Runner
+# -------------------------------
+def run_case(name):
+    setup, repeat, number = cases[name]
+    fn = setup()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        timings.append((time.perf_counter() - start) / number)
+    return {
+        "min_s": min(timings),
+        "median_s": statistics.median(timings),
+        "mean_s": statistics.fmean(timings),
+        "repeat": repeat,
+        "number": number
+    }
+
+
+def run(names=None):
+    import numpy as np
+
+    names = names if names is not None else list(cases)
+    results = {}
+    for name in names:
+        results[name] = run_case(name)
+        print(f"{name:45s} {results[name]['median_s'] * 1000:12.4f} ms/op", file=sys.stderr)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")
+        },
+        "results": results
+    }
+
+
+def compare(report, baseline, threshold=0.1):
+    """
+    Returns {name: ratio} for cases whose median got slower than baseline by more than threshold.
+    """
+    regressions = {}
+    for name, result in report["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if base is None or base["median_s"] <= 0:
+            continue
+        ratio = result["median_s"] / base["median_s"]
+        if ratio > 1 + threshold:
+            regressions[name] = ratio
+    return regressions
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Prediction, placement, generation and rendering benchmarks")
+    parser.add_argument('--filter', default=None, help="only run cases whose name contains this")
+    parser.add_argument('--json', default=None, help="write results to this file (default: stdout)")
+    parser.add_argument('--baseline', default=None, help="results file to compare against")
+    parser.add_argument('--threshold', type=float, default=0.1, help="allowed slowdown before flagging, e.g. 0.1 = 10%%")
+    parser.add_argument('--list', action='store_true')
+    args = parser.parse_args(argv)
+
+    names = [n for n in cases if args.filter is None or args.filter in n]
+    if args.list:
+        print("\n".join(names))
+        return 0
+
+    report = run(names)
+    status = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        report["regressions"] = regressions
+        for name, ratio in regressions.items():
+            print(f"REGRESSION {name}: {ratio:.2f}x baseline", file=sys.stderr)
+        status = 1 if regressions else 0
+
+    text = json.dumps(report, indent=2)
+    if args.json:
+        with open(args.json, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
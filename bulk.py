@@ -0,0 +1,326 @@
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+import numpy as np
+from helper_instrument import count, span
+from helper_roomspec import RoomSpec, RoomSpecBatch
+
+# -------------------------------
+# Bulk floorplan mode
+# -------------------------------
+# python bulk.py rooms.jsonl --out results [--engine model|rules|grid] [--workers 4] [--images raster]
+#
+# Lays out every room of a JSONL or CSV file (one training_input-style record
+# per line / row, as main.py builds it and serve.py accepts). Rooms are read
+# lazily, chunk_size at a time, and each chunk is placed by a worker process
+# and written as results/part-NNNNN.jsonl: one sample_full record per room, as
+# predict_optimal_placements returns it, plus any extra input fields (such as
+# a room id). At most two chunks per worker are in flight, so memory does not
+# grow with the input.
+#
+# results/checkpoint.json lists the finished chunks. Parts are written to a
+# temporary name and renamed when complete, so after a crash the same command
+# skips the finished chunks and redoes the rest. A checkpoint written with
+# other settings (engine, chunk size, ...) is refused rather than mixed.
+#
+# Engines: the MLP (helper_predict, any helper_backends backend), the rules
+# of helper_placement.py (helper_relayout.Relayout) or helper_grid_solver.py.
+# --repair passes the placements through helper_repair.py. --images writes
+# results/images/NNNNNNNN.png per room, drawn by helper_raster.py (fast
+# thumbnails) or LayoutRenderer (the app's matplotlib figure).
+#
+# A room the engine cannot lay out (the grid solver finds no free space for a
+# piece) is written with null coordinates and an "error" field, is neither
+# repaired nor rendered, and is counted as failed in the summary.
+
+engines = ('model', 'rules', 'grid')
+image_modes = ('raster', 'matplotlib')
+checkpoint_name = "checkpoint.json"
+
+
+def _coerce(value):
+    # CSV cells arrive as strings; empty cells are 0, as in the notebook's fillna(0).
+    if value is None or value == "":
+        return 0.0
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def read_records(path):
+    """
+    Yields one dict per room from a .jsonl or .csv file. CSV cells of the training_input fields are
+    converted to numbers; other columns (room ids and the like) are passed through as strings.
+    """
+    from helper_predict import input_features
+
+    numeric = set(input_features) | {"stage", "door_exist", "window_exist"}
+    with open(path, newline="") as f:
+        if path.endswith(".csv"):
+            for row in csv.DictReader(f):
+                yield {key: _coerce(value) if key in numeric else value for key, value in row.items()}
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def iter_chunks(records, chunk_size):
+    """
+    Yields (chunk index, first row number, list of records).
+    """
+    records = iter(records)
+    for index in itertools.count():
+        chunk = list(itertools.islice(records, chunk_size))
+        if not chunk:
+            return
+        yield index, index * chunk_size, chunk
+
+
+def parse_specs(records, first_row=0):
+    """
+    RoomSpecs for training_input-style records. Raises ValueError naming the row of a bad record.
+    """
+    specs = []
+    for i, record in enumerate(records):
+        try:
+            specs.append(RoomSpec.from_training_input(record))
+        except (KeyError, TypeError, ValueError) as exc:
+            raise ValueError(f"row {first_row + i}: missing or invalid field {exc}") from None
+    return specs
+
+
+_predictor = None
+
+
+def _get_predictor(backend):
+    # One Predictor per process: the shared default one, or one for the requested backend.
+    global _predictor
+    if _predictor is None:
+        from helper_predict import Predictor, get_predictor
+
+        _predictor = get_predictor() if backend is None else Predictor(backend=backend)
+    return _predictor
+
+
+def place(specs, engine='model', backend=None):
+    """
+    (N, 10) placements in output_features order for a list of RoomSpecs.
+    """
+    if engine == 'model':
+        return _get_predictor(backend).predict_batch(RoomSpecBatch.from_specs(specs)).astype(np.float64)
+    if engine == 'rules':
+        from helper_relayout import Relayout
+
+        return np.array([Relayout(spec).placements() for spec in specs])
+    if engine == 'grid':
+        from helper_grid_solver import solve_batch
+
+        return solve_batch(RoomSpecBatch.from_specs(specs))
+    raise ValueError(f"unknown engine {engine!r}, expected one of {', '.join(engines)}")
+
+
+_renderer = None
+
+
+def _render(sample, stage, mode):
+    global _renderer
+    if mode == 'raster':
+        from helper_raster import encode_png, render_raster
+
+        return encode_png(render_raster(sample, stage))
+    if _renderer is None:
+        from helper_visualize import LayoutRenderer
+
+        _renderer = LayoutRenderer()
+    return _renderer.render(sample, stage)
+
+
+def _part_path(out_dir, index):
+    return os.path.join(out_dir, f"part-{index:05d}.jsonl")
+
+
+def process_chunk(task):
+    """
+    Places, optionally repairs and renders one chunk, and writes its part file. Returns per-chunk stats.
+    """
+    index, first_row, records, options = task
+    start = time.perf_counter()
+    from helper_predict import output_features
+
+    specs = parse_specs(records, first_row)
+    with span("bulk.place"):
+        placements = place(specs, options['engine'], options['backend'])
+    failed = ~np.isfinite(placements).all(axis=1)
+    stats = {"chunk": index, "rows": len(specs), "failed": int(failed.sum())}
+    if options['repair']:
+        from helper_repair import repair
+
+        placed = np.flatnonzero(~failed)
+        repaired, report = repair(RoomSpecBatch.from_specs([specs[i] for i in placed]), placements[placed])
+        placements[placed] = repaired
+        stats["repaired"] = int(report.repaired.sum())
+        stats["unresolved"] = int(report.unresolved.sum())
+
+    out_dir = options['out_dir']
+    image_dir = os.path.join(out_dir, "images")
+    tmp_path = _part_path(out_dir, index) + ".tmp"
+    with open(tmp_path, "w") as f:
+        for i, (record, spec, row) in enumerate(zip(records, specs, placements)):
+            if failed[i]:
+                sample_full = spec.sample_full(dict.fromkeys(output_features))
+                sample_full["error"] = f"the {options['engine']} engine found no layout for this room"
+            else:
+                sample_full = spec.sample_full(dict(zip(output_features, row.tolist())))
+            # Fields that are not part of the layout (room ids and the like) are passed through.
+            extra = {key: value for key, value in record.items() if key not in sample_full}
+            f.write(json.dumps(dict(extra, **sample_full)) + "\n")
+            if options['images'] and not failed[i]:
+                with span("bulk.render"):
+                    png = _render(sample_full, spec.stage, options['images'])
+                with open(os.path.join(image_dir, f"{first_row + i:08d}.png"), "wb") as image:
+                    image.write(png)
+    os.replace(tmp_path, _part_path(out_dir, index))
+    count("bulk.rows", len(specs))
+    stats["seconds"] = time.perf_counter() - start
+    return stats
+
+
+def _init_worker(engine, backend):
+    # Pool workers load the model up front and use one thread each: the pool provides the parallelism.
+    if engine == 'model':
+        _get_predictor(backend)
+        if 'torch' in sys.modules:
+            sys.modules['torch'].set_num_threads(1)
+
+
+def _load_checkpoint(out_dir, settings):
+    path = os.path.join(out_dir, checkpoint_name)
+    if not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        checkpoint = json.load(f)
+    if checkpoint["settings"] != settings:
+        raise ValueError(f"{path} was written with other settings ({checkpoint['settings']}); "
+                         f"use another --out directory")
+    return {index for index in checkpoint["completed"] if os.path.exists(_part_path(out_dir, index))}
+
+
+def _save_checkpoint(out_dir, settings, completed):
+    path = os.path.join(out_dir, checkpoint_name)
+    with open(path + ".tmp", "w") as f:
+        json.dump({"settings": settings, "completed": sorted(completed)}, f)
+    os.replace(path + ".tmp", path)
+
+
+def run(input_path, out_dir, engine='model', backend=None, chunk_size=4096, n_workers=1, images=None, repair=False,
+        log=sys.stderr):
+    """
+    Lays out every room of input_path into out_dir (see the module comment). Returns a summary dict.
+    """
+    if engine not in engines:
+        raise ValueError(f"unknown engine {engine!r}, expected one of {', '.join(engines)}")
+    if images is not None and images not in image_modes:
+        raise ValueError(f"unknown image mode {images!r}, expected one of {', '.join(image_modes)}")
+    os.makedirs(out_dir, exist_ok=True)
+    if images:
+        os.makedirs(os.path.join(out_dir, "images"), exist_ok=True)
+
+    settings = {"input": os.path.abspath(input_path), "engine": engine, "backend": backend,
+                "chunk_size": chunk_size, "images": images, "repair": repair}
+    completed = _load_checkpoint(out_dir, settings)
+    options = {"engine": engine, "backend": backend, "repair": repair, "images": images, "out_dir": out_dir}
+    summary = {"rows": 0, "failed": 0, "chunks": 0, "skipped_chunks": 0, "seconds": 0.0}
+    if engine == 'model' and n_workers <= 1:
+        # Load the model before the clock starts, like the pool initializer does.
+        _get_predictor(backend)
+    start = time.perf_counter()
+
+    def finished(stats):
+        completed.add(stats["chunk"])
+        _save_checkpoint(out_dir, settings, completed)
+        summary["rows"] += stats["rows"]
+        summary["failed"] += stats["failed"]
+        summary["chunks"] += 1
+        rate = stats["rows"] / stats["seconds"] if stats["seconds"] else float("inf")
+        extra = f", {stats['repaired']} repaired, {stats['unresolved']} unresolved" if repair else ""
+        extra += f", {stats['failed']} without a layout" if stats["failed"] else ""
+        print(f"chunk {stats['chunk']}: {stats['rows']} rooms in {stats['seconds']:.2f} s "
+              f"({rate:,.0f} rooms/s){extra}", file=log)
+
+    tasks = ((index, first_row, records, options)
+             for index, first_row, records in iter_chunks(read_records(input_path), chunk_size))
+
+    def pending(task):
+        if task[0] in completed:
+            summary["skipped_chunks"] += 1
+            return False
+        return True
+
+    tasks = filter(pending, tasks)
+    if n_workers <= 1:
+        for task in tasks:
+            finished(process_chunk(task))
+    else:
+        from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                                 initargs=(engine, backend)) as pool:
+            in_flight = set()
+            for task in tasks:
+                in_flight.add(pool.submit(process_chunk, task))
+                if len(in_flight) >= 2 * n_workers:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        finished(future.result())
+            for future in in_flight:
+                finished(future.result())
+
+    summary["seconds"] = time.perf_counter() - start
+    summary["rooms_per_s"] = summary["rows"] / summary["seconds"] if summary["seconds"] else 0.0
+    return summary
+
+
+def iter_results(out_dir):
+    """
+    Yields the sample_full records of a finished run in input order.
+    """
+    with open(os.path.join(out_dir, checkpoint_name)) as f:
+        completed = json.load(f)["completed"]
+    for index in completed:
+        with open(_part_path(out_dir, index)) as part:
+            for line in part:
+                yield json.loads(line)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Lay out every room of a JSONL / CSV file")
+    parser.add_argument('input', help="rooms as .jsonl or .csv with the training_input fields")
+    parser.add_argument('--out', default='bulk_results', help="directory for the part files and the checkpoint")
+    parser.add_argument('--engine', default='model', choices=engines)
+    parser.add_argument('--backend', default=None, help="model backend (see helper_backends.py)")
+    parser.add_argument('--chunk-size', type=int, default=4096)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--images', default=None, choices=image_modes, help="also render a PNG per room")
+    parser.add_argument('--repair', action='store_true', help="repair invalid layouts (helper_repair.py)")
+    parser.add_argument('--merge', default=None, help="afterwards, concatenate the parts into this JSONL file")
+    args = parser.parse_args()
+
+    try:
+        summary = run(args.input, args.out, args.engine, args.backend, args.chunk_size, args.workers, args.images,
+                      args.repair)
+    except ValueError as exc:
+        sys.exit(f"error: {exc}")
+    print(f"{summary['rows']} rooms in {summary['chunks']} chunks ({summary['skipped_chunks']} already done) "
+          f"in {summary['seconds']:.2f} s, {summary['rooms_per_s']:,.0f} rooms/s, "
+          f"{summary['failed']} without a layout", file=sys.stderr)
+    if args.merge:
+        with open(args.merge, "w") as f:
+            for record in iter_results(args.out):
+                f.write(json.dumps(record) + "\n")
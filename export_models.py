@@ -0,0 +1,185 @@
+import json
+import sys
+import time
+import numpy as np
+import torch
+from helper_backends import artifact_path, backends
+from helper_predict import Predictor, input_features
+from helper_roomspec import RoomSpec, RoomSpecBatch
+from model import load_mlp
+
+# -------------------------------
+# Model export and comparison
+# -------------------------------
+# python export_models.py [--model best_model.pth] [--json report.json]
+#
+# Writes the serving variants of best_model.pth next to it (see helper_backends.py):
+#   best_model.torchscript.pt   traced and frozen TorchScript
+#   best_model.int8.pt          dynamic int8 quantization of the Linear layers (TorchScript)
+#   best_model.onnx             ONNX graph (needs the onnx package; onnxruntime to run it)
+#   best_model.npz              NumPy weights with the scalers folded in (helper_numpy.py)
+# then reports, per backend, the placement error in metres against the eager
+# float32 model and the latency / throughput at batch sizes 1, 64 and 4096.
+
+batch_sizes = (1, 64, 4096)
+furniture = ['bed', 'dresser', 'nightstand', 'table', 'desk']
+
+
+def load_eager(model_path):
+    model = load_mlp(torch.load(model_path, map_location=torch.device('cpu')))
+    return model.eval()
+
+
+def export_torchscript(model, path):
+    example = torch.zeros(1, len(input_features))
+    with torch.no_grad():
+        frozen = torch.jit.freeze(torch.jit.trace(model, example))
+    frozen.save(path)
+    return path
+
+
+def export_int8(model, path):
+    quantized = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    with torch.no_grad():
+        traced = torch.jit.trace(quantized, torch.zeros(1, len(input_features)))
+    traced.save(path)
+    return path
+
+
+def export_onnx(model, path):
+    try:
+        import onnx  # noqa: F401 (the exporter needs it)
+    except ImportError:
+        raise ImportError("ONNX export requires `pip install onnx`") from None
+    torch.onnx.export(model, torch.zeros(1, len(input_features)), path, input_names=['x'], output_names=['y'],
+                      dynamic_axes={'x': {0: 'batch'}, 'y': {0: 'batch'}}, dynamo=False)
+    return path
+
+
+def export_all(model_path="best_model.pth", scaler_X_path="scaler_X.joblib", scaler_y_path="scaler_y.joblib"):
+    """
+    Writes every exported variant. Returns {backend: path or the error message if it could not be exported}.
+    """
+    from helper_numpy import export_npz
+
+    model = load_eager(model_path)
+    exporters = {
+        'torchscript': lambda path: export_torchscript(model, path),
+        'int8': lambda path: export_int8(model, path),
+        'onnx': lambda path: export_onnx(model, path),
+        'numpy': lambda path: export_npz(model_path, scaler_X_path, scaler_y_path, path)
+    }
+    written = {}
+    for backend, export in exporters.items():
+        try:
+            written[backend] = export(artifact_path(model_path, backend))
+        except ImportError as exc:
+            written[backend] = f"skipped: {exc}"
+    return written
+
+
+def held_out_grid():
+    """
+    Sidebar-style rooms with lengths / widths halfway between the 0.1 m sidebar steps
+    (6.05 .. 6.95), so none of them is in the layout index or the UI grid.
+    """
+    from helper_index import door_walls, window_options
+
+    sizes = [round(6.05 + i / 10, 2) for i in range(10)]
+    return RoomSpecBatch.from_specs(RoomSpec.from_ui(length, width, door_wall, num_windows, blocked)
+                                    for length in sizes for width in sizes for door_wall in door_walls
+                                    for num_windows, blocked in window_options)
+
+
+def accuracy(pred, reference):
+    """
+    Placement error in metres: per-furniture centre distance and per-coordinate statistics.
+    """
+    diff = pred.astype(np.float64) - reference.astype(np.float64)
+    report = {
+        "max_abs_m": float(np.abs(diff).max()),
+        "mean_abs_m": float(np.abs(diff).mean()),
+        "p99_abs_m": float(np.percentile(np.abs(diff), 99))
+    }
+    for i, name in enumerate(furniture):
+        distance = np.hypot(diff[:, 2 * i], diff[:, 2 * i + 1])
+        report[f"{name}_max_m"] = float(distance.max())
+    return report
+
+
+def latency(predictor, X, batch_size, min_seconds=0.3):
+    """
+    Times predict_batch on batch_size rows. Returns ms per batch and rows per second.
+    """
+    batch = X[:batch_size]
+    predictor.predict_batch(batch, batch_size=batch_size)
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        predictor.predict_batch(batch, batch_size=batch_size)
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            break
+    return {"ms_per_batch": elapsed / calls * 1000, "rows_per_s": calls * len(batch) / elapsed}
+
+
+def compare(model_path="best_model.pth", scaler_X_path="scaler_X.joblib", scaler_y_path="scaler_y.joblib"):
+    """
+    Accuracy against the eager model on held_out_grid() and latency per batch size, for every loadable backend.
+    """
+    grid = held_out_grid().encode()
+    rng = np.random.default_rng(0)
+    timing_rows = grid[rng.integers(0, len(grid), max(batch_sizes))]
+
+    reference = Predictor(model_path, scaler_X_path, scaler_y_path, backend='eager').predict_batch(grid)
+    report = {"rooms": len(grid), "backends": {}}
+    for backend in backends:
+        try:
+            predictor = Predictor(model_path, scaler_X_path, scaler_y_path, backend=backend)
+        except (ImportError, OSError, RuntimeError) as exc:
+            report["backends"][backend] = {"error": str(exc)}
+            continue
+        report["backends"][backend] = {
+            "load_ms": predictor.load_seconds * 1000,
+            "accuracy": accuracy(predictor.predict_batch(grid), reference),
+            "latency": {str(bs): latency(predictor, timing_rows, bs) for bs in batch_sizes}
+        }
+    return report
+
+
+def print_report(report):
+    print(f"Accuracy vs eager float32 over {report['rooms']} held-out rooms, latency via Predictor.predict_batch")
+    header = f"{'backend':12s} {'max err m':>10s} {'mean err m':>11s}"
+    header += "".join(f" {'bs=' + str(bs) + ' ms':>12s} {'rows/s':>11s}" for bs in batch_sizes)
+    print(header)
+    for backend, result in report["backends"].items():
+        if "error" in result:
+            print(f"{backend:12s} unavailable: {result['error']}")
+            continue
+        line = f"{backend:12s} {result['accuracy']['max_abs_m']:10.2e} {result['accuracy']['mean_abs_m']:11.2e}"
+        for bs in batch_sizes:
+            timing = result["latency"][str(bs)]
+            line += f" {timing['ms_per_batch']:12.4f} {timing['rows_per_s']:11,.0f}"
+        print(line)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export TorchScript / int8 / ONNX / NumPy variants and compare them")
+    parser.add_argument('--model', default='best_model.pth')
+    parser.add_argument('--scaler-x', default='scaler_X.joblib')
+    parser.add_argument('--scaler-y', default='scaler_y.joblib')
+    parser.add_argument('--no-export', action='store_true', help="only compare already exported files")
+    parser.add_argument('--json', default=None, help="also write the report to this file")
+    args = parser.parse_args()
+
+    if not args.no_export:
+        for backend, result in export_all(args.model, args.scaler_x, args.scaler_y).items():
+            print(f"{backend:12s} {result}", file=sys.stderr)
+    report = compare(args.model, args.scaler_x, args.scaler_y)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
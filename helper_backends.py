@@ -0,0 +1,106 @@
+import os
+
+# -------------------------------
+# Inference backends
+# -------------------------------
+# Every backend runs the MLP forward pass over an (N, 23) float32 array:
+#   eager        model.MLP loaded from best_model.pth (float32 PyTorch)
+#   torchscript  best_model.torchscript.pt, traced and frozen
+#   int8         best_model.int8.pt, Linear layers dynamically quantized to int8 (TorchScript)
+#   onnx         best_model.onnx, run with onnxruntime (optional dependency)
+#   numpy        best_model.npz from helper_numpy.py, scalers folded into the weights
+#
+# The artifacts are written by export_models.py next to the checkpoint.
+# Backends with includes_scalers = True take raw inputs and return metres;
+# the others map scaled inputs to scaled outputs like the eager model.
+
+backends = ('eager', 'torchscript', 'int8', 'onnx', 'numpy')
+default_backend = 'eager'
+artifact_suffixes = {
+    'eager': '.pth',
+    'torchscript': '.torchscript.pt',
+    'int8': '.int8.pt',
+    'onnx': '.onnx',
+    'numpy': '.npz'
+}
+
+
+def resolve_backend(backend=None):
+    """
+    Returns backend, else $FURNITURE_BACKEND, else 'eager'. Raises ValueError for unknown names.
+    """
+    backend = backend or os.environ.get("FURNITURE_BACKEND") or default_backend
+    if backend not in backends:
+        raise ValueError(f"unknown backend {backend!r}, expected one of {', '.join(backends)}")
+    return backend
+
+
+def artifact_path(model_path, backend):
+    """
+    Where the exported file for backend lives, e.g. best_model.pth -> best_model.int8.pt.
+    """
+    return os.path.splitext(model_path)[0] + artifact_suffixes[backend]
+
+
+class TorchBackend:
+    includes_scalers = False
+
+    def __init__(self, module):
+        import torch
+
+        self._torch = torch
+        self.module = module
+
+    def run(self, X):
+        with self._torch.no_grad():
+            return self.module(self._torch.from_numpy(X)).numpy()
+
+
+class OnnxBackend:
+    includes_scalers = False
+
+    def __init__(self, path):
+        try:
+            import onnxruntime
+        except ImportError:
+            raise ImportError("backend 'onnx' requires `pip install onnxruntime`") from None
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def run(self, X):
+        return self.session.run(None, {self.input_name: X})[0]
+
+
+class NumpyBackend:
+    includes_scalers = True
+
+    def __init__(self, path):
+        from helper_numpy import NumpyMLP
+
+        self.model = NumpyMLP(path)
+
+    def run(self, X):
+        return self.model.predict(X)
+
+
+def load_backend(backend, model_path="best_model.pth", input_dim=23, output_dim=10):
+    """
+    Loads the artifact of backend that belongs to model_path.
+    """
+    path = artifact_path(model_path, backend)
+    if backend == 'onnx':
+        return OnnxBackend(path)
+    if backend == 'numpy':
+        return NumpyBackend(path)
+
+    import torch
+
+    if backend == 'eager':
+        from model import load_mlp
+
+        # The hidden widths come from the checkpoint, so any sweep.py architecture loads.
+        model = load_mlp(torch.load(path, map_location=torch.device('cpu')))
+        return TorchBackend(model.eval())
+    return TorchBackend(torch.jit.load(path, map_location=torch.device('cpu')).eval())
@@ -0,0 +1,316 @@
+import numpy as np
+from helper_placement_array import (
+    WALLS, LEFT, RIGHT, TOP, BOTTOM, margin, table_offset, desk_offset, opposite_wall, round2,
+    place_furniture_fixed_array, place_nightstand_left_array, place_nightstand_right_of_bed_array,
+    place_table_near_door_array, place_dresser_right_of_door_array, place_desk_near_window_array,
+    place_pillar_at_window_array
+)
+
+# -------------------------------
+# Vectorized synthetic dataset generation
+# -------------------------------
+# Column-array counterpart of generate_layout_sample_stage1 / _stage2 from
+# train.ipynb. The rules are evaluated over whole arrays by
+# helper_placement_array, so each row equals what the scalar rules in
+# helper_placement.py give for that room.
+#
+# Walls are integer-coded in the order the one-hot features use.
+
+# Column order of the dicts built in train.ipynb.
+feature_columns = [
+    'stage', 'room_length', 'room_width', 'door_exist',
+    'door_wall_left', 'door_wall_right', 'door_wall_top', 'door_wall_bottom', 'door_pos',
+    'window_exist',
+    'window1_wall_left', 'window1_wall_right', 'window1_wall_top', 'window1_wall_bottom',
+    'window2_wall_left', 'window2_wall_right', 'window2_wall_top', 'window2_wall_bottom',
+    'window1_pos', 'window2_pos', 'pillar_x', 'pillar_y',
+    'blocked_window_left', 'blocked_window_right', 'blocked_window_top', 'blocked_window_bottom',
+    'bed_wall', 'dresser_wall', 'door_wall', 'window_wall', 'chosen_window_for_desk'
+]
+output_columns = [
+    'bed_x', 'bed_y', 'dresser_x', 'dresser_y', 'nightstand_x', 'nightstand_y',
+    'table_x', 'table_y', 'desk_x', 'desk_y'
+]
+wall_columns = ['bed_wall', 'dresser_wall', 'door_wall', 'window_wall', 'chosen_window_for_desk']
+
+
+def _one_hot(codes, prefix, columns, valid=None):
+    for i, wall in enumerate(WALLS):
+        flag = codes == i
+        if valid is not None:
+            flag &= valid
+        columns[f'{prefix}_{wall}'] = flag.astype(np.int8)
+
+
+# -------------------------------
+# Stage generators
+# -------------------------------
+def _draw_room(n, rng):
+    room_length = round2(rng.uniform(6.0, 7.0, n))
+    room_width = round2(rng.uniform(6.0, 7.0, n))
+    door_wall = rng.integers(0, 4, n).astype(np.int8)
+    return room_length, room_width, door_wall
+
+
+def _room_and_door(room_length, room_width, door_wall, columns):
+    n = len(room_length)
+    side_door = (door_wall == LEFT) | (door_wall == RIGHT)
+    door_pos = np.where(side_door, round2(room_width / 2), round2(room_length / 2))
+
+    columns['room_length'] = room_length
+    columns['room_width'] = room_width
+    columns['door_exist'] = np.ones(n, dtype=np.int8)
+    _one_hot(door_wall, 'door_wall', columns)
+    columns['door_pos'] = door_pos
+    columns['window_exist'] = np.ones(n, dtype=np.int8)
+    return side_door, door_pos
+
+
+def stage1_columns(room_length, room_width, door_wall):
+    """
+    Stage 1 samples (single window) for the given rooms and door walls (codes), as a dict of column arrays.
+    """
+    n = len(room_length)
+    columns = {'stage': np.full(n, 1, dtype=np.int8)}
+    side_door, door_pos = _room_and_door(room_length, room_width, door_wall, columns)
+
+    window_wall = np.where(side_door, BOTTOM, RIGHT).astype(np.int8)
+    window_pos = np.where(side_door, round2(room_length / 2), round2(room_width / 2))
+    _one_hot(window_wall, 'window1_wall', columns)
+    _one_hot(window_wall, 'window2_wall', columns, valid=np.zeros(n, dtype=bool))
+    columns['window1_pos'] = window_pos
+    columns['window2_pos'] = np.zeros(n)
+    columns['pillar_x'] = np.zeros(n)
+    columns['pillar_y'] = np.zeros(n)
+    _one_hot(window_wall, 'blocked_window', columns, valid=np.zeros(n, dtype=bool))
+
+    # Bed opposite the door.
+    bed_wall = opposite_wall(door_wall)
+    dresser_wall = np.where(side_door, TOP, LEFT).astype(np.int8)
+    columns['bed_wall'] = bed_wall
+    columns['dresser_wall'] = dresser_wall
+    columns['door_wall'] = door_wall
+    columns['window_wall'] = window_wall
+    columns['chosen_window_for_desk'] = window_wall
+
+    bed_x, bed_y = place_furniture_fixed_array(room_length, room_width, 'bed', bed_wall)
+    columns['bed_x'], columns['bed_y'] = bed_x, bed_y
+    columns['dresser_x'], columns['dresser_y'] = place_furniture_fixed_array(room_length, room_width, 'dresser', dresser_wall)
+    columns['nightstand_x'], columns['nightstand_y'] = place_nightstand_right_of_bed_array(bed_x, bed_y, bed_wall)
+    columns['table_x'], columns['table_y'] = place_table_near_door_array(room_length, room_width, door_wall)
+    columns['desk_x'] = np.zeros(n)
+    columns['desk_y'] = np.zeros(n)
+    return columns
+
+
+def generate_stage1(n, rng):
+    """
+    Generates n Stage 1 samples (single window) as a dict of column arrays.
+    """
+    return stage1_columns(*_draw_room(n, rng))
+
+
+def stage2_columns(room_length, room_width, door_wall, blocks_second):
+    """
+    Stage 2 samples (two windows, one blocked by a pillar) for the given rooms, door walls (codes) and
+    whether the pillar blocks window 2, as a dict of column arrays.
+    """
+    n = len(room_length)
+    columns = {'stage': np.full(n, 2, dtype=np.int8)}
+    side_door, door_pos = _room_and_door(room_length, room_width, door_wall, columns)
+
+    window1_wall = np.where(side_door, TOP, LEFT).astype(np.int8)
+    window2_wall = np.where(side_door, BOTTOM, RIGHT).astype(np.int8)
+    blocks_second = np.asarray(blocks_second, dtype=bool)
+    blocked_window = np.where(blocks_second, window2_wall, window1_wall).astype(np.int8)
+    chosen_window = np.where(blocks_second, window1_wall, window2_wall).astype(np.int8)
+
+    _one_hot(window1_wall, 'window1_wall', columns)
+    _one_hot(window2_wall, 'window2_wall', columns)
+    # Stage 2 window positions are not rounded in the notebook.
+    columns['window1_pos'] = np.where(side_door, room_length/2, room_width/2)
+    columns['window2_pos'] = np.where(side_door, room_length/2, room_width/2)
+    columns['pillar_x'], columns['pillar_y'] = place_pillar_at_window_array(room_length, room_width, blocked_window)
+    _one_hot(blocked_window, 'blocked_window', columns)
+
+    bed_wall = opposite_wall(door_wall)
+    columns['bed_wall'] = bed_wall
+    columns['dresser_wall'] = bed_wall
+    columns['door_wall'] = door_wall
+    columns['window_wall'] = chosen_window
+    columns['chosen_window_for_desk'] = chosen_window
+
+    bed_x, bed_y = place_furniture_fixed_array(room_length, room_width, 'bed', bed_wall)
+    columns['bed_x'], columns['bed_y'] = bed_x, bed_y
+    columns['dresser_x'], columns['dresser_y'] = place_dresser_right_of_door_array(room_length, room_width, door_wall, door_pos)
+    columns['nightstand_x'], columns['nightstand_y'] = place_nightstand_left_array(bed_x, bed_y, bed_wall)
+    columns['table_x'], columns['table_y'] = place_table_near_door_array(room_length, room_width, door_wall)
+    columns['desk_x'], columns['desk_y'] = place_desk_near_window_array(room_length, room_width, chosen_window)
+    return columns
+
+
+def generate_stage2(n, rng):
+    """
+    Generates n Stage 2 samples (two windows, one blocked by a pillar) as a dict of column arrays.
+    """
+    room_length, room_width, door_wall = _draw_room(n, rng)
+    return stage2_columns(room_length, room_width, door_wall, rng.integers(0, 2, n).astype(bool))
+
+
+generators = {1: generate_stage1, 2: generate_stage2}
+
+
+# -------------------------------
+# Chunked and parallel generation
+# -------------------------------
+def _chunk_sizes(n_samples, chunk_size):
+    return [min(chunk_size, n_samples - start) for start in range(0, n_samples, chunk_size)]
+
+
+def _generate_chunk(args):
+    stage, n, seed_seq = args
+    return generators[stage](n, np.random.default_rng(seed_seq))
+
+
+def iter_dataset(n_samples, stage=2, seed=0, chunk_size=1_000_000, n_workers=1):
+    """
+    Yields the dataset as successive dicts of column arrays.
+    Chunk i is generated from SeedSequence(seed).spawn(...)[i], so the output only
+    depends on seed and chunk_size, not on how many worker processes are used.
+    """
+    sizes = _chunk_sizes(n_samples, chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(stage, n, s) for n, s in zip(sizes, seeds)]
+    if n_workers <= 1:
+        for task in tasks:
+            yield _generate_chunk(task)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        # map() keeps chunk order.
+        yield from pool.map(_generate_chunk, tasks)
+
+
+def concat_columns(chunks):
+    """
+    Concatenates a sequence of column dicts into one.
+    """
+    chunks = list(chunks)
+    if not chunks:
+        return {}
+    return {name: np.concatenate([c[name] for c in chunks]) for name in chunks[0]}
+
+
+def generate_dataset(n_samples, stage=2, seed=0, chunk_size=1_000_000, n_workers=1):
+    """
+    Generates n_samples rows for one stage as a single dict of column arrays.
+    """
+    return concat_columns(iter_dataset(n_samples, stage, seed, chunk_size, n_workers))
+
+
+def generate_mixed(n, rng, stage1_fraction=0.5):
+    """
+    Generates n rooms of both stages (a binomial share of Stage 1) in shuffled order as one dict of column arrays.
+    """
+    n1 = rng.binomial(n, stage1_fraction)
+    columns = concat_columns([generators[1](n1, rng), generators[2](n - n1, rng)])
+    order = rng.permutation(n)
+    return {name: values[order] for name, values in columns.items()}
+
+
+def to_frame(columns):
+    """
+    Converts column arrays to the DataFrame layout the notebook produces (wall columns as strings).
+    """
+    import pandas as pd
+
+    names = np.array(WALLS)
+    data = {name: (names[columns[name]] if name in wall_columns else columns[name])
+            for name in feature_columns + output_columns}
+    return pd.DataFrame(data)
+
+
+def room_specs(columns):
+    """
+    The rooms of generated columns as a RoomSpecBatch; .encode() gives the (N, 23) model inputs.
+    """
+    from helper_roomspec import RoomSpecBatch
+
+    return RoomSpecBatch.from_columns(columns)
+
+
+def targets(columns, dtype=np.float32):
+    """
+    The (N, 10) placement targets in output_columns order.
+    """
+    out = np.empty((len(columns['room_length']), len(output_columns)), dtype=dtype)
+    for i, name in enumerate(output_columns):
+        out[:, i] = columns[name]
+    return out
+
+
+def check_against_rules(columns, n_rows=10000):
+    """
+    Recomputes the first n_rows with the scalar rules in helper_placement.py and
+    returns the number of rows that differ (0 means an exact match).
+    """
+    import helper_placement as hp
+
+    mismatches = 0
+    for i in range(min(n_rows, len(columns['stage']))):
+        L = float(columns['room_length'][i])
+        W = float(columns['room_width'][i])
+        door_wall = WALLS[columns['door_wall'][i]]
+        bed_wall = WALLS[columns['bed_wall'][i]]
+        door_pos = round(W / 2, 2) if door_wall in ['left', 'right'] else round(L / 2, 2)
+        bed = hp.place_furniture_fixed(L, W, 'bed', bed_wall, margin)
+        expected = {'bed': bed, 'table': hp.place_table_near_door(L, W, door_wall, margin, table_offset)}
+        if columns['stage'][i] == 1:
+            dresser_wall = WALLS[columns['dresser_wall'][i]]
+            expected['dresser'] = hp.place_furniture_fixed(L, W, 'dresser', dresser_wall, margin)
+            expected['nightstand'] = hp.place_nightstand_right_of_bed(bed, bed_wall, margin)
+            expected['desk'] = (0, 0)
+        else:
+            chosen = WALLS[columns['chosen_window_for_desk'][i]]
+            blocked = [w for w in WALLS if columns[f'blocked_window_{w}'][i]][0]
+            expected['dresser'] = hp.place_dresser_right_of_door(L, W, door_wall, door_pos)
+            expected['nightstand'] = hp.place_nightstand_left(bed, bed_wall, margin)
+            expected['desk'] = hp.place_desk_near_window(L, W, chosen, margin, offset=desk_offset)
+            if (columns['pillar_x'][i], columns['pillar_y'][i]) != hp.place_pillar_at_window(L, W, blocked, margin):
+                mismatches += 1
+                continue
+        if door_pos != columns['door_pos'][i] or any(
+                (columns[f'{name}_x'][i], columns[f'{name}_y'][i]) != center for name, center in expected.items()):
+            mismatches += 1
+    return mismatches
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Generate the stage-1 / stage-2 synthetic datasets")
+    parser.add_argument('--stage1', type=int, default=2000, help="number of Stage 1 rows")
+    parser.add_argument('--stage2', type=int, default=2000, help="number of Stage 2 rows")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--chunk-size', type=int, default=1_000_000)
+    parser.add_argument('--out', default=None, help="CSV path for the combined dataset")
+    parser.add_argument('--check', action='store_true', help="compare rows against the scalar rules")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    stage1 = generate_dataset(args.stage1, 1, args.seed, args.chunk_size, args.workers)
+    stage2 = generate_dataset(args.stage2, 2, args.seed + 1, args.chunk_size, args.workers)
+    elapsed = time.perf_counter() - start
+    total = args.stage1 + args.stage2
+    print(f"Generated {total} rows in {elapsed:.2f} s ({total / elapsed:,.0f} rows/s)")
+
+    if args.check:
+        print("Rows differing from helper_placement:", check_against_rules(stage1) + check_against_rules(stage2))
+    if args.out:
+        import pandas as pd
+
+        pd.concat([to_frame(stage1), to_frame(stage2)]).to_csv(args.out, index=False)
@@ -0,0 +1,116 @@
+# -------------------------------
+# Layout geometry
+# -------------------------------
+# The rectangles drawn by helper_visualize, without any plotting dependency,
+# so the matplotlib and raster renderers share one definition.
+
+margin = 0.2
+pillar_dims = (0.8, 0.8)
+furniture_dims = {
+    'bed': (2.0, 1.5),
+    'dresser': (1.0, 0.5),
+    'nightstand': (0.5, 0.5),
+    'table': (1.2, 0.8),
+    'desk': (1.0, 0.5)
+}
+
+furniture_colors = {
+    'bed': 'green',
+    'dresser': 'purple',
+    'nightstand': 'orange',
+    'table': 'red',
+    'desk': 'magenta'
+}
+
+
+_opposite = {'left': 'right', 'right': 'left', 'top': 'bottom', 'bottom': 'top'}
+
+
+def furniture_walls(door_wall, window_wall, stage):
+    """
+    The wall each piece belongs to, as the rules place it: the bed (and the nightstand beside it)
+    opposite the door, the dresser on the top or left wall in Stage 1 and beside the door in Stage 2,
+    the table facing the door and the desk at the unblocked window.
+    """
+    bed_wall = _opposite[door_wall]
+    if stage == 1:
+        dresser_wall = 'top' if door_wall in ['left', 'right'] else 'left'
+    else:
+        dresser_wall = door_wall
+    return {'bed': bed_wall, 'dresser': dresser_wall, 'nightstand': bed_wall, 'table': door_wall,
+            'desk': window_wall}
+
+
+def furniture_size(name, wall):
+    """
+    (w, h) of a piece's footprint on wall: its length runs along the wall and its width into the room.
+    """
+    length, width = furniture_dims[name]
+    return (length, width) if wall in ['top', 'bottom'] else (width, length)
+
+
+def _sample_stage(sample):
+    return 1 if sample.get('stage', 2) == 1 else 2
+
+
+def layout_geometry(sample, stage=None):
+    """
+    Returns the rectangles visualize_layout (stage 1) or visualize_layout_stage2 would draw,
+    as a dict of (x, y, w, h) tuples keyed by 'room', 'door', 'windows', 'pillar' and 'furniture'.
+    """
+    stage = stage or _sample_stage(sample)
+    room_length = sample['room_length']
+    room_width = sample['room_width']
+    thickness = 0.1
+    geometry = {'room': (0, 0, room_length, room_width), 'door': None, 'windows': [], 'pillar': None, 'furniture': {}}
+
+    if sample['door_exist'] == 1:
+        door_wall = sample['door_wall']
+        door_pos = sample['door_pos']
+        if door_wall == 'left':
+            geometry['door'] = (-thickness, door_pos - 0.8/2, thickness, 0.8)
+        elif door_wall == 'right':
+            geometry['door'] = (room_length, door_pos - 0.8/2, thickness, 0.8)
+        elif door_wall == 'top':
+            geometry['door'] = (door_pos - 0.8/2, room_width, 0.8, thickness)
+        elif door_wall == 'bottom' or stage == 2:
+            geometry['door'] = (door_pos - 0.8/2, -thickness, 0.8, thickness)
+
+    if stage == 1:
+        if sample['window_exist'] == 1:
+            window_wall = sample['window_wall']
+            if sample.get('stage', 2) == 1:
+                window_pos = sample.get('window1_pos', room_length/2)
+            else:
+                window_pos = sample.get('window_pos', room_length/2)
+            if window_wall == 'left':
+                geometry['windows'].append((-thickness, window_pos - 1.0/2, thickness, 1.0))
+            elif window_wall == 'right':
+                geometry['windows'].append((room_length, window_pos - 1.0/2, thickness, 1.0))
+            elif window_wall == 'top':
+                geometry['windows'].append((window_pos - 1.0/2, room_width, 1.0, thickness))
+            elif window_wall == 'bottom':
+                geometry['windows'].append((window_pos - 1.0/2, -thickness, 1.0, thickness))
+        furniture = ['bed', 'dresser', 'nightstand', 'table']
+    else:
+        for prefix in ['window1', 'window2']:
+            if sample[f'{prefix}_wall_top']:
+                center, wall = (room_length/2, room_width - margin), 'top'
+            elif sample[f'{prefix}_wall_bottom']:
+                center, wall = (room_length/2, margin), 'bottom'
+            elif sample[f'{prefix}_wall_left']:
+                center, wall = (margin, room_width/2), 'left'
+            else:
+                center, wall = (room_length - margin, room_width/2), 'right'
+            w, h = (1.0, thickness) if wall in ['top', 'bottom'] else (thickness, 1.0)
+            geometry['windows'].append((center[0]-w/2, center[1]-h/2, w, h))
+        p_w, p_h = pillar_dims
+        geometry['pillar'] = (sample['pillar_x']-p_w/2, sample['pillar_y']-p_h/2, p_w, p_h)
+        furniture = ['bed', 'dresser', 'nightstand', 'table', 'desk']
+
+    walls = furniture_walls(sample['door_wall'], sample['window_wall'], stage)
+    for name in furniture:
+        w, h = furniture_size(name, walls[name])
+        cx, cy = sample[f'{name}_x'], sample[f'{name}_y']
+        geometry['furniture'][name] = (cx - w/2, cy - h/2, w, h)
+    return geometry
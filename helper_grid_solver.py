@@ -0,0 +1,370 @@
+import numpy as np
+from helper_geometry import furniture_size, furniture_walls, margin
+from helper_instrument import count, span
+from helper_placement_array import LEFT, RIGHT, TOP, BOTTOM, WALLS
+from helper_roomspec import NO_WALL, RoomSpec
+from helper_validate import door_clearance, door_width, wall_zones, window_clearance, window_width
+
+# -------------------------------
+# Occupancy-grid placement solver
+# -------------------------------
+# A deterministic alternative to the MLP that works for any room size and
+# any door / window position. The room is rasterized into cells of `cell`
+# metres; a cell is occupied if any part of it is covered by
+#   - the margin band along the walls (pieces stay margin away, like the rules)
+#   - the door swing (door_width x door_clearance, as in helper_validate.py)
+#   - the pillar and the pieces placed so far
+#   - the unblocked window zones (for every piece but the desk)
+# The summed-area table of that grid gives the number of occupied cells under
+# any rectangle in O(1), so every position of a piece is tested at once with
+# four shifted slices. The free positions are scored with vectorized cost
+# terms (distance to the piece's target spot, plus a penalty for wall-bound
+# pieces that are not flush), and the cheapest one is taken. Pieces are placed
+# in priority order:
+#   bed         flush and centred on the wall opposite the door
+#   nightstand  beside the bed, margin away, on the rules' side if it is free
+#   dresser     Stage 1: centred on the top (side door) or left wall;
+#               Stage 2: flush on the door wall, beside the door
+#   desk        in front of the unblocked window (Stage 2 only; (0, 0) otherwise, as in the data)
+#   table       table_offset into the room from the door
+# Footprints are the drawn rectangles, as in helper_validate.py: each piece
+# stands with its length along its rule wall (helper_geometry.furniture_walls).
+
+cell = 0.05
+flush_weight = 10.0
+alternative_penalty = 0.5
+table_offset = 2
+desk_offset = 0.3
+dresser_door_offset = 0.7
+order = ['bed', 'nightstand', 'dresser', 'desk', 'table']
+wall_bound = {'bed', 'dresser'}
+
+_eps = 1e-9
+
+
+class NoFreeSpace(ValueError):
+    """
+    Raised when a piece fits nowhere in the room.
+    """
+
+
+class OccupancyGrid:
+    """
+    Boolean occupancy of a room in cells of `cell` metres, rows along y and columns along x.
+    """
+
+    def __init__(self, room_length, room_width, resolution=cell):
+        self.room_length = room_length
+        self.room_width = room_width
+        self.cell = resolution
+        self.cols = int(np.ceil(room_length / resolution - _eps))
+        self.rows = int(np.ceil(room_width / resolution - _eps))
+        self.occupied = np.zeros((self.rows, self.cols), dtype=bool)
+        self._table = None
+
+    def fill(self, x0, y0, x1, y1):
+        """
+        Marks every cell the rectangle touches (conservatively: partly covered cells count).
+        NaN rectangles are ignored.
+        """
+        if np.isnan(x0):
+            return
+        c0 = max(int(np.floor(x0 / self.cell + _eps)), 0)
+        c1 = min(int(np.ceil(x1 / self.cell - _eps)), self.cols)
+        r0 = max(int(np.floor(y0 / self.cell + _eps)), 0)
+        r1 = min(int(np.ceil(y1 / self.cell - _eps)), self.rows)
+        if c1 > c0 and r1 > r0:
+            self.occupied[r0:r1, c0:c1] = True
+            self._table = None
+
+    def summed_area_table(self):
+        """
+        (rows + 1, cols + 1) table S with S[r, c] = occupied cells in rows < r and columns < c.
+        """
+        if self._table is None:
+            table = np.zeros((self.rows + 1, self.cols + 1), dtype=np.int32)
+            np.cumsum(self.occupied, axis=0, out=table[1:, 1:])
+            np.cumsum(table[1:, 1:], axis=1, out=table[1:, 1:])
+            self._table = table
+        return self._table
+
+    def free_positions(self, height, width):
+        """
+        (rows - height + 1, cols - width + 1) bool array: True where a height x width block of cells
+        with its lower-left cell at [r, c] is completely free.
+        """
+        S = self.summed_area_table()
+        if height > self.rows or width > self.cols:
+            return np.zeros((0, 0), dtype=bool)
+        blocked = S[height:, width:] - S[:-height, width:] - S[height:, :-width] + S[:-height, :-width]
+        return blocked == 0
+
+
+def _wall_zone(wall, pos, L, W, width, depth):
+    return wall_zones(np.array([wall]), np.array([pos]), L, W, width, depth)[:, 0]
+
+
+def _target_off_wall(wall, along, L, W, depth):
+    """
+    The point `depth` into the room from wall, at position `along` along it.
+    """
+    if wall == LEFT:
+        return along * 0 + depth, along
+    if wall == RIGHT:
+        return along * 0 + L - depth, along
+    if wall == TOP:
+        return along, along * 0 + W - depth
+    return along, along * 0 + depth
+
+
+def _opposite(wall):
+    return {LEFT: RIGHT, RIGHT: LEFT, TOP: BOTTOM, BOTTOM: TOP}[wall]
+
+
+def _wall_length(wall, L, W):
+    return L if wall in (TOP, BOTTOM) else W
+
+
+def _depth(name, wall):
+    # Half the piece's extent away from wall; _half_along is half its extent along it.
+    size_x, size_y = furniture_size(name, WALLS[wall])
+    return (size_y if wall in (TOP, BOTTOM) else size_x) / 2
+
+
+def _half_along(name, wall):
+    size_x, size_y = furniture_size(name, WALLS[wall])
+    return (size_x if wall in (TOP, BOTTOM) else size_y) / 2
+
+
+class GridSolver:
+    """
+    Places the furniture of one RoomSpec, see the module comment.
+    """
+
+    def __init__(self, spec, resolution=cell):
+        self.spec = spec
+        self.resolution = resolution
+        L, W = spec.room_length, spec.room_width
+        self.L, self.W = L, W
+        self.grid = OccupancyGrid(L, W, resolution)
+        # Cells the desk may use although other pieces may not.
+        self.windows = OccupancyGrid(L, W, resolution)
+
+        # The last row / column may reach past the wall, so the far bands extend one cell further.
+        far_x, far_y = L + resolution, W + resolution
+        for band in ((0, 0, margin, far_y), (L - margin, 0, far_x, far_y), (0, 0, far_x, margin), (0, W - margin, far_x, far_y)):
+            self.grid.fill(*band)
+        self.door = _wall_zone(spec.door_wall, spec.door_pos, L, W, door_width, door_clearance)
+        self.grid.fill(*self.door)
+        if spec.stage == 2:
+            half = 0.4
+            self.grid.fill(spec.pillar_x - half, spec.pillar_y - half, spec.pillar_x + half, spec.pillar_y + half)
+        for wall, pos in ((spec.window1_wall, spec.window1_pos), (spec.window2_wall, spec.window2_pos)):
+            if wall != NO_WALL and wall != spec.blocked_wall:
+                self.windows.fill(*_wall_zone(wall, pos, L, W, window_width, window_clearance))
+        walls = furniture_walls(WALLS[spec.door_wall], WALLS[spec.window_wall], spec.stage)
+        self.walls = {name: WALLS.index(wall) for name, wall in walls.items()}
+        self.placed = {}
+
+    def targets(self, name):
+        """
+        (xs, ys) arrays of the spots the piece would ideally stand on; the first is preferred,
+        the others cost alternative_penalty more.
+        """
+        spec, L, W = self.spec, self.L, self.W
+        if name == 'bed':
+            wall = _opposite(spec.door_wall)
+            return _target_off_wall(wall, np.array([_wall_length(wall, L, W) / 2]), L, W, margin + _depth(name, wall))
+        if name == 'nightstand':
+            bx, by = self.placed['bed']
+            bed_wall = self.walls['bed']
+            offset = _half_along('bed', bed_wall) + _half_along(name, bed_wall) + margin
+            # The rules' side: left of the bed in Stage 2, right of it (seen from the room) in Stage 1.
+            sign = 1 if spec.stage == 1 and bed_wall in (RIGHT, BOTTOM) else -1
+            sides = np.array([sign, -sign]) * offset
+            if bed_wall in (TOP, BOTTOM):
+                return bx + sides, np.array([by, by])
+            return np.array([bx, bx]), by + sides
+        if name == 'dresser':
+            if spec.stage == 1:
+                # Centred on the top wall for side doors, else on the left wall, as in the rules.
+                wall = TOP if spec.door_wall in (LEFT, RIGHT) else LEFT
+                return _target_off_wall(wall, np.array([_wall_length(wall, L, W) / 2]), L, W,
+                                        margin + _depth(name, wall))
+            offset = dresser_door_offset + _half_along(name, spec.door_wall)
+            sign = 1 if spec.door_wall in (BOTTOM, RIGHT) else -1
+            along = spec.door_pos + np.array([sign, -sign]) * offset
+            return _target_off_wall(spec.door_wall, along, L, W, margin + _depth(name, spec.door_wall))
+        if name == 'desk':
+            wall = spec.window_wall
+            pos = spec.window1_pos if wall == spec.window1_wall else spec.window2_pos
+            return _target_off_wall(wall, np.array([pos]), L, W, margin + _depth(name, wall) + desk_offset)
+        # table
+        return _target_off_wall(spec.door_wall, np.array([spec.door_pos]), L, W,
+                                margin + _depth(name, spec.door_wall) + table_offset)
+
+    def _costs(self, name):
+        """
+        Cost of every lower-left cell position of the piece (inf where it does not fit), with the
+        x / y centre coordinates of the columns / rows.
+        """
+        size_x, size_y = furniture_size(name, WALLS[self.walls[name]])
+        w = int(round(size_x / self.resolution))
+        h = int(round(size_y / self.resolution))
+        free = self.grid.free_positions(h, w)
+        if name != 'desk' and free.size:
+            free &= self.windows.free_positions(h, w)
+        if not free.any():
+            return None
+        # Every term is separable, so it is computed per column / row and broadcast.
+        cx = (np.arange(free.shape[1]) + w / 2) * self.resolution
+        cy = (np.arange(free.shape[0]) + h / 2) * self.resolution
+        L, W = self.L, self.W
+        to_x_wall = np.minimum(cx, L - cx)[None, :]
+        to_y_wall = np.minimum(cy, W - cy)[:, None]
+
+        tx, ty = self.targets(name)
+        cost = None
+        for k, (x, y) in enumerate(zip(tx, ty)):
+            d = np.sqrt((cy[:, None] - y) ** 2 + (cx[None, :] - x) ** 2)
+            if k:
+                d += alternative_penalty
+            cost = d if cost is None else np.minimum(cost, d)
+        if name in wall_bound:
+            gap = np.minimum(to_x_wall - size_x / 2, to_y_wall - size_y / 2) - margin
+            cost += flush_weight * np.maximum(gap, 0)
+        cost[~free] = np.inf
+        return cost, cx, cy, size_x, size_y
+
+    def place(self, name):
+        """
+        Places one piece at its cheapest free position and marks it occupied. Returns (x, y).
+        """
+        costs = self._costs(name)
+        if costs is not None:
+            cost, cx, cy, size_x, size_y = costs
+            r, c = np.unravel_index(np.argmin(cost), cost.shape)
+        if costs is None or not np.isfinite(cost[r, c]):
+            raise NoFreeSpace(f"no free space for the {name} in a {self.L} x {self.W} m room")
+        x, y = cx[c], cy[r]
+        x, y = self._snap_flush(x, y, size_x, size_y)
+        self.grid.fill(x - size_x / 2, y - size_y / 2, x + size_x / 2, y + size_y / 2)
+        self.placed[name] = (x, y)
+        return x, y
+
+    def _snap_flush(self, x, y, size_x, size_y):
+        # Room sizes are not multiples of the cell size, so a piece against the right or top
+        # margin band can stop up to one cell short; move it the rest of the way.
+        right = self.L - margin - size_x / 2
+        top = self.W - margin - size_y / 2
+        if 0 < right - x < self.resolution:
+            x = right
+        if 0 < top - y < self.resolution:
+            y = top
+        # Cell arithmetic leaves float noise such as 5.550000000000001.
+        return round(float(x), 9), round(float(y), 9)
+
+    def solve(self):
+        """
+        Places every piece. Returns a length-10 array in output_features order.
+        """
+        for name in order:
+            if name == 'desk' and self.spec.stage == 1:
+                self.placed['desk'] = (0.0, 0.0)
+                continue
+            self.place(name)
+        return np.array([self.placed[name][k] for name in ['bed', 'dresser', 'nightstand', 'table', 'desk']
+                         for k in (0, 1)])
+
+
+def solve_spec(spec, resolution=cell):
+    """
+    Placements for one RoomSpec, a length-10 float64 array in output_features order.
+    """
+    with span("grid_solver.solve"):
+        placements = GridSolver(spec, resolution).solve()
+    count("grid_solver.layouts")
+    return placements
+
+
+def solve_batch(specs, resolution=cell):
+    """
+    (N, 10) placements for a RoomSpecBatch; rooms where a piece does not fit are NaN.
+    """
+    out = np.full((len(specs), 10), np.nan)
+    for i in range(len(specs)):
+        try:
+            out[i] = solve_spec(specs[i], resolution)
+        except NoFreeSpace:
+            count("grid_solver.no_free_space")
+    return out
+
+
+def solve_room(spec):
+    """
+    Grid-solver counterpart of helper_predict.predict_room. Returns (sample_full, pred_outputs).
+    """
+    from helper_predict import output_features
+
+    pred_outputs = dict(zip(output_features, solve_spec(spec).tolist()))
+    return spec.sample_full(pred_outputs), pred_outputs
+
+
+def solve_optimal_placements(obstacles_dict, stage, door_wall, window_wall, window1_wall, window2_wall,
+                             blocked_window_choice):
+    """
+    Drop-in replacement for helper_predict.predict_optimal_placements (same arguments and return value).
+    """
+    sample_full, pred_outputs = solve_room(RoomSpec.from_training_input(obstacles_dict))
+    sample_full["door_wall"] = door_wall
+    if stage == 1:
+        sample_full["window_wall"] = window_wall
+    else:
+        sample_full["window_wall"] = window1_wall if blocked_window_choice == "Window 2" else window2_wall
+    return sample_full, pred_outputs
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+    from helper_dataset import generate_mixed, room_specs, targets
+    from helper_validate import validate
+
+    parser = argparse.ArgumentParser(description="Solve random rooms on the occupancy grid and check the layouts")
+    parser.add_argument('--samples', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--off-centre', action='store_true',
+                        help="move doors and windows off centre and widen the size range to 3-10 m")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    columns = generate_mixed(args.samples, rng)
+    specs = room_specs(columns)
+    if args.off_centre:
+        n = len(specs)
+        L = rng.uniform(3.0, 10.0, n)
+        W = rng.uniform(3.0, 10.0, n)
+        arrays = {name: getattr(specs, name).copy() for name in specs.fields}
+        for field, wall_field in (('door_pos', 'door_wall'), ('window1_pos', 'window1_wall'),
+                                  ('window2_pos', 'window2_wall')):
+            walls = arrays[wall_field]
+            length = np.where((walls == TOP) | (walls == BOTTOM), L, W)
+            arrays[field] = np.where(walls == NO_WALL, 0, rng.uniform(0.25, 0.75, n) * length)
+        arrays['pillar_x'] = arrays['pillar_x'] / arrays['room_length'] * L
+        arrays['pillar_y'] = arrays['pillar_y'] / arrays['room_width'] * W
+        arrays['room_length'], arrays['room_width'] = L, W
+        specs = type(specs)(**arrays)
+
+    start = time.perf_counter()
+    placements = solve_batch(specs)
+    elapsed = time.perf_counter() - start
+    solved = ~np.isnan(placements).any(axis=1)
+    print(f"Solved {solved.sum()} / {len(specs)} rooms, {elapsed / len(specs) * 1000:.2f} ms per layout")
+    subset = type(specs)(**{name: getattr(specs, name)[solved] for name in specs.fields})
+    print("Violations:", validate(subset, placements[solved]).counts())
+    if not args.off_centre:
+        truth = targets(columns)
+        distance = np.hypot(placements[:, 0::2] - truth[:, 0::2], placements[:, 1::2] - truth[:, 1::2])
+        print("Median distance to the rule layouts (m):",
+              {name: round(float(np.median(distance[:, i])), 3)
+               for i, name in enumerate(['bed', 'dresser', 'nightstand', 'table', 'desk'])})
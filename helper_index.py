@@ -0,0 +1,241 @@
+import json
+import os
+import numpy as np
+from helper_placement_array import WALLS
+from helper_roomspec import RoomSpec, RoomSpecBatch
+
+# -------------------------------
+# Precomputed layout index
+# -------------------------------
+# The Streamlit sidebar only offers a small discrete grid of inputs:
+#   room length / width: 6.0 .. 7.0 in 0.1 steps (11 values each)
+#   door wall: bottom, top, left, right
+#   windows: 1, or 2 with the pillar blocking Window 1 or Window 2
+# which is 11 * 11 * 4 * 3 = 1452 rooms. The index stores the predicted
+# placements for every one of them in a memory-mapped array addressed by a
+# dense integer key, so a lookup never touches the model.
+#
+# meta.json records the modification times of the checkpoint and scalers the
+# index was built from. Once any of them changes (the model was retrained or
+# re-exported), the index is stale: open_layout_index refuses it and
+# LayoutIndex.lookup misses, so predict_layout falls back to live inference.
+
+grid_min = 6.0
+grid_steps = 11
+door_walls = ['bottom', 'top', 'left', 'right']
+window_options = [("1", None), ("2", "Window 1"), ("2", "Window 2")]
+index_size = grid_steps * grid_steps * len(door_walls) * len(window_options)
+# predict_layout engines: the MLP (with the index), helper_grid_solver.py and the rules (helper_relayout.py).
+engines = ('model', 'grid', 'rules')
+
+
+def build_training_input(room_length, room_width, door_wall, num_windows, blocked_window_choice=None):
+    """
+    Builds the model input the same way main.py does from the sidebar values.
+    Returns (stage, training_input, walls) where walls holds the keyword arguments
+    predict_optimal_placements expects for the window walls.
+    """
+    spec = RoomSpec.from_ui(room_length, room_width, door_wall, num_windows, blocked_window_choice)
+    if spec.stage == 1:
+        walls = {"window_wall": WALLS[spec.window1_wall], "window1_wall": None, "window2_wall": None,
+                 "blocked_window_choice": None}
+    else:
+        walls = {"window_wall": None, "window1_wall": WALLS[spec.window1_wall],
+                 "window2_wall": WALLS[spec.window2_wall], "blocked_window_choice": blocked_window_choice}
+    return spec.stage, spec.to_training_input(), walls
+
+
+def _grid_step(value):
+    """
+    Returns the 0..10 grid position of a room dimension, or None when it is off the grid.
+    """
+    steps = (value - grid_min) * 10
+    i = int(round(steps))
+    if abs(steps - i) > 1e-6 or not 0 <= i < grid_steps:
+        return None
+    return i
+
+
+def index_key(room_length, room_width, door_wall, num_windows, blocked_window_choice=None):
+    """
+    Dense integer key of a sidebar configuration, or None when it lies outside the grid.
+    """
+    li = _grid_step(room_length)
+    wi = _grid_step(room_width)
+    if li is None or wi is None or door_wall not in door_walls:
+        return None
+    option = (num_windows, None if num_windows == "1" else blocked_window_choice)
+    if option not in window_options:
+        return None
+    return ((li * grid_steps + wi) * len(door_walls) + door_walls.index(door_wall)) * len(window_options) \
+        + window_options.index(option)
+
+
+def iter_grid():
+    """
+    Yields (key, room_length, room_width, door_wall, num_windows, blocked_window_choice) over the whole grid.
+    """
+    key = 0
+    for li in range(grid_steps):
+        for wi in range(grid_steps):
+            for door_wall in door_walls:
+                for num_windows, blocked_window_choice in window_options:
+                    yield (key, round(grid_min + li / 10, 1), round(grid_min + wi / 10, 1),
+                           door_wall, num_windows, blocked_window_choice)
+                    key += 1
+
+
+def build_layout_index(out_dir="layout_index", with_images=False, predictor=None):
+    """
+    Runs the model once over every sidebar configuration and writes the index to out_dir:
+      placements.npy      (1452, 10) float32 predictions in output_features order
+      images.bin          concatenated PNGs (only with with_images)
+      image_offsets.npy   (1453,) int64 byte offsets into images.bin
+      meta.json           grid definition and the model files (with their mtimes) it was built from
+    """
+    from helper_predict import get_predictor, output_features
+
+    predictor = predictor or get_predictor()
+    grid = list(iter_grid())
+    specs = [RoomSpec.from_ui(*row[1:]) for row in grid]
+    placements = predictor.predict_batch(RoomSpecBatch.from_specs(specs))
+
+    os.makedirs(out_dir, exist_ok=True)
+    np.save(os.path.join(out_dir, "placements.npy"), placements.astype(np.float32))
+
+    if with_images:
+        from helper_visualize import LayoutRenderer
+
+        renderer = LayoutRenderer()
+        offsets = np.zeros(len(grid) + 1, dtype=np.int64)
+        with open(os.path.join(out_dir, "images.bin"), "wb") as f:
+            for key, spec in enumerate(specs):
+                pred_outputs = dict(zip(output_features, placements[key]))
+                png = renderer.render(spec.sample_full(pred_outputs), spec.stage)
+                f.write(png)
+                offsets[key + 1] = offsets[key] + len(png)
+        np.save(os.path.join(out_dir, "image_offsets.npy"), offsets)
+
+    meta = {
+        "grid_min": grid_min,
+        "grid_steps": grid_steps,
+        "door_walls": door_walls,
+        "window_options": window_options,
+        "output_features": output_features,
+        "model_path": predictor.model_path,
+        "artifacts": predictor.loaded_artifacts(),
+        "with_images": with_images
+    }
+    with open(os.path.join(out_dir, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+    return out_dir
+
+
+class LayoutIndex:
+    """
+    Read-only, memory-mapped view of an index written by build_layout_index.
+    """
+
+    def __init__(self, path="layout_index"):
+        from helper_predict import output_features
+
+        self.path = path
+        self.output_features = output_features
+        meta_path = os.path.join(path, "meta.json")
+        self.artifacts = {}
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                self.artifacts = json.load(f).get("artifacts", {})
+        self.placements = np.load(os.path.join(path, "placements.npy"), mmap_mode='r')
+        if len(self.placements) != index_size:
+            raise ValueError(f"{path} holds {len(self.placements)} entries, expected {index_size}")
+        offsets_path = os.path.join(path, "image_offsets.npy")
+        if os.path.exists(offsets_path):
+            self.image_offsets = np.load(offsets_path, mmap_mode='r')
+            self.images = np.memmap(os.path.join(path, "images.bin"), dtype=np.uint8, mode='r')
+        else:
+            self.image_offsets = self.images = None
+
+    def is_current(self):
+        """
+        True while the checkpoint and scaler files the index was built from are unchanged on disk.
+        An index without that record (built before it was kept) is never current.
+        """
+        if not self.artifacts:
+            return False
+        try:
+            return all(os.path.getmtime(p) == mtime for p, mtime in self.artifacts.items())
+        except OSError:
+            return False
+
+    def lookup(self, room_length, room_width, door_wall, num_windows, blocked_window_choice=None):
+        """
+        Returns (sample_full, pred_outputs, png_bytes or None) for a grid configuration, or None off the grid
+        or when the index is stale.
+        """
+        key = index_key(room_length, room_width, door_wall, num_windows, blocked_window_choice)
+        if key is None or not self.is_current():
+            return None
+        spec = RoomSpec.from_ui(room_length, room_width, door_wall, num_windows, blocked_window_choice)
+        pred_outputs = dict(zip(self.output_features, self.placements[key].tolist()))
+        png = None
+        if self.image_offsets is not None:
+            png = self.images[self.image_offsets[key]:self.image_offsets[key + 1]].tobytes()
+        return spec.sample_full(pred_outputs), pred_outputs, png
+
+
+def open_layout_index(path="layout_index"):
+    """
+    Opens the index at path, or returns None if it has not been built or is stale (the model or
+    scalers changed since; rebuild it with `python helper_index.py`).
+    """
+    if not os.path.exists(os.path.join(path, "placements.npy")):
+        return None
+    index = LayoutIndex(path)
+    return index if index.is_current() else None
+
+
+def predict_layout(room_length, room_width, door_wall, num_windows, blocked_window_choice=None, index=None,
+                   engine='model'):
+    """
+    Answers from the index when the configuration is on the grid, otherwise runs live inference.
+    engine='grid' or 'rules' places the furniture with the grid solver or the rules instead (the index
+    holds model output). Returns (sample_full, pred_outputs, png_bytes or None).
+    """
+    if engine not in engines:
+        raise ValueError(f"unknown engine {engine!r}, expected one of {', '.join(engines)}")
+    if engine != 'model':
+        spec = RoomSpec.from_ui(room_length, room_width, door_wall, num_windows, blocked_window_choice)
+        if engine == 'grid':
+            from helper_grid_solver import solve_room
+
+            sample_full, pred_outputs = solve_room(spec)
+        else:
+            from helper_relayout import Relayout
+
+            layout = Relayout(spec)
+            sample_full, pred_outputs = layout.sample_full(), layout.pred_outputs()
+        return sample_full, pred_outputs, None
+
+    if index is not None:
+        hit = index.lookup(room_length, room_width, door_wall, num_windows, blocked_window_choice)
+        if hit is not None:
+            return hit
+
+    from helper_predict import predict_room
+
+    spec = RoomSpec.from_ui(room_length, room_width, door_wall, num_windows, blocked_window_choice)
+    sample_full, pred_outputs = predict_room(spec)
+    return sample_full, pred_outputs, None
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Precompute predictions for every sidebar configuration")
+    parser.add_argument('--out', default='layout_index')
+    parser.add_argument('--images', action='store_true', help="also store a rendered PNG per entry")
+    args = parser.parse_args()
+
+    build_layout_index(args.out, with_images=args.images)
+    print(f"Wrote {index_size} entries to {args.out}/")
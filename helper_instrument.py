@@ -0,0 +1,183 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+
+# -------------------------------
+# Opt-in instrumentation
+# -------------------------------
+# Named timing spans and counters around the hot paths. Off by default; turn it
+# on with FURNITURE_INSTRUMENT=1 or enable(). When off, span() returns a shared
+# no-op context manager and count() returns immediately.
+#
+# Exports: log_summary() (logging), to_prometheus() (text exposition format,
+# served by serve.py at /metrics/prometheus) and write_json(). Setting
+# FURNITURE_INSTRUMENT_JSON=<path> also writes the JSON at interpreter exit.
+# profile_call() captures a cProfile or pyinstrument report for one request.
+
+logger = logging.getLogger("furniture.instrument")
+
+_enabled = os.environ.get("FURNITURE_INSTRUMENT", "") not in ("", "0")
+_lock = threading.Lock()
+_spans = {}        # name -> [count, total seconds, max seconds]
+_counters = {}     # name -> value
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_null_span = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        with _lock:
+            stats = _spans.get(self.name)
+            if stats is None:
+                _spans[self.name] = [1, elapsed, elapsed]
+            else:
+                stats[0] += 1
+                stats[1] += elapsed
+                if elapsed > stats[2]:
+                    stats[2] = elapsed
+        return False
+
+
+def span(name):
+    """
+    Context manager timing the enclosed block under name.
+    """
+    if not _enabled:
+        return _null_span
+    return _Span(name)
+
+
+def count(name, n=1):
+    """
+    Adds n to the counter name.
+    """
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def enable(flag=True):
+    global _enabled
+    _enabled = bool(flag)
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    with _lock:
+        _spans.clear()
+        _counters.clear()
+
+
+def snapshot():
+    """
+    Returns {'spans': {name: {count, total_s, mean_s, max_s}}, 'counters': {name: value}}.
+    """
+    with _lock:
+        spans = {name: {"count": c, "total_s": total, "mean_s": total / c, "max_s": peak}
+                 for name, (c, total, peak) in sorted(_spans.items())}
+        counters = dict(sorted(_counters.items()))
+    return {"spans": spans, "counters": counters}
+
+
+def _metric_name(name):
+    return "".join(ch if ch.isalnum() else "_" for ch in name)
+
+
+def to_prometheus(prefix="furniture"):
+    """
+    Renders the current spans and counters in the Prometheus text exposition format.
+    """
+    data = snapshot()
+    lines = [
+        f"# TYPE {prefix}_span_seconds_total counter",
+        f"# TYPE {prefix}_span_count counter",
+        f"# TYPE {prefix}_span_seconds_max gauge",
+    ]
+    for name, stats in data["spans"].items():
+        label = f'{{span="{name}"}}'
+        lines.append(f"{prefix}_span_seconds_total{label} {stats['total_s']:.9f}")
+        lines.append(f"{prefix}_span_count{label} {stats['count']}")
+        lines.append(f"{prefix}_span_seconds_max{label} {stats['max_s']:.9f}")
+    for name, value in data["counters"].items():
+        metric = f"{prefix}_{_metric_name(name)}_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def log_summary(level=logging.INFO):
+    """
+    Logs one line per span and counter.
+    """
+    data = snapshot()
+    for name, stats in data["spans"].items():
+        logger.log(level, "span %s: count=%d total=%.3fms mean=%.3fms max=%.3fms", name, stats["count"],
+                   stats["total_s"] * 1000, stats["mean_s"] * 1000, stats["max_s"] * 1000)
+    for name, value in data["counters"].items():
+        logger.log(level, "counter %s: %s", name, value)
+
+
+def write_json(path):
+    with open(path, "w") as f:
+        json.dump(snapshot(), f, indent=2)
+
+
+def profile_call(fn, *args, mode="cprofile", **kwargs):
+    """
+    Runs fn(*args, **kwargs) once under a profiler and returns (result, text report).
+    mode is 'cprofile' (standard library) or 'pyinstrument' (optional dependency).
+    """
+    if mode == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            raise ImportError("mode='pyinstrument' requires `pip install pyinstrument`") from None
+        profiler = Profiler()
+        profiler.start()
+        try:
+            result = fn(*args, **kwargs)
+        finally:
+            profiler.stop()
+        return result, profiler.output_text()
+
+    import cProfile
+    import io
+    import pstats
+
+    profiler = cProfile.Profile()
+    result = profiler.runcall(fn, *args, **kwargs)
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(30)
+    return result, out.getvalue()
+
+
+if os.environ.get("FURNITURE_INSTRUMENT_JSON"):
+    atexit.register(write_json, os.environ["FURNITURE_INSTRUMENT_JSON"])
@@ -0,0 +1,102 @@
+import numpy as np
+
+# -------------------------------
+# Torch-free inference
+# -------------------------------
+# The StandardScaler statistics are folded into the first and last Linear layers:
+#   first:  W' = W / scale_X,        b' = b - W' @ mean_X
+#   last:   W' = scale_y[:, None] W, b' = scale_y * b + mean_y
+# so a forward pass over raw inputs yields placements in metres directly.
+
+
+def fold_scalers(weights, biases, scaler_X, scaler_y):
+    """
+    Returns new weight/bias lists with the input and output scalers folded in.
+    """
+    weights = [np.asarray(w, dtype=np.float64) for w in weights]
+    biases = [np.asarray(b, dtype=np.float64) for b in biases]
+
+    mean_X = np.asarray(scaler_X.mean_, dtype=np.float64)
+    scale_X = np.asarray(scaler_X.scale_, dtype=np.float64)
+    weights[0] = weights[0] / scale_X[None, :]
+    biases[0] = biases[0] - weights[0] @ mean_X
+
+    mean_y = np.asarray(scaler_y.mean_, dtype=np.float64)
+    scale_y = np.asarray(scaler_y.scale_, dtype=np.float64)
+    weights[-1] = weights[-1] * scale_y[:, None]
+    biases[-1] = biases[-1] * scale_y + mean_y
+    return weights, biases
+
+
+def export_npz(model_path="best_model.pth", scaler_X_path="scaler_X.joblib", scaler_y_path="scaler_y.joblib",
+               out_path="best_model.npz"):
+    """
+    Writes the checkpoint and both scalers as a single .npz with the scalers folded into the weights.
+    """
+    import joblib
+    import torch
+
+    state = torch.load(model_path, map_location=torch.device('cpu'))
+    # Linear layers in MLP.net are stored as net.<i>.weight / net.<i>.bias, in order.
+    layer_ids = sorted({int(k.split('.')[1]) for k in state if k.startswith('net.')})
+    weights = [state[f'net.{i}.weight'].numpy() for i in layer_ids]
+    biases = [state[f'net.{i}.bias'].numpy() for i in layer_ids]
+
+    weights, biases = fold_scalers(weights, biases, joblib.load(scaler_X_path), joblib.load(scaler_y_path))
+
+    arrays = {}
+    for i, (w, b) in enumerate(zip(weights, biases)):
+        arrays[f'W{i}'] = w.astype(np.float32)
+        arrays[f'b{i}'] = b.astype(np.float32)
+    np.savez_compressed(out_path, n_layers=np.int64(len(weights)), **arrays)
+    return out_path
+
+
+class NumpyMLP:
+    """
+    Pure-NumPy forward pass over an exported .npz (Linear + ReLU stack, scalers folded in).
+    """
+
+    def __init__(self, path="best_model.npz"):
+        with np.load(path) as data:
+            n_layers = int(data['n_layers'])
+            self.weights = [np.ascontiguousarray(data[f'W{i}'].T) for i in range(n_layers)]
+            self.biases = [data[f'b{i}'] for i in range(n_layers)]
+
+    def predict(self, X):
+        """
+        Maps an (N, 23) array of raw input_features to an (N, 10) array of placements.
+        """
+        h = np.asarray(X, dtype=np.float32)
+        last = len(self.weights) - 1
+        for i, (w, b) in enumerate(zip(self.weights, self.biases)):
+            h = h @ w
+            h += b
+            if i < last:
+                np.maximum(h, 0, out=h)
+        return h
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export the model and scalers to a torch-free .npz")
+    parser.add_argument('--model', default='best_model.pth')
+    parser.add_argument('--scaler-x', default='scaler_X.joblib')
+    parser.add_argument('--scaler-y', default='scaler_y.joblib')
+    parser.add_argument('--out', default='best_model.npz')
+    args = parser.parse_args()
+
+    export_npz(args.model, args.scaler_x, args.scaler_y, args.out)
+
+    # Check the export against the torch + sklearn path on random rooms within the training ranges.
+    from helper_predict import Predictor, input_features
+
+    rng = np.random.default_rng(0)
+    X = rng.uniform(0.0, 7.0, size=(10000, len(input_features)))
+    X[:, :2] = rng.uniform(6.0, 7.0, size=(len(X), 2))
+    flags = [i for i, name in enumerate(input_features) if '_wall_' in name or name.startswith('blocked_window_')]
+    X[:, flags] = rng.integers(0, 2, size=(len(X), len(flags)))
+    reference = Predictor(args.model, args.scaler_x, args.scaler_y, backend='eager').predict_batch(X)
+    max_err = np.abs(NumpyMLP(args.out).predict(X) - reference).max()
+    print(f"Wrote {args.out}; max abs difference vs torch: {max_err:.2e}")
@@ -1,9 +1,5 @@
-import random
-import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-from tqdm import tqdm
-import os
+# The rules are plain arithmetic on wall names and import nothing, so every
+# module (and the app) can use them without paying for pandas or matplotlib.
 
 # Global parameters:
 furniture_dims = {
@@ -39,6 +35,34 @@ def place_furniture_fixed(room_length, room_width, furniture, wall, margin=margi
         x = room_length/2
     return (round(x,2), round(y,2))
 
+def place_nightstand_right_of_bed(bed_center, bed_wall, margin=margin):
+    
+    bed_length, bed_width = furniture_dims['bed']
+    ns_length, ns_width   = furniture_dims['nightstand']
+    x, y = bed_center
+    
+    if bed_wall == 'left':
+        offset = (bed_length / 2) + (ns_length / 2) + margin
+        x_new = x
+        y_new = y - offset
+    
+    elif bed_wall == 'right':
+        offset = (bed_length / 2) + (ns_length / 2) + margin
+        x_new = x
+        y_new = y + offset
+    
+    elif bed_wall == 'top':
+        offset = (bed_length / 2) + (ns_length / 2) + margin
+        x_new = x - offset
+        y_new = y
+    
+    else:  # bed_wall == 'bottom'
+        offset = (bed_length / 2) + (ns_length / 2) + margin
+        x_new = x + offset
+        y_new = y
+    
+    return (round(x_new, 2), round(y_new, 2))
+
 def place_nightstand_left(bed_center, bed_wall, margin=margin):
    
     bed_length, bed_width = furniture_dims['bed']
@@ -49,7 +73,8 @@ def place_nightstand_left(bed_center, bed_wall, margin=margin):
         x_new = x
         y_new = y - offset
     else:
-        offset = (bed_width/2) + (ns_width/2) + margin
+        # The bed's length runs along the top or bottom wall too.
+        offset = (bed_length/2) + (ns_length/2) + margin
         x_new = x - offset
         y_new = y
     return (round(x_new,2), round(y_new,2))
@@ -0,0 +1,252 @@
+import numpy as np
+
+# -------------------------------
+# Array versions of the helper_placement rules
+# -------------------------------
+# Each function takes arrays of room dimensions and integer-coded walls and
+# returns (x, y) centre arrays. The arithmetic mirrors helper_placement.py
+# expression for expression, and round2 rounds exactly like round(x, 2), so
+# results agree with the scalar functions bit for bit. The scalar versions
+# stay as the reference; check_against_scalar() compares the two.
+
+# Integer wall codes, in the order the one-hot input features use.
+WALLS = ('left', 'right', 'top', 'bottom')
+LEFT, RIGHT, TOP, BOTTOM = range(4)
+
+# Global parameters:
+furniture_dims = {
+    'bed': (2.0, 1.5),
+    'dresser': (1.0, 0.5),
+    'nightstand': (0.5, 0.5),
+    'table': (1.2, 0.8),
+    'desk': (1.0, 0.5)
+}
+pillar_dims = (0.8, 0.8)
+margin = 0.2
+table_offset = 2
+desk_offset = 0.3
+dresser_door_offset = 0.7
+
+
+def encode_walls(walls):
+    """
+    Maps wall names ('left', 'right', 'top', 'bottom') to int8 codes.
+    """
+    lookup = {name: i for i, name in enumerate(WALLS)}
+    return np.array([lookup[w] for w in walls], dtype=np.int8)
+
+
+def opposite_wall(wall):
+    """
+    left <-> right, top <-> bottom.
+    """
+    return np.asarray(wall) ^ 1
+
+
+def round2(x):
+    """
+    Vectorized round(x, 2) with Python's exact semantics (correct rounding of the
+    binary value, ties to even). np.round scales by 100 first and disagrees with
+    round() on values such as 6.51 / 2.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    ax = np.abs(x)
+    r = np.rint(ax * 100)
+    mant, exp = np.frexp(ax)
+    # Below 2**-9 the result is always 0; above 2**40 x * 100 is already integral.
+    small = exp < -8
+    big = exp > 40
+    shift = np.where(small | big, 0, 53 - exp).astype(np.int64)
+    # Compare 100 * |x| against r +- 0.5 exactly, as integers: |x| = m * 2**-(53 - exp).
+    lhs = 200 * np.ldexp(mant, 53).astype(np.int64)
+    scale = np.left_shift(np.int64(1), shift)
+    ri = r.astype(np.int64)
+    lo = (2 * ri - 1) * scale
+    hi = (2 * ri + 1) * scale
+    even = ri % 2 == 0
+
+    out = np.where(lhs < lo, r - 1, np.where(lhs > hi, r + 1, r))
+    out = np.where(lhs == lo, np.where(even, r, r - 1), out)
+    out = np.where(lhs == hi, np.where(even, r, r + 1), out)
+    out = np.where(small, 0.0, np.where(big, r, out))
+    return np.copysign(out / 100, x)
+
+
+def place_furniture_fixed_array(room_length, room_width, furniture, wall, margin=margin):
+    """
+    Places furniture flush against the given walls.
+    """
+    length, width = furniture_dims[furniture]
+    room_length = np.asarray(room_length, dtype=np.float64)
+    room_width = np.asarray(room_width, dtype=np.float64)
+    x = np.select([wall == LEFT, wall == RIGHT], [margin + width/2, room_length - margin - width/2], room_length/2)
+    y = np.select([wall == TOP, wall == BOTTOM], [room_width - margin - width/2, margin + width/2], room_width/2)
+    return round2(x), round2(y)
+
+
+def place_nightstand_left_array(bed_x, bed_y, bed_wall, margin=margin):
+    """
+    Places the nightstand on the physical left side of the bed.
+    """
+    bed_length, bed_width = furniture_dims['bed']
+    ns_length, ns_width = furniture_dims['nightstand']
+    bed_x = np.asarray(bed_x, dtype=np.float64)
+    bed_y = np.asarray(bed_y, dtype=np.float64)
+    side = (bed_wall == LEFT) | (bed_wall == RIGHT)
+    x = np.where(side, bed_x, bed_x - ((bed_length/2) + (ns_length/2) + margin))
+    y = np.where(side, bed_y - ((bed_length/2) + (ns_length/2) + margin), bed_y)
+    return round2(x), round2(y)
+
+
+def place_nightstand_right_of_bed_array(bed_x, bed_y, bed_wall, margin=margin):
+    """
+    Places the nightstand on the right of the bed (Stage 1 rule).
+    """
+    bed_length, bed_width = furniture_dims['bed']
+    ns_length, ns_width = furniture_dims['nightstand']
+    bed_x = np.asarray(bed_x, dtype=np.float64)
+    bed_y = np.asarray(bed_y, dtype=np.float64)
+    offset = (bed_length / 2) + (ns_length / 2) + margin
+    x = np.select([bed_wall == TOP, bed_wall == BOTTOM], [bed_x - offset, bed_x + offset], bed_x)
+    y = np.select([bed_wall == LEFT, bed_wall == RIGHT], [bed_y - offset, bed_y + offset], bed_y)
+    return round2(x), round2(y)
+
+
+def place_table_near_door_array(room_length, room_width, door_wall, margin=margin, offset=table_offset):
+    """
+    Places the table closer to the door.
+    """
+    table_length, table_width = furniture_dims['table']
+    room_length = np.asarray(room_length, dtype=np.float64)
+    room_width = np.asarray(room_width, dtype=np.float64)
+    x = np.select([door_wall == LEFT, door_wall == RIGHT],
+                  [margin + table_width/2 + offset, room_length - margin - table_width/2 - offset], room_length/2)
+    y = np.select([door_wall == TOP, door_wall == BOTTOM],
+                  [room_width - margin - table_width/2 - offset, margin + table_width/2 + offset], room_width/2)
+    return round2(x), round2(y)
+
+
+def place_dresser_right_of_door_array(room_length, room_width, door_wall, door_pos, margin=0.2, offset=0.7):
+    """
+    Places the dresser beside the door on the door wall, clamped to stay inside the room.
+    """
+    dresser_length, dresser_width = furniture_dims['dresser']
+    room_length = np.asarray(room_length, dtype=np.float64)
+    room_width = np.asarray(room_width, dtype=np.float64)
+    door_pos = np.asarray(door_pos, dtype=np.float64)
+
+    bottom_x = door_pos + (dresser_length / 2) + offset
+    bottom_x = np.where(bottom_x + (dresser_length / 2) > room_length - margin,
+                        room_length - margin - (dresser_length / 2), bottom_x)
+    top_x = door_pos - (dresser_length / 2) - offset
+    top_x = np.where(top_x - (dresser_length / 2) < margin, margin + (dresser_length / 2), top_x)
+    left_y = door_pos - (dresser_length / 2) - offset
+    left_y = np.where(left_y - (dresser_length / 2) < margin, margin + (dresser_length / 2), left_y)
+    right_y = door_pos + (dresser_length / 2) + offset
+    right_y = np.where(right_y + (dresser_length / 2) > room_width - margin,
+                       room_width - margin - (dresser_length / 2), right_y)
+
+    x = np.select([door_wall == BOTTOM, door_wall == TOP, door_wall == LEFT],
+                  [bottom_x, top_x, margin + (dresser_width / 2)], room_length - margin - (dresser_width / 2))
+    y = np.select([door_wall == BOTTOM, door_wall == TOP, door_wall == LEFT],
+                  [margin + dresser_width / 2, room_width - margin - (dresser_width / 2), left_y], right_y)
+    return round2(x), round2(y)
+
+
+def place_desk_near_window_array(room_length, room_width, window_wall, margin=margin, offset=desk_offset):
+    """
+    Places the desk in front of the unobstructed window wall.
+    """
+    desk_length, desk_width = furniture_dims['desk']
+    room_length = np.asarray(room_length, dtype=np.float64)
+    room_width = np.asarray(room_width, dtype=np.float64)
+    x = np.select([window_wall == LEFT, window_wall == RIGHT],
+                  [margin + desk_width/2 + offset, room_length - margin - desk_width/2 - offset], room_length/2)
+    y = np.select([window_wall == TOP, window_wall == BOTTOM],
+                  [room_width - margin - desk_width/2 - offset, margin + desk_width/2 + offset], room_width/2)
+    return round2(x), round2(y)
+
+
+def place_pillar_at_window_array(room_length, room_width, window_wall, margin=margin):
+    """
+    Places a pillar flush against the given window walls.
+    """
+    pillar_width, pillar_depth = pillar_dims
+    room_length = np.asarray(room_length, dtype=np.float64)
+    room_width = np.asarray(room_width, dtype=np.float64)
+    x = np.select([window_wall == LEFT, window_wall == RIGHT],
+                  [margin + pillar_width/2, room_length - margin - pillar_width/2], room_length/2)
+    y = np.select([window_wall == TOP, window_wall == BOTTOM],
+                  [room_width - margin - pillar_depth/2, margin + pillar_depth/2], room_width/2)
+    return round2(x), round2(y)
+
+
+def check_against_scalar(n=100000, seed=0, rooms=None):
+    """
+    Property check: draws n random rooms, walls and door positions (including ones
+    that trigger the dresser clamping) and compares every array function with its
+    scalar counterpart in helper_placement.py. Returns a dict of mismatch counts.
+    rooms, a (room_length, room_width, wall, door_pos, bed_x, bed_y) tuple of
+    arrays, checks those cases instead of random ones.
+    """
+    import helper_placement as hp
+
+    if rooms is not None:
+        L, W, wall, door_pos, bed_x, bed_y = (np.asarray(a, dtype=np.float64) for a in rooms)
+        wall = wall.astype(np.int8)
+        n = len(L)
+    else:
+        rng = np.random.default_rng(seed)
+        L = rng.uniform(1.0, 12.0, n)
+        # Mix in two-decimal values, which exercise the rounding ties.
+        L[::2] = round2(L[::2])
+        W = rng.uniform(1.0, 12.0, n)
+        W[1::2] = round2(W[1::2])
+        wall = rng.integers(0, 4, n).astype(np.int8)
+        door_pos = rng.uniform(-1.0, 13.0, n)
+        bed_x = round2(rng.uniform(0.0, 12.0, n))
+        bed_y = round2(rng.uniform(0.0, 12.0, n))
+    names = [WALLS[w] for w in wall]
+    Ls, Ws, ps, bxs, bys = L.tolist(), W.tolist(), door_pos.tolist(), bed_x.tolist(), bed_y.tolist()
+
+    cases = {
+        'place_furniture_fixed': (
+            [place_furniture_fixed_array(L, W, f, wall) for f in furniture_dims],
+            [[hp.place_furniture_fixed(Ls[i], Ws[i], f, names[i]) for i in range(n)] for f in furniture_dims]),
+        'place_nightstand_left': (
+            [place_nightstand_left_array(bed_x, bed_y, wall)],
+            [[hp.place_nightstand_left((bxs[i], bys[i]), names[i]) for i in range(n)]]),
+        'place_nightstand_right_of_bed': (
+            [place_nightstand_right_of_bed_array(bed_x, bed_y, wall)],
+            [[hp.place_nightstand_right_of_bed((bxs[i], bys[i]), names[i]) for i in range(n)]]),
+        'place_table_near_door': (
+            [place_table_near_door_array(L, W, wall)],
+            [[hp.place_table_near_door(Ls[i], Ws[i], names[i]) for i in range(n)]]),
+        'place_dresser_right_of_door': (
+            [place_dresser_right_of_door_array(L, W, wall, door_pos)],
+            [[hp.place_dresser_right_of_door(Ls[i], Ws[i], names[i], ps[i]) for i in range(n)]]),
+        'place_desk_near_window': (
+            [place_desk_near_window_array(L, W, wall)],
+            [[hp.place_desk_near_window(Ls[i], Ws[i], names[i]) for i in range(n)]]),
+        'place_pillar_at_window': (
+            [place_pillar_at_window_array(L, W, wall)],
+            [[hp.place_pillar_at_window(Ls[i], Ws[i], names[i]) for i in range(n)]]),
+    }
+
+    mismatches = {}
+    for name, (array_results, scalar_results) in cases.items():
+        count = 0
+        for (x, y), expected in zip(array_results, scalar_results):
+            expected = np.array(expected, dtype=np.float64)
+            count += int(np.count_nonzero((x != expected[:, 0]) | (y != expected[:, 1])))
+        mismatches[name] = count
+    return mismatches
+
+
+if __name__ == '__main__':
+    import sys
+
+    results = check_against_scalar()
+    for name, count in results.items():
+        print(f"{name:32s} {'ok' if count == 0 else f'{count} mismatches'}")
+    sys.exit(1 if any(results.values()) else 0)
@@ -1,7 +1,11 @@
-import torch
-from model import MLP
-import joblib
-import pandas as pd
+import os
+import sys
+import threading
+import time
+import numpy as np
+from helper_backends import artifact_path, load_backend, resolve_backend
+from helper_instrument import count, span
+from helper_roomspec import RoomSpecBatch
 
 # Global parameters:
 margin = 0.2
@@ -17,53 +21,207 @@ furniture_dims = {
     'desk': (1.0, 0.5)
 }
 
-def predict_optimal_placements(obstacles_dict, stage, door_wall, window_wall, window1_wall, window2_wall, blocked_window_choice):
+input_features = [
+    # "stage",
+    "room_length", "room_width",
+    # "door_exist",
+    "door_wall_left", "door_wall_right", "door_wall_top", "door_wall_bottom",
+    "door_pos",
+    # "window_exist",
+    "window1_wall_left", "window1_wall_right", "window1_wall_top", "window1_wall_bottom",
+    "window2_wall_left", "window2_wall_right", "window2_wall_top", "window2_wall_bottom",
+    "window1_pos", "window2_pos",
+    "pillar_x", "pillar_y",
+    "blocked_window_left", "blocked_window_right", "blocked_window_top", "blocked_window_bottom"
+]
+output_features = [
+    "bed_x", "bed_y",
+    "dresser_x", "dresser_y",
+    "nightstand_x", "nightstand_y",
+    "table_x", "table_y",
+    "desk_x", "desk_y"
+]
+
+
+def _is_frame(X):
+    # pandas is only imported by callers that pass DataFrames, so there is nothing to check otherwise.
+    pd = sys.modules.get("pandas")
+    return pd is not None and isinstance(X, pd.DataFrame)
+
+
+class Predictor:
+    """
+    Keeps the model and scalers in memory so they are loaded once, not per call.
+    backend selects the exported variant to run (see helper_backends.py); by default
+    $FURNITURE_BACKEND, else the eager PyTorch model.
+    """
+
+    def __init__(self, model_path="best_model.pth", scaler_X_path="scaler_X.joblib", scaler_y_path="scaler_y.joblib",
+                 backend=None):
+        self.model_path = model_path
+        self.backend = resolve_backend(backend)
+        self.scaler_X_path = scaler_X_path
+        self.scaler_y_path = scaler_y_path
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._state = None
+        self._mtimes = None
+        self.load_seconds = None
+        self.load()
+
+    def _artifact_paths(self):
+        return artifact_path(self.model_path, self.backend), self.scaler_X_path, self.scaler_y_path
+
+    def _file_mtimes(self):
+        return tuple(os.path.getmtime(p) for p in self._artifact_paths())
+
+    def loaded_artifacts(self):
+        """
+        {path: mtime} of the checkpoint and scaler files currently loaded.
+        """
+        return dict(zip(self._artifact_paths(), self._mtimes))
+
+    def load(self):
+        """
+        (Re)loads the checkpoint and scalers from disk and swaps them in atomically.
+        """
+        start = time.perf_counter()
+        mtimes = self._file_mtimes()
+        import joblib
+
+        with span("predict.joblib_load"):
+            scaler_X = joblib.load(self.scaler_X_path)
+            scaler_y = joblib.load(self.scaler_y_path)
+
+        with span(f"predict.load.{self.backend}"):
+            model = load_backend(self.backend, self.model_path, len(input_features), len(output_features))
+        count("predict.model_loads")
+
+        with self._lock:
+            self._state = (model, scaler_X, scaler_y)
+            self._mtimes = mtimes
+        self.load_seconds = time.perf_counter() - start
+
+    def reload_if_changed(self):
+        """
+        Reloads when any of the files changed on disk. Returns True if a reload happened.
+        """
+        if self._file_mtimes() == self._mtimes:
+            return False
+        self.load()
+        return True
+
+    def _buffer(self):
+        # One preallocated input row per thread; the encoders write into it in place.
+        buf = getattr(self._local, "buf", None)
+        if buf is None:
+            buf = self._local.buf = np.zeros((1, len(input_features)))
+        return buf
+
+    @staticmethod
+    def _forward(state, X, prefix):
+        # Maps raw float64 inputs to float32 placements in metres.
+        model, scaler_X, scaler_y = state
+        if model.includes_scalers:
+            with span(f"{prefix}.forward"):
+                return model.run(X.astype(np.float32))
+
+        # Same arithmetic as StandardScaler.transform / inverse_transform, without their input validation.
+        with span(f"{prefix}.transform"):
+            X_scaled = ((X - scaler_X.mean_) / scaler_X.scale_).astype(np.float32)
+        with span(f"{prefix}.forward"):
+            pred = model.run(X_scaled)
+        with span(f"{prefix}.inverse_transform"):
+            # sklearn casts the statistics to the float32 input dtype; do the same to match it exactly.
+            pred *= scaler_y.scale_.astype(np.float32)
+            pred += scaler_y.mean_.astype(np.float32)
+        return pred
+
+    def _predict_row(self, x):
+        # Readers take a snapshot so a concurrent reload never mixes old and new weights.
+        with self._lock:
+            state = self._state
+
+        count("predict.calls")
+        pred = self._forward(state, x, "predict")
+        return dict(zip(output_features, pred[0].tolist()))
+
+    def predict(self, obstacles_dict):
+        """
+        Returns the predicted furniture placements for one room as a dict keyed by output_features.
+        """
+        with span("predict.encode"):
+            x = self._buffer()
+            # Ensure the order matches the training list.
+            for i, f in enumerate(input_features):
+                x[0, i] = obstacles_dict[f]
+        return self._predict_row(x)
+
+    def predict_spec(self, spec):
+        """
+        Same as predict, for a RoomSpec.
+        """
+        with span("predict.encode"):
+            x = self._buffer()
+            spec.encode(x[0])
+        return self._predict_row(x)
 
+    def iter_predict_batch(self, X, batch_size=4096):
+        """
+        Yields predictions for X chunk by chunk, each an (rows, 10) float32 array in output_features order.
+        X is an (N, 23) array in input_features order, a RoomSpecBatch or a DataFrame with those columns.
+        """
+        with self._lock:
+            state = self._state
 
-    # -------------------------------
-    # Load saved scalers and model
-    # -------------------------------
-    scaler_X = joblib.load("scaler_X.joblib")
-    scaler_y = joblib.load("scaler_y.joblib")
-
-    input_features = [
-        # "stage",
-        "room_length", "room_width",
-        # "door_exist",
-        "door_wall_left", "door_wall_right", "door_wall_top", "door_wall_bottom",
-        "door_pos",
-        # "window_exist",
-        "window1_wall_left", "window1_wall_right", "window1_wall_top", "window1_wall_bottom",
-        "window2_wall_left", "window2_wall_right", "window2_wall_top", "window2_wall_bottom",
-        "window1_pos", "window2_pos",
-        "pillar_x", "pillar_y",
-        "blocked_window_left", "blocked_window_right", "blocked_window_top", "blocked_window_bottom"
-    ]
-    output_features = [
-        "bed_x", "bed_y",
-        "dresser_x", "dresser_y",
-        "nightstand_x", "nightstand_y",
-        "table_x", "table_y",
-        "desk_x", "desk_y"
-    ]
-    input_dim = len(input_features)
-    output_dim = len(output_features)
-
-    model = MLP(input_dim, output_dim)
-    model.load_state_dict(torch.load("best_model.pth", map_location=torch.device('cpu')))
-    model.eval()
-
-    input_df = pd.DataFrame([obstacles_dict])
-    # Ensure the order matches the training list.
-    ordered_inputs = input_df[input_features].values
-
-    X_input_scaled = scaler_X.transform(ordered_inputs)
-    x_tensor = torch.tensor(X_input_scaled, dtype=torch.float32)
-    with torch.no_grad():
-        pred_scaled = model(x_tensor).numpy()
-    pred = scaler_y.inverse_transform(pred_scaled)[0]
-
-    pred_outputs = dict(zip(output_features, pred))
+        if isinstance(X, RoomSpecBatch):
+            X = X.encode()
+        elif _is_frame(X):
+            X = X[input_features].to_numpy()
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != len(input_features):
+            raise ValueError(f"expected an (N, {len(input_features)}) input array, got shape {X.shape}")
+
+        for start in range(0, len(X), batch_size):
+            count("predict_batch.rows", min(batch_size, len(X) - start))
+            yield self._forward(state, X[start:start + batch_size], "predict_batch")
+
+    def predict_batch(self, X, batch_size=4096, as_frame=None):
+        """
+        Predicts placements for many rooms at once. Returns an (N, 10) array, or a DataFrame
+        with output_features columns when as_frame is True (default: only for DataFrame input).
+        """
+        if as_frame is None:
+            as_frame = _is_frame(X)
+        index = X.index if _is_frame(X) else None
+        chunks = list(self.iter_predict_batch(X, batch_size))
+        pred = np.concatenate(chunks) if chunks else np.empty((0, len(output_features)), dtype=np.float32)
+        if as_frame:
+            import pandas as pd
+
+            return pd.DataFrame(pred, columns=output_features, index=index)
+        return pred
+
+
+_default_predictor = None
+_default_lock = threading.Lock()
+
+
+def get_predictor():
+    """
+    Returns the process-wide Predictor, creating it on first use.
+    """
+    global _default_predictor
+    if _default_predictor is None:
+        with _default_lock:
+            if _default_predictor is None:
+                _default_predictor = Predictor()
+    return _default_predictor
+
+
+def predict_optimal_placements(obstacles_dict, stage, door_wall, window_wall, window1_wall, window2_wall, blocked_window_choice):
+
+    pred_outputs = get_predictor().predict(obstacles_dict)
 
     sample_full = obstacles_dict.copy()
     sample_full.update(pred_outputs)
@@ -76,3 +234,52 @@ def predict_optimal_placements(obstacles_dict, stage, door_wall, window_wall, wi
 
     return sample_full, pred_outputs
 
+
+def predict_room(spec):
+    """
+    predict_optimal_placements for a RoomSpec. Returns (sample_full, pred_outputs).
+    """
+    pred_outputs = get_predictor().predict_spec(spec)
+    return spec.sample_full(pred_outputs), pred_outputs
+
+
+def predict_batch(X, batch_size=4096, as_frame=None):
+    """
+    Batched counterpart of predict_optimal_placements, see Predictor.predict_batch.
+    """
+    return get_predictor().predict_batch(X, batch_size=batch_size, as_frame=as_frame)
+
+
+if __name__ == '__main__':
+    # Reports cold-start (load + first call) and warm-call latency separately.
+    example = {
+        "room_length": 6.5, "room_width": 6.5, "door_exist": 1,
+        "door_wall_left": 0, "door_wall_right": 0, "door_wall_top": 0, "door_wall_bottom": 1,
+        "door_pos": 3.25, "window_exist": 1,
+        "window1_wall_left": 1, "window1_wall_right": 0, "window1_wall_top": 0, "window1_wall_bottom": 0,
+        "window2_wall_left": 0, "window2_wall_right": 1, "window2_wall_top": 0, "window2_wall_bottom": 0,
+        "window1_pos": 3.25, "window2_pos": 3.25, "pillar_x": 0.6, "pillar_y": 3.25,
+        "blocked_window_left": 1, "blocked_window_right": 0, "blocked_window_top": 0, "blocked_window_bottom": 0
+    }
+    start = time.perf_counter()
+    predictor = Predictor()
+    predictor.predict(example)
+    cold = time.perf_counter() - start
+
+    n_warm = 200
+    start = time.perf_counter()
+    for _ in range(n_warm):
+        predictor.predict(example)
+    warm = (time.perf_counter() - start) / n_warm
+
+    from helper_roomspec import RoomSpec
+
+    spec = RoomSpec.from_training_input(example)
+    start = time.perf_counter()
+    for _ in range(n_warm):
+        predictor.predict_spec(spec)
+    warm_spec = (time.perf_counter() - start) / n_warm
+
+    print(f"Cold start: {cold * 1000:.1f} ms (of which loading: {predictor.load_seconds * 1000:.1f} ms)")
+    print(f"Warm call:  {warm * 1000:.3f} ms (mean of {n_warm})")
+    print(f"Warm call from a RoomSpec: {warm_spec * 1000:.3f} ms")
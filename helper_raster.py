@@ -0,0 +1,165 @@
+import struct
+import zlib
+import numpy as np
+from helper_geometry import layout_geometry
+
+# -------------------------------
+# Raster thumbnails without matplotlib
+# -------------------------------
+# Draws the same rectangles as visualize_layout / visualize_layout_stage2
+# (room outline, door, windows, pillar and the furniture_dims outlines)
+# straight into a uint8 RGB buffer. The view matches the matplotlib one:
+# x in [-1, room_length + 1], y in [-1, room_width + 1], equal aspect,
+# centred in the image. Text labels are not drawn.
+
+# Matplotlib named colours as RGB.
+colors = {
+    'black': (0, 0, 0),
+    'brown': (165, 42, 42),
+    'blue': (0, 0, 255),
+    'grey': (128, 128, 128),
+    'green': (0, 128, 0),
+    'purple': (128, 0, 128),
+    'orange': (255, 165, 0),
+    'red': (255, 0, 0),
+    'magenta': (255, 0, 255)
+}
+furniture_rgb = {
+    'bed': colors['green'],
+    'dresser': colors['purple'],
+    'nightstand': colors['orange'],
+    'table': colors['red'],
+    'desk': colors['magenta']
+}
+
+
+class _View:
+    """
+    Maps metres to pixel rows/columns for one layout.
+    """
+
+    def __init__(self, room_length, room_width, height, width):
+        span_x = room_length + 2
+        span_y = room_width + 2
+        self.scale = min(width / span_x, height / span_y)
+        self.x0 = -1 - (width / self.scale - span_x) / 2
+        self.y0 = -1 - (height / self.scale - span_y) / 2
+        self.height = height
+        self.width = width
+
+    def box(self, rect):
+        x, y, w, h = rect
+        c0 = int(round((x - self.x0) * self.scale))
+        c1 = int(round((x + w - self.x0) * self.scale))
+        r0 = int(round(self.height - (y + h - self.y0) * self.scale))
+        r1 = int(round(self.height - (y - self.y0) * self.scale))
+        return max(r0, 0), min(max(r1, r0 + 1), self.height), max(c0, 0), min(max(c1, c0 + 1), self.width)
+
+
+def _fill(image, view, rect, rgb, alpha=1.0):
+    r0, r1, c0, c1 = view.box(rect)
+    if r0 >= r1 or c0 >= c1:
+        return
+    region = image[r0:r1, c0:c1]
+    if alpha >= 1.0:
+        region[...] = rgb
+    else:
+        region[...] = (region * (1 - alpha) + np.asarray(rgb) * alpha).astype(np.uint8)
+
+
+def _outline(image, view, rect, rgb, line):
+    r0, r1, c0, c1 = view.box(rect)
+    if r0 >= r1 or c0 >= c1:
+        return
+    half = line // 2
+    top, bottom = max(r0 - half, 0), min(r1 + line - half, image.shape[0])
+    left, right = max(c0 - half, 0), min(c1 + line - half, image.shape[1])
+    image[top:min(r0 - half + line, bottom), left:right] = rgb
+    image[max(r1 - half, top):bottom, left:right] = rgb
+    image[top:bottom, left:min(c0 - half + line, right)] = rgb
+    image[top:bottom, max(c1 - half, left):right] = rgb
+
+
+def render_raster(sample, stage=None, size=(256, 256), out=None):
+    """
+    Draws one layout into an (H, W, 3) uint8 array (out, if given, is reused).
+    """
+    height, width = size
+    image = out if out is not None else np.empty((height, width, 3), dtype=np.uint8)
+    image[...] = 255
+    geometry = layout_geometry(sample, stage)
+    view = _View(sample['room_length'], sample['room_width'], height, width)
+    # Matplotlib draws 2pt lines on an 800px figure; scale that to the thumbnail.
+    line = max(1, int(round(min(height, width) / 800 * 2.8)))
+
+    _outline(image, view, geometry['room'], colors['black'], line)
+    if geometry['door'] is not None:
+        _fill(image, view, geometry['door'], colors['brown'], 0.7)
+    for window in geometry['windows']:
+        _fill(image, view, window, colors['blue'], 0.7)
+    if geometry['pillar'] is not None:
+        _fill(image, view, geometry['pillar'], colors['grey'], 0.8)
+    for name, rect in geometry['furniture'].items():
+        _outline(image, view, rect, furniture_rgb[name], line)
+    return image
+
+
+def render_raster_batch(samples, stage=None, size=(256, 256)):
+    """
+    Draws many layouts into one (N, H, W, 3) uint8 array.
+    """
+    samples = list(samples)
+    images = np.empty((len(samples), size[0], size[1], 3), dtype=np.uint8)
+    for i, sample in enumerate(samples):
+        render_raster(sample, stage, size, out=images[i])
+    return images
+
+
+def encode_png(image, level=6):
+    """
+    Encodes an (H, W, 3) uint8 array as PNG bytes using only zlib.
+    """
+    height, width, _ = image.shape
+    # Each scanline is prefixed with filter type 0 (none).
+    raw = np.empty((height, width * 3 + 1), dtype=np.uint8)
+    raw[:, 0] = 0
+    raw[:, 1:] = image.reshape(height, width * 3)
+
+    def chunk(tag, data):
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff)
+
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header)
+            + chunk(b'IDAT', zlib.compress(raw.tobytes(), level)) + chunk(b'IEND', b''))
+
+
+def render_png_batch(samples, stage=None, size=(256, 256), level=6):
+    """
+    Renders many layouts and returns a list of PNG bytes.
+    """
+    return [encode_png(image, level) for image in render_raster_batch(samples, stage, size)]
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+    from helper_dataset import generate_dataset, to_frame
+
+    parser = argparse.ArgumentParser(description="Raster thumbnail throughput")
+    parser.add_argument('--samples', type=int, default=5000)
+    parser.add_argument('--size', type=int, default=128)
+    args = parser.parse_args()
+
+    samples = to_frame(generate_dataset(args.samples, stage=2)).to_dict('records')
+    size = (args.size, args.size)
+
+    start = time.perf_counter()
+    images = render_raster_batch(samples, size=size)
+    raw = len(samples) / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    pngs = [encode_png(image, level=1) for image in images]
+    encoded = len(samples) / (time.perf_counter() - start)
+
+    print(f"{args.size}x{args.size} arrays: {raw:,.0f} images/s")
+    print(f"PNG encoding (zlib level 1): {encoded:,.0f} images/s, mean {np.mean([len(p) for p in pngs]):.0f} bytes")
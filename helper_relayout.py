@@ -0,0 +1,322 @@
+import numpy as np
+from helper_instrument import count, span
+from helper_placement import (place_desk_near_window, place_dresser_right_of_door, place_furniture_fixed,
+                              place_nightstand_left, place_nightstand_right_of_bed, place_table_near_door)
+from helper_placement_array import LEFT, RIGHT, TOP, WALLS
+from helper_roomspec import NO_WALL, RoomSpec
+
+# -------------------------------
+# Incremental re-layout
+# -------------------------------
+# The rule placements of helper_placement.py as a dependency graph. The
+# inputs are the RoomSpec fields; every other node is computed from the
+# nodes listed next to it:
+#
+#   stage        window2_wall
+#   bed_wall     door_wall (the wall opposite it)
+#   window_wall  stage, window1_wall, window2_wall, blocked_wall (the unblocked window)
+#   bed          room_length, room_width, bed_wall
+#   nightstand   stage, bed, bed_wall
+#   dresser      stage, room_length, room_width, door_wall, door_pos
+#   table        room_length, room_width, door_wall
+#   desk         stage, room_length, room_width, window_wall
+#
+# Relayout.update() recomputes only the nodes downstream of the inputs that
+# changed, and stops early where a recomputed value comes out the same (e.g.
+# the bed when only the blocked window changes). The changed nodes map to the
+# LayoutRenderer patches that need moving (patches()), so RelayoutView redraws
+# just those over a cached background (unless the room size changed), and
+# skips drawing altogether when nothing visible changed.
+
+inputs = RoomSpec.__slots__
+furniture = ['bed', 'dresser', 'nightstand', 'table', 'desk']
+
+
+def _stage(window2_wall):
+    return 1 if window2_wall == NO_WALL else 2
+
+
+def _bed_wall(door_wall):
+    return door_wall ^ 1
+
+
+def _window_wall(stage, window1_wall, window2_wall, blocked_wall):
+    if stage == 1 or blocked_wall == window2_wall:
+        return window1_wall
+    return window2_wall
+
+
+def _bed(room_length, room_width, bed_wall):
+    return place_furniture_fixed(room_length, room_width, 'bed', WALLS[bed_wall])
+
+
+def _nightstand(stage, bed, bed_wall):
+    if stage == 1:
+        return place_nightstand_right_of_bed(bed, WALLS[bed_wall])
+    return place_nightstand_left(bed, WALLS[bed_wall])
+
+
+def _dresser(stage, room_length, room_width, door_wall, door_pos):
+    if stage == 1:
+        wall = TOP if door_wall in (LEFT, RIGHT) else LEFT
+        return place_furniture_fixed(room_length, room_width, 'dresser', WALLS[wall])
+    return place_dresser_right_of_door(room_length, room_width, WALLS[door_wall], door_pos)
+
+
+def _table(room_length, room_width, door_wall):
+    return place_table_near_door(room_length, room_width, WALLS[door_wall])
+
+
+def _desk(stage, room_length, room_width, window_wall):
+    if stage == 1:
+        return (0, 0)
+    return place_desk_near_window(room_length, room_width, WALLS[window_wall])
+
+
+# Node -> (the nodes it reads, function of their values), in topological order.
+nodes = {
+    'stage': (('window2_wall',), _stage),
+    'bed_wall': (('door_wall',), _bed_wall),
+    'window_wall': (('stage', 'window1_wall', 'window2_wall', 'blocked_wall'), _window_wall),
+    'bed': (('room_length', 'room_width', 'bed_wall'), _bed),
+    'nightstand': (('stage', 'bed', 'bed_wall'), _nightstand),
+    'dresser': (('stage', 'room_length', 'room_width', 'door_wall', 'door_pos'), _dresser),
+    'table': (('room_length', 'room_width', 'door_wall'), _table),
+    'desk': (('stage', 'room_length', 'room_width', 'window_wall'), _desk)
+}
+
+# Inputs drawn by LayoutRenderer and the patches they move (see helper_geometry.layout_geometry).
+input_patches = {
+    'room_length': {'room', 'door', 'windows', 'pillar'},
+    'room_width': {'room', 'door', 'windows', 'pillar'},
+    'door_wall': {'door'},
+    'door_pos': {'door'},
+    'window1_wall': {'windows'},
+    'window1_pos': {'windows'},
+    'window2_wall': {'windows'},
+    'window2_pos': {'windows'},
+    'pillar_x': {'pillar'},
+    'pillar_y': {'pillar'}
+}
+
+
+def downstream(changed):
+    """
+    Every node that (transitively) reads one of the changed nodes, including them.
+    """
+    result = set(changed)
+    for node, (reads, _) in nodes.items():
+        if any(name in result for name in reads):
+            result.add(node)
+    return result
+
+
+class Relayout:
+    """
+    Rule layout of one room that is kept up to date as its inputs change.
+    """
+
+    def __init__(self, spec):
+        self.values = {name: getattr(spec, name) for name in inputs}
+        for node, (reads, fn) in nodes.items():
+            self.values[node] = fn(*(self.values[name] for name in reads))
+        self.recomputed = len(nodes)
+        self.changed = set(self.values)
+
+    @property
+    def stage(self):
+        return self.values['stage']
+
+    def update(self, spec=None, **changes):
+        """
+        Applies a new RoomSpec and/or individual input changes (e.g. blocked_wall=TOP). Returns the set of
+        nodes whose value changed, also kept as self.changed; self.recomputed counts the nodes evaluated.
+        """
+        if spec is not None:
+            changes = dict({name: getattr(spec, name) for name in inputs}, **changes)
+        unknown = set(changes) - set(inputs)
+        if unknown:
+            raise KeyError(f"not a layout input: {', '.join(sorted(unknown))}")
+
+        changed = {name for name, value in changes.items() if self.values[name] != value}
+        self.values.update(changes)
+        recomputed = 0
+        with span("relayout.update"):
+            for node, (reads, fn) in nodes.items():
+                if not any(name in changed for name in reads):
+                    continue
+                value = fn(*(self.values[name] for name in reads))
+                recomputed += 1
+                if value != self.values[node]:
+                    self.values[node] = value
+                    changed.add(node)
+        count("relayout.recomputed", recomputed)
+        self.recomputed = recomputed
+        self.changed = changed
+        return changed
+
+    def spec(self):
+        return RoomSpec(*(self.values[name] for name in inputs))
+
+    def placements(self):
+        """
+        Length-10 array in output_features order.
+        """
+        return np.array([self.values[name][k] for name in furniture for k in (0, 1)], dtype=np.float64)
+
+    def pred_outputs(self):
+        return {f"{name}_{axis}": self.values[name][k] for name in furniture for k, axis in enumerate('xy')}
+
+    def sample_full(self):
+        return self.spec().sample_full(self.pred_outputs())
+
+    def patches(self, changed=None):
+        """
+        LayoutRenderer.update(only=...) names for the changed nodes; None (everything) after a stage change.
+        """
+        changed = self.changed if changed is None else changed
+        if 'stage' in changed:
+            return None
+        only = {name for name in changed if name in furniture}
+        for name in changed:
+            only |= input_patches.get(name, set())
+        return only
+
+
+class RelayoutView:
+    """
+    A Relayout with its own LayoutRenderer that redraws only what moved. The axes and the room outline
+    are drawn into a cached background, which is only redrawn when the room size changes; otherwise the
+    background is restored and the door, window, pillar and furniture patches are drawn on top
+    (matplotlib blitting). Nothing is drawn if nothing visible changed.
+    """
+
+    def __init__(self):
+        from helper_visualize import LayoutRenderer
+
+        # Patches are drawn by hand on top of the background, so this renderer cannot be shared.
+        self.renderer = LayoutRenderer()
+        r = self.renderer
+        rects = [rect for rect, _ in r.furniture.values()]
+        texts = [text for _, text in r.furniture.values()]
+        # Same order as a full draw: obstacles, furniture outlines, then the labels.
+        self._artists = [r.door] + r.windows + [r.pillar] + rects + texts
+        for artist in self._artists:
+            artist.set_animated(True)
+        self._background = None
+        self.layout = None
+        self.png = None
+        self._drawn = None
+
+    def _draw(self, only):
+        from helper_raster import encode_png
+
+        canvas = self.renderer.fig.canvas
+        if self._background is None or only is None or 'room' in only:
+            with span("relayout.draw_background"):
+                canvas.draw()
+                self._background = canvas.copy_from_bbox(self.renderer.fig.bbox)
+        else:
+            canvas.restore_region(self._background)
+        with span("relayout.draw_patches"):
+            for artist in self._artists:
+                if artist.get_visible():
+                    self.renderer.ax.draw_artist(artist)
+        with span("relayout.encode"):
+            image = np.ascontiguousarray(np.asarray(canvas.buffer_rgba())[..., :3])
+            return encode_png(image)
+
+    def show(self, spec, repair=False):
+        """
+        Returns (sample_full, pred_outputs, png_bytes, {piece: metres moved by the repair}) for spec.
+        With repair, the rule layout goes through helper_repair.repair_sample before it is drawn.
+        """
+        if self.layout is None:
+            self.layout = Relayout(spec)
+            only = None
+        else:
+            only = self.layout.patches(self.layout.update(spec))
+        sample_full, pred_outputs = self.layout.sample_full(), self.layout.pred_outputs()
+        moved = {}
+        if repair:
+            from helper_repair import repair_sample
+
+            sample_full, pred_outputs, report = repair_sample(sample_full)
+            moved = {name: float(m) for name, m in zip(furniture, report.moved_m[0]) if m > 0}
+        if only is not None:
+            # Redraw the furniture that moved since the last frame (after the repair, if any).
+            only = {name for name in only if name not in furniture}
+            only |= {name for name in furniture
+                     if (self._drawn[f"{name}_x"], self._drawn[f"{name}_y"]) != (pred_outputs[f"{name}_x"],
+                                                                                  pred_outputs[f"{name}_y"])}
+        if self.png is None or only is None or only:
+            self.renderer.update(sample_full, self.layout.stage, only=only)
+            self.png = self._draw(only)
+            self._drawn = pred_outputs
+            count("render.images")
+        else:
+            count("relayout.render_skipped")
+        return sample_full, pred_outputs, self.png, moved
+
+
+def sweep(spec, name, values):
+    """
+    Rule placements of spec with input name set to each of values, as a (len(values), 10) array.
+    Also returns how often each furniture piece had to be recomputed.
+    """
+    layout = Relayout(spec)
+    out = np.empty((len(values), len(furniture) * 2))
+    moved = dict.fromkeys(furniture, 0)
+    for i, value in enumerate(values):
+        for node in layout.update(**{name: value}) & set(furniture):
+            moved[node] += 1
+        out[i] = layout.placements()
+    return out, moved
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+    from helper_dataset import generate_mixed, room_specs, targets
+
+    parser = argparse.ArgumentParser(description="Check the dependency graph against the rules and time updates")
+    parser.add_argument('--samples', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    columns = generate_mixed(args.samples, np.random.default_rng(args.seed))
+    specs = room_specs(columns)
+    truth = targets(columns, dtype=np.float64)
+    layouts = np.array([Relayout(specs[i]).placements() for i in range(len(specs))])
+    print(f"Max difference to helper_dataset over {len(specs)} rooms: {np.abs(layouts - truth).max():.2e} m")
+
+    spec = RoomSpec.from_ui(6.5, 6.5, 'bottom', '2', 'Window 1')
+    other = RoomSpec.from_ui(6.5, 6.5, 'bottom', '2', 'Window 2')
+    layout = Relayout(spec)
+    changed = layout.update(other)
+    print(f"Blocked window 1 -> 2: recomputed {layout.recomputed} of {len(nodes)} nodes, "
+          f"changed {sorted(changed)}, patches {sorted(layout.patches())}")
+
+    n = 10000
+    start = time.perf_counter()
+    for i in range(n):
+        layout.update(spec if i % 2 else other)
+    incremental = (time.perf_counter() - start) / n
+    start = time.perf_counter()
+    for i in range(n):
+        Relayout(spec if i % 2 else other)
+    full = (time.perf_counter() - start) / n
+    print(f"Update {incremental * 1e6:.1f} us vs full layout {full * 1e6:.1f} us")
+
+    from helper_visualize import LayoutRenderer
+
+    start = time.perf_counter()
+    LayoutRenderer().render(Relayout(spec).sample_full(), 2)
+    timings = {"LayoutRenderer.render": time.perf_counter() - start}
+    view = RelayoutView()
+    for label, target in (("first show", spec), ("blocked window toggle", other), ("no visible change", other),
+                          ("door moved", RoomSpec.from_ui(6.5, 6.5, 'top', '2', 'Window 2'))):
+        start = time.perf_counter()
+        view.show(target)
+        timings[label] = time.perf_counter() - start
+    print("Render ms:", {label: round(seconds * 1000, 1) for label, seconds in timings.items()})
@@ -0,0 +1,276 @@
+import time
+import numpy as np
+from helper_geometry import margin
+from helper_instrument import count, span
+from helper_placement_array import TOP, BOTTOM
+from helper_roomspec import RoomSpec, RoomSpecBatch
+from helper_validate import LayoutArrays, Violations, furniture_names, tol
+
+# -------------------------------
+# Constraint repair
+# -------------------------------
+# Moves the pieces of invalid layouts (see helper_validate.py) as little as
+# possible until they pass, vectorized over the batch. Only pieces that fail a
+# check are moved; the others stay put and act as obstacles:
+#   - bed and dresser stay flush: they only slide along their wall
+#   - the desk slides along its (window) wall, the table moves freely
+#   - the nightstand is snapped beside the bed, on its current side, with a
+#     gap of 0..margin, and flips to the other side if that slot is blocked
+#   - pieces are pushed out of the door zone, the pillar, the unblocked window
+#     zones, the walls and any piece placed before them (priority order below)
+# Each round moves every failing piece once, then re-validates; rounds stop
+# when all layouts pass, after max_rounds, or when the time budget is spent.
+# The budget covers the whole batch and is checked between rounds, so the first
+# round always runs. Layouts that are valid to begin with are returned
+# unchanged.
+
+priority = ['bed', 'nightstand', 'dresser', 'desk', 'table']
+# Pieces that keep their distance to their wall.
+wall_bound = {'bed', 'dresser', 'desk'}
+
+_index = {name: i for i, name in enumerate(furniture_names)}
+
+
+class RepairReport:
+    """
+    What repair() did. moved_m is the (N, 5) distance each piece moved (0 for untouched layouts).
+    """
+
+    def __init__(self, invalid_before, valid_after, moved_m, rounds, seconds):
+        self.invalid_before = invalid_before
+        self.valid_after = valid_after
+        self.moved_m = moved_m
+        self.rounds = rounds
+        self.seconds = seconds
+
+    @property
+    def repaired(self):
+        return self.invalid_before & self.valid_after
+
+    @property
+    def unresolved(self):
+        return ~self.valid_after
+
+    def metrics(self):
+        moved = self.moved_m[self.invalid_before]
+        pieces = moved[moved > 0]
+        result = {
+            "layouts": len(self.valid_after),
+            "invalid_before": int(self.invalid_before.sum()),
+            "repaired": int(self.repaired.sum()),
+            "unresolved": int(self.unresolved.sum()),
+            "pieces_moved": int(len(pieces)),
+            "mean_move_m": float(pieces.mean()) if len(pieces) else 0.0,
+            "max_move_m": float(pieces.max()) if len(pieces) else 0.0,
+            "rounds": self.rounds,
+            "seconds": self.seconds
+        }
+        for i, name in enumerate(furniture_names):
+            result[f"{name}_moved"] = int((moved[:, i] > 0).sum())
+        return result
+
+
+def _push_out(cx, cy, hx, hy, obstacle, move_x, move_y, L, W):
+    """
+    Shifts the rectangles centred at (cx, cy) out of obstacle ((4, n) coordinate-first, NaN = none)
+    by the shortest allowed move that keeps them in the room. Returns the new (cx, cy).
+    """
+    x0, y0, x1, y1 = cx - hx, cy - hy, cx + hx, cy + hy
+    hit = (np.minimum(x1, obstacle[2]) - np.maximum(x0, obstacle[0]) > tol) & \
+          (np.minimum(y1, obstacle[3]) - np.maximum(y0, obstacle[1]) > tol)
+    if not hit.any():
+        return cx, cy
+    # The four candidate moves: left, right, down, up (just far enough to touch).
+    moves = np.stack([obstacle[0] - x1, obstacle[2] - x0, obstacle[1] - y1, obstacle[3] - y0])
+    new_cx = cx + moves[:2]
+    new_cy = cy + moves[2:]
+    fits = np.concatenate([(new_cx - hx >= -tol) & (new_cx + hx <= L + tol) & move_x,
+                           (new_cy - hy >= -tol) & (new_cy + hy <= W + tol) & move_y])
+    cost = np.where(fits & hit, np.abs(moves), np.inf)
+    best = np.argmin(cost, axis=0)
+    ok = np.isfinite(np.min(cost, axis=0))
+    shift = np.take_along_axis(moves, best[None], axis=0)[0]
+    cx = np.where(ok & (best < 2), cx + shift, cx)
+    cy = np.where(ok & (best >= 2), cy + shift, cy)
+    return cx, cy
+
+
+def _clamp(c, h, size):
+    return np.clip(c, h, np.maximum(h, size - h))
+
+
+def _rect(cx, cy, hx, hy):
+    return np.stack([cx - hx, cy - hy, cx + hx, cy + hy])
+
+
+def _attach_nightstand(bed, ns, along_x, L, W, obstacles):
+    """
+    Nightstand centres beside the bed: same depth as the bed, gap clamped to 0..margin, on the
+    current side unless that slot leaves the room or hits an obstacle.
+    """
+    bcx, bcy, bhx, bhy = bed
+    ncx, ncy, nhx, nhy = ns
+    b_along = np.where(along_x, bcx, bcy)
+    n_along = np.where(along_x, ncx, ncy)
+    b_half = np.where(along_x, bhx, bhy)
+    n_half = np.where(along_x, nhx, nhy)
+    n_size = np.where(along_x, L, W)
+
+    offset = n_along - b_along
+    side = np.where(offset > 0, 1.0, -1.0)
+    distance = np.clip(np.abs(offset), b_half + n_half, b_half + n_half + margin)
+    best = None
+    for candidate_side in (side, -side):
+        along = b_along + candidate_side * distance
+        cx = np.where(along_x, along, bcx)
+        cy = np.where(along_x, bcy, along)
+        blocked = (along - n_half < -tol) | (along + n_half > n_size + tol)
+        rect = _rect(cx, cy, nhx, nhy)
+        for obstacle in obstacles:
+            blocked |= (np.minimum(rect[2], obstacle[2]) - np.maximum(rect[0], obstacle[0]) > tol) & \
+                       (np.minimum(rect[3], obstacle[3]) - np.maximum(rect[1], obstacle[1]) > tol)
+        if best is None:
+            best = (cx, cy, blocked)
+        else:
+            use_other = best[2] & ~blocked
+            best = (np.where(use_other, cx, best[0]), np.where(use_other, cy, best[1]), best[2] & blocked)
+    return best[0], best[1]
+
+
+def repair(specs, placements, max_rounds=8, time_budget_ms=None):
+    """
+    Repairs a batch: specs is a RoomSpecBatch, placements an (N, 10) array in output_features order.
+    time_budget_ms is for the whole batch (None: max_rounds only).
+    Returns (repaired placements as float64, RepairReport).
+    """
+    start = time.perf_counter()
+    deadline = np.inf if time_budget_ms is None else start + time_budget_ms / 1000
+    placements = np.asarray(placements, dtype=np.float64)
+    out = placements.copy()
+
+    with span("repair.validate"):
+        layout = LayoutArrays(specs, placements)
+        violations = Violations(layout)
+        invalid = ~violations.valid
+    count("repair.layouts", len(specs))
+    count("repair.invalid", int(invalid.sum()))
+
+    valid_after = ~invalid
+    rounds = 0
+    active = np.nonzero(invalid)[0]
+    if len(active):
+        with span("repair.solve"):
+            rounds, still_invalid = _solve(specs, layout, violations.any[active], out, active, max_rounds,
+                                           deadline)
+        valid_after[active] = ~still_invalid
+
+    centres = out.reshape(len(out), len(furniture_names), 2)
+    before = placements.reshape(len(out), len(furniture_names), 2)
+    moved = np.hypot(centres[..., 0] - before[..., 0], centres[..., 1] - before[..., 1])
+    moved *= layout.present
+    report = RepairReport(invalid, valid_after, moved, rounds, time.perf_counter() - start)
+    count("repair.repaired", int(report.repaired.sum()))
+    count("repair.unresolved", int(report.unresolved.sum()))
+    return out, report
+
+
+def _solve(specs, layout, failing, out, active, max_rounds, deadline):
+    # Works on the active rows only; writes the moved centres back into out. failing is the
+    # (len(active), 5) mask of pieces that fail a check, refreshed after every round.
+    L = specs.room_length[active]
+    W = specs.room_width[active]
+    rects = layout.rects[:, active]
+    present = layout.present[active]
+    # Centres straight from the placements, so untouched pieces keep their exact values.
+    cx = out[active, 0::2].copy()
+    cy = out[active, 1::2].copy()
+    hx = (rects[2] - rects[0]) / 2
+    hy = (rects[3] - rects[1]) / 2
+    # The wall each piece belongs to (helper_validate.furniture_wall_codes), fixed for the whole repair.
+    walls = layout.walls[active]
+    along_x = (walls == TOP) | (walls == BOTTOM)
+
+    door = layout.door[:, active]
+    pillar = layout.pillar[:, active]
+    windows = [layout.windows[:, active, k] for k in range(layout.windows.shape[2])]
+
+    rounds = 0
+    still_invalid = np.ones(len(active), dtype=bool)
+    rows = np.arange(len(active))
+    # The first round always runs; the budget decides whether more follow.
+    while rounds < max_rounds and still_invalid.any() and (rounds == 0 or time.perf_counter() < deadline):
+        rounds += 1
+        r = rows[still_invalid]
+        l, w = L[r], W[r]
+        placed = []
+        for name in priority:
+            i = _index[name]
+            x, y, px, py = cx[r, i], cy[r, i], hx[r, i], hy[r, i]
+            move = failing[r, i]
+            fixed = [door[:, r], pillar[:, r]] + ([] if name == 'desk' else [o[:, r] for o in windows])
+            if name == 'nightstand':
+                b = _index['bed']
+                x, y = _attach_nightstand((cx[r, b], cy[r, b], hx[r, b], hy[r, b]), (x, y, px, py),
+                                          along_x[r, b], l, w, fixed)
+            else:
+                x, y = _clamp(x, px, l), _clamp(y, py, w)
+                if name in wall_bound:
+                    move_x, move_y = along_x[r, i], ~along_x[r, i]
+                else:
+                    move_x = move_y = np.ones(len(r), dtype=bool)
+                for obstacle in fixed + placed:
+                    x, y = _push_out(x, y, px, py, obstacle, move_x, move_y, l, w)
+            x, y = np.where(move, x, cx[r, i]), np.where(move, y, cy[r, i])
+            cx[r, i], cy[r, i] = x, y
+            placed.append(np.where(present[r, i], _rect(x, y, px, py), np.nan))
+
+        moved = out[active[r]].copy()
+        moved[:, 0::2] = np.where(present[r], cx[r], moved[:, 0::2])
+        moved[:, 1::2] = np.where(present[r], cy[r], moved[:, 1::2])
+        subset = RoomSpecBatch(**{name: getattr(specs, name)[active[r]] for name in RoomSpecBatch.fields})
+        violations = Violations(LayoutArrays(subset, moved))
+        failing[r] = violations.any
+        still_invalid[r] = ~violations.valid
+        out[active[r]] = moved
+    return rounds, still_invalid
+
+
+def repair_sample(sample, max_rounds=8, time_budget_ms=2.0):
+    """
+    Repairs one sample_full as returned by predict_optimal_placements, within time_budget_ms.
+    Returns (sample_full, pred_outputs, RepairReport); the dicts are new only if something moved.
+    """
+    from helper_predict import output_features
+
+    specs = RoomSpecBatch.from_specs([RoomSpec.from_training_input(sample)])
+    placements, report = repair(specs, np.array([[sample[f] for f in output_features]]), max_rounds,
+                                time_budget_ms)
+    pred_outputs = dict(zip(output_features, placements[0].tolist()))
+    if report.moved_m.any():
+        sample = dict(sample, **pred_outputs)
+    return sample, pred_outputs, report
+
+
+if __name__ == '__main__':
+    import argparse
+    from helper_dataset import generate_mixed, room_specs, targets
+
+    parser = argparse.ArgumentParser(description="Repair rule-generated and predicted layouts and report what moved")
+    parser.add_argument('--samples', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--budget-ms', type=float, default=None,
+                        help="time budget for each batch of --samples layouts (default: max_rounds only)")
+    args = parser.parse_args()
+
+    columns = generate_mixed(args.samples, np.random.default_rng(args.seed))
+    specs = room_specs(columns)
+
+    from helper_predict import predict_batch
+
+    for label, placements in (("rules", targets(columns)), ("model", predict_batch(specs))):
+        _, report = repair(specs, placements, time_budget_ms=args.budget_ms)
+        metrics = report.metrics()
+        print(f"{label}: {metrics['invalid_before']} invalid, {metrics['repaired']} repaired, "
+              f"{metrics['unresolved']} unresolved in {metrics['rounds']} rounds, {metrics['seconds']:.2f} s; "
+              f"mean move {metrics['mean_move_m']:.3f} m, max {metrics['max_move_m']:.3f} m")
+        print("  pieces moved:", {name: metrics[f"{name}_moved"] for name in furniture_names})
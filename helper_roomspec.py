@@ -0,0 +1,249 @@
+from dataclasses import dataclass
+import numpy as np
+from helper_placement import place_pillar_at_window
+from helper_placement_array import WALLS
+
+# -------------------------------
+# Compact room encoding
+# -------------------------------
+# RoomSpec / RoomSpecBatch replace the 25-key one-hot dict main.py used to
+# build. Walls are integer codes (left, right, top, bottom = 0..3, NO_WALL
+# = -1), which is also the order of the one-hot groups in input_features, so
+# encoding is a handful of direct writes into a preallocated buffer:
+#
+#   0 room_length   1 room_width   2-5 door_wall       6 door_pos
+#   7-10 window1_wall   11-14 window2_wall   15 window1_pos   16 window2_pos
+#   17 pillar_x   18 pillar_y   19-22 blocked_window
+
+NO_WALL = -1
+N_FEATURES = 23
+margin = 0.2
+
+_DOOR, _WINDOW1, _WINDOW2, _BLOCKED = 2, 7, 11, 19
+
+
+def _wall_code(name):
+    return NO_WALL if name is None else WALLS.index(name)
+
+
+def _decode_one_hot(d, prefix, required=False):
+    for i, wall in enumerate(WALLS):
+        if d.get(f'{prefix}_{wall}'):
+            return i
+    if required:
+        raise ValueError(f"none of the {prefix}_* flags is set")
+    return NO_WALL
+
+
+def _check_walls(door_wall, window1_wall, window2_wall, blocked_wall, row=""):
+    # Every room has a door and at least one window; NO_WALL would index the wrong feature when encoded.
+    if not 0 <= door_wall < len(WALLS):
+        raise ValueError(f"{row}door_wall must be a wall code 0..3, got {door_wall}")
+    if not 0 <= window1_wall < len(WALLS):
+        raise ValueError(f"{row}window1_wall must be a wall code 0..3, got {window1_wall}")
+    # The second window and the blocked window are optional.
+    if not NO_WALL <= window2_wall < len(WALLS):
+        raise ValueError(f"{row}window2_wall must be NO_WALL (-1) or a wall code 0..3, got {window2_wall}")
+    if not NO_WALL <= blocked_wall < len(WALLS):
+        raise ValueError(f"{row}blocked_wall must be NO_WALL (-1) or a wall code 0..3, got {blocked_wall}")
+
+
+@dataclass(frozen=True)
+class RoomSpec:
+    """
+    One room's obstacles with integer-coded walls.
+    """
+    __slots__ = ('room_length', 'room_width', 'door_wall', 'door_pos', 'window1_wall', 'window1_pos',
+                 'window2_wall', 'window2_pos', 'pillar_x', 'pillar_y', 'blocked_wall')
+    room_length: float
+    room_width: float
+    door_wall: int
+    door_pos: float
+    window1_wall: int
+    window1_pos: float
+    window2_wall: int
+    window2_pos: float
+    pillar_x: float
+    pillar_y: float
+    blocked_wall: int
+
+    def __post_init__(self):
+        _check_walls(self.door_wall, self.window1_wall, self.window2_wall, self.blocked_wall)
+
+    @property
+    def stage(self):
+        return 1 if self.window2_wall == NO_WALL else 2
+
+    @property
+    def window_wall(self):
+        """
+        The window recorded as 'window_wall' in sample_full: the only window in Stage 1,
+        the unblocked one in Stage 2.
+        """
+        if self.stage == 1 or self.blocked_wall == self.window2_wall:
+            return self.window1_wall
+        return self.window2_wall
+
+    @classmethod
+    def from_ui(cls, room_length, room_width, door_wall, num_windows, blocked_window_choice=None):
+        """
+        Builds the spec the Streamlit sidebar describes (same rules as main.py always used).
+        """
+        door_pos = room_width / 2 if door_wall in ['left', 'right'] else room_length / 2
+        if num_windows == "1":
+            window_wall = {'bottom': 'right', 'top': 'left', 'left': 'top', 'right': 'bottom'}[door_wall]
+            window1_pos = room_length / 2 if window_wall in ['top', 'bottom'] else room_width / 2
+            return cls(room_length, room_width, _wall_code(door_wall), door_pos, _wall_code(window_wall), window1_pos,
+                       NO_WALL, 0, 0, 0, NO_WALL)
+
+        if door_wall in ['left', 'right']:
+            window1_wall, window2_wall = 'top', 'bottom'
+        else:
+            window1_wall, window2_wall = 'left', 'right'
+        window1_pos = room_length / 2 if window1_wall in ['top', 'bottom'] else room_width / 2
+        window2_pos = room_length / 2 if window2_wall in ['top', 'bottom'] else room_width / 2
+        blocked_wall = window1_wall if blocked_window_choice == "Window 1" else window2_wall
+        pillar_x, pillar_y = place_pillar_at_window(room_length, room_width, blocked_wall, margin)
+        return cls(room_length, room_width, _wall_code(door_wall), door_pos, _wall_code(window1_wall), window1_pos,
+                   _wall_code(window2_wall), window2_pos, pillar_x, pillar_y, _wall_code(blocked_wall))
+
+    @classmethod
+    def from_training_input(cls, d):
+        """
+        Decodes a training_input-style dict of one-hot flags. Raises ValueError when no door or window 1 flag is set.
+        """
+        return cls(d['room_length'], d['room_width'], _decode_one_hot(d, 'door_wall', required=True), d['door_pos'],
+                   _decode_one_hot(d, 'window1_wall', required=True), d['window1_pos'],
+                   _decode_one_hot(d, 'window2_wall'), d['window2_pos'],
+                   d['pillar_x'], d['pillar_y'], _decode_one_hot(d, 'blocked_window'))
+
+    def encode(self, out=None):
+        """
+        Writes the 23 input features into out (a length-23 float array, allocated if None).
+        """
+        if out is None:
+            out = np.zeros(N_FEATURES)
+        else:
+            out[:] = 0
+        out[0] = self.room_length
+        out[1] = self.room_width
+        out[_DOOR + self.door_wall] = 1
+        out[6] = self.door_pos
+        if self.window1_wall != NO_WALL:
+            out[_WINDOW1 + self.window1_wall] = 1
+        if self.window2_wall != NO_WALL:
+            out[_WINDOW2 + self.window2_wall] = 1
+        out[15] = self.window1_pos
+        out[16] = self.window2_pos
+        out[17] = self.pillar_x
+        out[18] = self.pillar_y
+        if self.blocked_wall != NO_WALL:
+            out[_BLOCKED + self.blocked_wall] = 1
+        return out
+
+    def to_training_input(self):
+        """
+        The 25-key dict main.py used to build (with door_exist / window_exist).
+        """
+        d = {"room_length": self.room_length, "room_width": self.room_width, "door_exist": 1}
+        d.update({f"door_wall_{w}": int(self.door_wall == i) for i, w in enumerate(WALLS)})
+        d["door_pos"] = self.door_pos
+        d["window_exist"] = 1
+        d.update({f"window1_wall_{w}": int(self.window1_wall == i) for i, w in enumerate(WALLS)})
+        d.update({f"window2_wall_{w}": int(self.window2_wall == i) for i, w in enumerate(WALLS)})
+        d.update({"window1_pos": self.window1_pos, "window2_pos": self.window2_pos,
+                  "pillar_x": self.pillar_x, "pillar_y": self.pillar_y})
+        d.update({f"blocked_window_{w}": int(self.blocked_wall == i) for i, w in enumerate(WALLS)})
+        return d
+
+    def sample_full(self, pred_outputs):
+        """
+        The record predict_optimal_placements returns: inputs, predictions and wall names.
+        """
+        sample_full = self.to_training_input()
+        sample_full.update(pred_outputs)
+        sample_full["door_wall"] = WALLS[self.door_wall]
+        sample_full["window_wall"] = WALLS[self.window_wall]
+        return sample_full
+
+
+class RoomSpecBatch:
+    """
+    Struct-of-arrays form of many RoomSpecs.
+    """
+    fields = RoomSpec.__slots__
+    wall_fields = ('door_wall', 'window1_wall', 'window2_wall', 'blocked_wall')
+
+    def __init__(self, **arrays):
+        n = None
+        for name in self.fields:
+            dtype = np.int8 if name in self.wall_fields else np.float64
+            value = np.asarray(arrays[name], dtype=dtype)
+            setattr(self, name, value)
+            n = len(value) if n is None else n
+            if len(value) != n:
+                raise ValueError(f"{name} has {len(value)} rows, expected {n}")
+        bad = np.flatnonzero((self.door_wall < 0) | (self.door_wall >= len(WALLS))
+                             | (self.window1_wall < 0) | (self.window1_wall >= len(WALLS))
+                             | (self.window2_wall < NO_WALL) | (self.window2_wall >= len(WALLS))
+                             | (self.blocked_wall < NO_WALL) | (self.blocked_wall >= len(WALLS)))
+        if len(bad):
+            i = bad[0]
+            _check_walls(*(int(getattr(self, name)[i]) for name in self.wall_fields), row=f"row {i}: ")
+
+    def __len__(self):
+        return len(self.room_length)
+
+    def __getitem__(self, i):
+        return RoomSpec(*(getattr(self, name)[i].item() for name in self.fields))
+
+    @property
+    def stage(self):
+        return np.where(self.window2_wall == NO_WALL, 1, 2).astype(np.int8)
+
+    @classmethod
+    def from_specs(cls, specs):
+        specs = list(specs)
+        return cls(**{name: [getattr(s, name) for s in specs] for name in cls.fields})
+
+    @classmethod
+    def from_columns(cls, columns):
+        """
+        Builds a batch from helper_dataset column arrays (or any mapping with the one-hot columns).
+        """
+        def decode(prefix):
+            code = np.full(len(columns['room_length']), NO_WALL, dtype=np.int8)
+            for i, wall in enumerate(WALLS):
+                code[np.asarray(columns[f'{prefix}_{wall}']) != 0] = i
+            return code
+
+        return cls(room_length=columns['room_length'], room_width=columns['room_width'],
+                   door_wall=decode('door_wall'), door_pos=columns['door_pos'],
+                   window1_wall=decode('window1_wall'), window1_pos=columns['window1_pos'],
+                   window2_wall=decode('window2_wall'), window2_pos=columns['window2_pos'],
+                   pillar_x=columns['pillar_x'], pillar_y=columns['pillar_y'],
+                   blocked_wall=decode('blocked_window'))
+
+    def encode(self, out=None, dtype=np.float64):
+        """
+        Writes the (N, 23) feature matrix into out (allocated if None) and returns it.
+        """
+        n = len(self)
+        if out is None:
+            out = np.zeros((n, N_FEATURES), dtype=dtype)
+        else:
+            out[:] = 0
+        rows = np.arange(n)
+        out[:, 0] = self.room_length
+        out[:, 1] = self.room_width
+        out[rows, _DOOR + self.door_wall] = 1
+        out[:, 6] = self.door_pos
+        for base, wall in ((_WINDOW1, self.window1_wall), (_WINDOW2, self.window2_wall),
+                           (_BLOCKED, self.blocked_wall)):
+            present = wall != NO_WALL
+            out[rows[present], base + wall[present]] = 1
+        out[:, 15] = self.window1_pos
+        out[:, 16] = self.window2_pos
+        out[:, 17] = self.pillar_x
+        out[:, 18] = self.pillar_y
+        return out
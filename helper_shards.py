@@ -0,0 +1,178 @@
+import json
+import os
+import numpy as np
+from helper_dataset import generate_mixed, output_columns, room_specs, targets, wall_columns
+from helper_placement_array import WALLS
+
+# -------------------------------
+# Columnar dataset shards
+# -------------------------------
+# On-disk replacement for the stage CSVs. A dataset directory holds
+#
+#   manifest.json                 row counts per shard and the column layout
+#   shard-00000/features.npy      (rows, 23) float32 model inputs (input_features order)
+#               targets.npy       (rows, 10) float32 placements (output_columns order)
+#               stage.npy         (rows,) int8
+#               bed_wall.npy ...  (rows,) int8 wall codes, left/right/top/bottom = 0..3, -1 = none
+#
+# Rows are shuffled within each shard. ShardSet memory-maps the arrays, and
+# split() cuts every shard into contiguous train / val / test ranges, which
+# are views of the mapped files (no copy, no parsing).
+
+code_columns = ['stage'] + wall_columns
+format_version = 1
+
+
+def write_shard(out_dir, index, columns):
+    """
+    Writes one shard from a dict of generated column arrays and returns its manifest entry.
+    """
+    name = f"shard-{index:05d}"
+    path = os.path.join(out_dir, name)
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, "features.npy"), room_specs(columns).encode(dtype=np.float32))
+    np.save(os.path.join(path, "targets.npy"), targets(columns))
+    for column in code_columns:
+        np.save(os.path.join(path, f"{column}.npy"), np.asarray(columns[column], dtype=np.int8))
+    return {"name": name, "rows": int(len(columns['room_length']))}
+
+
+def write_manifest(out_dir, shards, **source):
+    from helper_predict import input_features
+
+    manifest = {
+        "format_version": format_version,
+        "rows": sum(shard["rows"] for shard in shards),
+        "shards": shards,
+        "features": input_features,
+        "targets": output_columns,
+        "code_columns": code_columns,
+        "source": source
+    }
+    with open(os.path.join(out_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def _generate_shard(args):
+    out_dir, index, n, seed_seq, stage1_fraction = args
+    return write_shard(out_dir, index, generate_mixed(n, np.random.default_rng(seed_seq), stage1_fraction))
+
+
+def generate_shards(out_dir, n_samples, stage1_fraction=0.5, seed=0, shard_size=1_000_000, n_workers=1):
+    """
+    Generates n_samples rooms of both stages straight into shards (each worker writes whole shards).
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    sizes = [min(shard_size, n_samples - start) for start in range(0, n_samples, shard_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(out_dir, i, n, s, stage1_fraction) for i, (n, s) in enumerate(zip(sizes, seeds))]
+    if n_workers <= 1:
+        shards = [_generate_shard(task) for task in tasks]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            shards = list(pool.map(_generate_shard, tasks))
+    return write_manifest(out_dir, shards, generator="helper_dataset", seed=seed, stage1_fraction=stage1_fraction)
+
+
+def convert_csv(csv_path, out_dir, shard_size=1_000_000, seed=0):
+    """
+    Converts a CSV in the notebook's layout (e.g. combined_output.csv) to shards, reading it shard_size rows at a time.
+    """
+    import pandas as pd
+
+    os.makedirs(out_dir, exist_ok=True)
+    codes = {wall: i for i, wall in enumerate(WALLS)}
+    rng = np.random.default_rng(seed)
+    shards = []
+    for index, df in enumerate(pd.read_csv(csv_path, chunksize=shard_size)):
+        df = df.fillna(0)
+        columns = {name: df[name].to_numpy() for name in df.columns if name not in wall_columns}
+        for name in wall_columns:
+            # Walls the notebook left empty (NaN, then 0 after fillna) become -1.
+            columns[name] = df[name].map(codes).fillna(-1).to_numpy() if name in df else np.full(len(df), -1)
+        if 'stage' not in columns:
+            columns['stage'] = np.where(df[[f'window2_wall_{w}' for w in WALLS]].sum(axis=1) > 0, 2, 1)
+        order = rng.permutation(len(df))
+        shards.append(write_shard(out_dir, index, {name: np.asarray(v)[order] for name, v in columns.items()}))
+    return write_manifest(out_dir, shards, csv=os.path.basename(csv_path))
+
+
+class ShardSet:
+    """
+    Memory-mapped view of a shard directory.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "manifest.json")) as f:
+            self.manifest = json.load(f)
+        if self.manifest["format_version"] != format_version:
+            raise ValueError(f"{path}: unsupported shard format {self.manifest['format_version']}")
+        # Copy-on-write maps are writable views, which torch.from_numpy needs; nothing is written back.
+        self.features = [self._load(shard, "features") for shard in self.manifest["shards"]]
+        self.targets = [self._load(shard, "targets") for shard in self.manifest["shards"]]
+
+    def _load(self, shard, column):
+        return np.load(os.path.join(self.path, shard["name"], f"{column}.npy"), mmap_mode='c')
+
+    def __len__(self):
+        return self.manifest["rows"]
+
+    def column(self, name):
+        """
+        One int8 code column (see code_columns) as a list of per-shard memory maps.
+        """
+        if name not in code_columns:
+            raise KeyError(name)
+        return [self._load(shard, name) for shard in self.manifest["shards"]]
+
+    def split(self, fractions=(0.8, 0.1, 0.1), names=('train', 'val', 'test'), as_tensors=False):
+        """
+        Cuts every shard into contiguous ranges by fractions. Returns {name: [(X, y), ...]} with one
+        (X, y) pair of views per shard, as NumPy arrays or (as_tensors) zero-copy torch tensors.
+        """
+        if as_tensors:
+            import torch
+
+            convert = torch.from_numpy
+        else:
+            convert = lambda a: a
+        bounds = np.concatenate([[0], np.cumsum(fractions)])
+        parts = {name: [] for name in names}
+        for X, y in zip(self.features, self.targets):
+            edges = np.round(bounds * len(X)).astype(int)
+            for name, start, stop in zip(names, edges[:-1], edges[1:]):
+                if stop > start:
+                    parts[name].append((convert(X[start:stop]), convert(y[start:stop])))
+        return parts
+
+
+def open_shards(path):
+    return ShardSet(path)
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Write generated (or CSV) datasets as memory-mappable shards")
+    parser.add_argument('--out', default='shards')
+    parser.add_argument('--samples', type=int, default=1_000_000, help="rooms to generate (both stages)")
+    parser.add_argument('--stage1-fraction', type=float, default=0.5)
+    parser.add_argument('--shard-size', type=int, default=1_000_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--from-csv', default=None, help="convert this CSV instead of generating rooms")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.from_csv:
+        manifest = convert_csv(args.from_csv, args.out, args.shard_size, args.seed)
+    else:
+        manifest = generate_shards(args.out, args.samples, args.stage1_fraction, args.seed, args.shard_size,
+                                   args.workers)
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {manifest['rows']} rows in {len(manifest['shards'])} shards to {args.out}/ in {elapsed:.2f} s")
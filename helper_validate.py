@@ -0,0 +1,265 @@
+import numpy as np
+from helper_geometry import furniture_size, pillar_dims
+from helper_placement_array import LEFT, RIGHT, TOP, BOTTOM, WALLS, opposite_wall
+from helper_roomspec import NO_WALL, RoomSpec, RoomSpecBatch
+
+# -------------------------------
+# Layout validation
+# -------------------------------
+# Checks batches of layouts (RoomSpecBatch + (N, 10) placements in
+# output_features order) for:
+#   overlap        two pieces of furniture intersect
+#   out_of_bounds  a piece sticks out of the room
+#   pillar         a piece intersects the pillar (Stage 2)
+#   door           a piece intersects the clearance zone in front of the door
+#   window         a piece other than the desk stands in front of an unblocked window
+#
+# Rectangles are stored coordinate-first, as (4, ...) arrays of x0, y0, x1, y1,
+# so every coordinate is a contiguous array. Footprints are the rectangles the
+# renderers draw: each piece stands with its length along the wall the rules
+# give it and its width into the room (helper_geometry.furniture_walls /
+# furniture_size), so a layout is checked as it is shown. Touching edges are
+# not violations (tolerance tol, in metres / square metres).
+
+furniture_names = ['bed', 'dresser', 'nightstand', 'table', 'desk']
+checks = ['overlap', 'out_of_bounds', 'pillar', 'door', 'window']
+door_width = 0.8
+door_clearance = 0.8
+window_width = 1.0
+window_clearance = 0.5
+tol = 1e-6
+
+# (5, 4, 2) footprint (w, h) of each piece on each wall code.
+_sizes = np.array([[furniture_size(name, wall) for wall in WALLS] for name in furniture_names])
+# The 10 unordered pairs of pieces.
+pair_a, pair_b = np.triu_indices(len(furniture_names), k=1)
+
+
+def wall_zones(wall, pos, room_length, room_width, width, depth):
+    """
+    (4, N) rectangles of the given width centred at pos along wall, reaching depth into the room.
+    Columns with wall == NO_WALL are NaN.
+    """
+    wall = np.asarray(wall)
+    pos = np.asarray(pos, dtype=np.float64)
+    L = np.asarray(room_length, dtype=np.float64)
+    W = np.asarray(room_width, dtype=np.float64)
+    half = width / 2
+    zones = np.empty((4,) + wall.shape)
+    along_x = (wall == TOP) | (wall == BOTTOM)
+    along_y = (wall == LEFT) | (wall == RIGHT)
+    zones[0] = np.where(along_x, pos - half, np.where(wall == LEFT, 0, L - depth))
+    zones[2] = np.where(along_x, pos + half, np.where(wall == LEFT, depth, L))
+    zones[1] = np.where(along_y, pos - half, np.where(wall == BOTTOM, 0, W - depth))
+    zones[3] = np.where(along_y, pos + half, np.where(wall == BOTTOM, depth, W))
+    zones[:, wall == NO_WALL] = np.nan
+    return zones
+
+
+def furniture_wall_codes(specs):
+    """
+    (N, 5) wall code of each piece of a RoomSpecBatch (vectorized helper_geometry.furniture_walls).
+    """
+    door = specs.door_wall
+    bed = opposite_wall(door)
+    stage1 = specs.window2_wall == NO_WALL
+    side_door = (door == LEFT) | (door == RIGHT)
+    dresser = np.where(stage1, np.where(side_door, TOP, LEFT), door)
+    window = np.where(stage1 | (specs.blocked_wall == specs.window2_wall), specs.window1_wall, specs.window2_wall)
+    return np.stack([bed, dresser, bed, door, window], axis=1).astype(np.int8)
+
+
+def furniture_rects(placements, walls):
+    """
+    (4, N, 5) footprints of the pieces centred at placements ((N, 10), output_features order),
+    standing on walls ((N, 5) codes, see furniture_wall_codes).
+    """
+    n = len(walls)
+    centres = np.asarray(placements, dtype=np.float64).reshape(n, len(furniture_names), 2)
+    cx, cy = centres[..., 0], centres[..., 1]
+    size = _sizes[np.arange(len(furniture_names)), walls]
+    half_x, half_y = size[..., 0] / 2, size[..., 1] / 2
+    return np.stack([cx - half_x, cy - half_y, cx + half_x, cy + half_y])
+
+
+def intersection_area(a, b):
+    """
+    Area shared by rectangles a and b (coordinate-first, broadcast over the other axes).
+    NaN rectangles give NaN, which compares False against any threshold.
+    """
+    dx = np.minimum(a[2], b[2]) - np.maximum(a[0], b[0])
+    dy = np.minimum(a[3], b[3]) - np.maximum(a[1], b[1])
+    np.maximum(dx, 0, out=dx)
+    np.maximum(dy, 0, out=dy)
+    return dx * dy
+
+
+class LayoutArrays:
+    """
+    Everything the checks need for a batch, as (N, ...) arrays.
+    """
+
+    def __init__(self, specs, placements):
+        n = len(specs)
+        self.room_length = specs.room_length
+        self.room_width = specs.room_width
+        self.walls = furniture_wall_codes(specs)
+        self.rects = furniture_rects(placements, self.walls)
+        stage2 = specs.window2_wall != NO_WALL
+        # Stage 1 layouts have no desk (the model's desk output is meaningless there).
+        self.present = np.ones((n, len(furniture_names)), dtype=bool)
+        self.present[:, furniture_names.index('desk')] = stage2
+
+        self.door = wall_zones(specs.door_wall, specs.door_pos, specs.room_length, specs.room_width,
+                               door_width, door_clearance)
+        windows = []
+        for wall, pos in ((specs.window1_wall, specs.window1_pos), (specs.window2_wall, specs.window2_pos)):
+            unblocked = np.where(wall == specs.blocked_wall, NO_WALL, wall)
+            windows.append(wall_zones(unblocked, pos, specs.room_length, specs.room_width,
+                                      window_width, window_clearance))
+        self.windows = np.stack(windows, axis=2)
+
+        p_w, p_h = pillar_dims
+        self.pillar = np.stack([specs.pillar_x - p_w / 2, specs.pillar_y - p_h / 2,
+                                specs.pillar_x + p_w / 2, specs.pillar_y + p_h / 2])
+        self.pillar[:, ~stage2] = np.nan
+
+
+class Violations:
+    """
+    Per-layout, per-piece results of validate(). Boolean (N, 5) arrays per check, plus
+    pair_area (N, 10) for the pairs (pair_a[k], pair_b[k]), outside_m (N, 5), the amount each
+    piece sticks out of the room, and valid (N,).
+    """
+
+    def __init__(self, layout, tol=tol):
+        rects = layout.rects
+        present = layout.present
+        # (N, 10) area shared by each unordered pair of pieces.
+        self.pair_area = intersection_area(rects[:, :, pair_a], rects[:, :, pair_b])
+        self.pair_area *= present[:, pair_a] & present[:, pair_b]
+        pair_overlap = self.pair_area > tol
+        self.overlap = np.zeros_like(present)
+        for k, (a, b) in enumerate(zip(pair_a, pair_b)):
+            self.overlap[:, a] |= pair_overlap[:, k]
+            self.overlap[:, b] |= pair_overlap[:, k]
+
+        L = layout.room_length[:, None]
+        W = layout.room_width[:, None]
+        self.outside_m = np.maximum(np.maximum(-rects[0], rects[2] - L), np.maximum(-rects[1], rects[3] - W))
+        np.maximum(self.outside_m, 0, out=self.outside_m)
+        self.outside_m *= present
+        self.out_of_bounds = self.outside_m > tol
+
+        self.pillar = (intersection_area(rects, layout.pillar[:, :, None]) > tol) & present
+        self.door = (intersection_area(rects, layout.door[:, :, None]) > tol) & present
+        self.window = np.zeros_like(present)
+        for k in range(layout.windows.shape[2]):
+            self.window |= intersection_area(rects, layout.windows[:, :, k, None]) > tol
+        self.window &= present
+        self.window[:, furniture_names.index('desk')] = False
+        self.present = present
+
+    @property
+    def any(self):
+        """
+        (N, 5) True where a piece fails any check.
+        """
+        return self.overlap | self.out_of_bounds | self.pillar | self.door | self.window
+
+    @property
+    def valid(self):
+        return ~self.any.any(axis=1)
+
+    def counts(self):
+        """
+        {check: number of layouts failing it} plus 'invalid' and 'layouts'.
+        """
+        result = {check: int(getattr(self, check).any(axis=1).sum()) for check in checks}
+        result['invalid'] = int((~self.valid).sum())
+        result['layouts'] = len(self.valid)
+        return result
+
+    def overlap_pairs(self):
+        """
+        {(piece, piece): number of layouts where the two overlap}, for pairs that ever do.
+        """
+        counts = (self.pair_area > tol).sum(axis=0)
+        return {(furniture_names[a], furniture_names[b]): int(n) for a, b, n in zip(pair_a, pair_b, counts) if n}
+
+    def describe(self, i):
+        """
+        Human-readable list of the violations of layout i.
+        """
+        messages = []
+        for k, (a, b) in enumerate(zip(pair_a, pair_b)):
+            if self.pair_area[i, k] > tol:
+                messages.append(f"{furniture_names[a]} overlaps {furniture_names[b]} ({self.pair_area[i, k]:.2f} m²)")
+        for a, name in enumerate(furniture_names):
+            if self.out_of_bounds[i, a]:
+                messages.append(f"{name} is {self.outside_m[i, a]:.2f} m outside the room")
+            for check, text in (('pillar', 'hits the pillar'), ('door', 'blocks the door'),
+                                ('window', 'blocks a window')):
+                if getattr(self, check)[i, a]:
+                    messages.append(f"{name} {text}")
+        return messages
+
+
+def validate(specs, placements, tol=tol):
+    """
+    Validates a batch: specs is a RoomSpecBatch, placements an (N, 10) array in output_features order.
+    """
+    return Violations(LayoutArrays(specs, placements), tol)
+
+
+def validate_sample(sample, tol=tol):
+    """
+    Validates one sample_full / pred_outputs-style dict (as predict_optimal_placements returns).
+    """
+    from helper_predict import output_features
+
+    specs = RoomSpecBatch.from_specs([RoomSpec.from_training_input(sample)])
+    return validate(specs, np.array([[sample[f] for f in output_features]]), tol)
+
+
+def count_violations(specs, placements, chunk_size=16384, tol=tol):
+    """
+    Violations.counts() over a large batch, validated chunk_size layouts at a time. Besides
+    bounding memory, cache-sized chunks are about twice as fast as one big batch.
+    """
+    total = {}
+    for start in range(0, len(specs), chunk_size):
+        stop = min(start + chunk_size, len(specs))
+        chunk = RoomSpecBatch(**{name: getattr(specs, name)[start:stop] for name in RoomSpecBatch.fields})
+        for key, value in validate(chunk, placements[start:stop], tol).counts().items():
+            total[key] = total.get(key, 0) + value
+    return total
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+    from helper_dataset import generate_mixed, room_specs, targets
+
+    parser = argparse.ArgumentParser(description="Validate rule-generated and predicted layouts")
+    parser.add_argument('--samples', type=int, default=1_000_000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    columns = generate_mixed(args.samples, np.random.default_rng(args.seed))
+    specs = room_specs(columns)
+    truth = targets(columns)
+
+    start = time.perf_counter()
+    counts = count_violations(specs, truth)
+    elapsed = time.perf_counter() - start
+    print(f"Rule layouts:  {counts}  ({args.samples / elapsed:,.0f} layouts/s)")
+
+    from helper_predict import predict_batch
+
+    predictions = predict_batch(specs)
+    print(f"Model layouts: {count_violations(specs, predictions)}")
+    sample = slice(0, 100000)
+    subset = RoomSpecBatch(**{name: getattr(specs, name)[sample] for name in RoomSpecBatch.fields})
+    print("Overlapping pairs (rules):", validate(subset, truth[sample]).overlap_pairs())
+    print("Overlapping pairs (model):", validate(subset, predictions[sample]).overlap_pairs())
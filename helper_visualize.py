@@ -1,6 +1,6 @@
 import os
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
+from helper_geometry import furniture_colors, furniture_size, furniture_walls, layout_geometry
+from helper_instrument import count, span
 
 #global variables
 margin = 0.2
@@ -22,6 +22,9 @@ def visualize_layout(sample, name, save_path='stage1_visuals/'):
     """
     Visualizes the room layout
     """
+    import matplotlib.pyplot as plt
+    import matplotlib.patches as patches
+
     room_length = sample['room_length']
     room_width = sample['room_width']
     fig, ax = plt.subplots(figsize=(8, 8))
@@ -60,11 +63,13 @@ def visualize_layout(sample, name, save_path='stage1_visuals/'):
             window_rect = patches.Rectangle((window_pos - 1.0/2, -thickness), 1.0, thickness, color='blue', alpha=0.7)
         ax.add_patch(window_rect)
     
+    walls = furniture_walls(sample['door_wall'], sample['window_wall'], 1)
+
     def draw_furniture(center, furniture, color='green'):
-        length, width = furniture_dims[furniture]
+        w, h = furniture_size(furniture, walls[furniture])
         x, y = center
-        bottom_left = (x - width/2, y - length/2)
-        rect = patches.Rectangle(bottom_left, width, length, edgecolor=color, facecolor='none', linewidth=2)
+        bottom_left = (x - w/2, y - h/2)
+        rect = patches.Rectangle(bottom_left, w, h, edgecolor=color, facecolor='none', linewidth=2)
         ax.add_patch(rect)
         ax.text(x, y, furniture, color=color, ha='center', va='center', fontsize=8)
     
@@ -81,8 +86,10 @@ def visualize_layout(sample, name, save_path='stage1_visuals/'):
     ax.set_ylabel("Width")
     
     os.makedirs(save_path, exist_ok=True)
-    plt.savefig(f"{save_path}{name}.png")
+    with span("visualize.savefig"):
+        plt.savefig(f"{save_path}{name}.png")
     plt.close()
+    count("visualize.images")
 
 
 # -------------------------------
@@ -92,6 +99,9 @@ def visualize_layout_stage2(sample, name, save_path='stage2_visuals/'):
     """
     Visualizes the Stage 2 room layout
     """
+    import matplotlib.pyplot as plt
+    import matplotlib.patches as patches
+
     room_length = sample['room_length']
     room_width  = sample['room_width']
     fig, ax = plt.subplots(figsize=(8,8))
@@ -157,12 +167,12 @@ def visualize_layout_stage2(sample, name, save_path='stage2_visuals/'):
     pillar_rect = patches.Rectangle(p_bl, p_w, p_h, color='grey', alpha=0.8)
     ax.add_patch(pillar_rect)
     
-    dims = furniture_dims.copy()
+    walls = furniture_walls(sample['door_wall'], sample['window_wall'], 2)
     def draw_furniture(center, furniture, color):
-        length, width = dims[furniture]
+        w, h = furniture_size(furniture, walls[furniture])
         cx, cy = center
-        bottom_left = (cx - width/2, cy - length/2)
-        rect = patches.Rectangle(bottom_left, width, length, edgecolor=color, facecolor='none', linewidth=2)
+        bottom_left = (cx - w/2, cy - h/2)
+        rect = patches.Rectangle(bottom_left, w, h, edgecolor=color, facecolor='none', linewidth=2)
         ax.add_patch(rect)
         ax.text(cx, cy, furniture, color=color, ha='center', va='center', fontsize=8)
     
@@ -180,5 +190,187 @@ def visualize_layout_stage2(sample, name, save_path='stage2_visuals/'):
     ax.set_ylabel("Width")
     
     os.makedirs(save_path, exist_ok=True)
-    plt.savefig(f"{save_path}{name}.png")
-    plt.close()
\ No newline at end of file
+    with span("visualize.savefig"):
+        plt.savefig(f"{save_path}{name}.png")
+    plt.close()
+    count("visualize.images")
+
+# -------------------------------
+# Batch rendering
+# -------------------------------
+# visualize_layout / visualize_layout_stage2 build a new figure per sample.
+# For bulk rendering, helper_geometry.layout_geometry() computes the same
+# rectangles and LayoutRenderer keeps one figure per process, only moving its
+# patches between frames. matplotlib is imported by the functions that draw,
+# so importing this module (as the app does at startup) costs nothing.
+
+class LayoutRenderer:
+    """
+    Renders layouts into one reusable figure, updating patches instead of rebuilding them.
+    """
+
+    def __init__(self):
+        from matplotlib import patches
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+        self.fig = Figure(figsize=(8, 8))
+        FigureCanvasAgg(self.fig)
+        ax = self.ax = self.fig.add_subplot()
+        ax.set_aspect('equal', adjustable='box')
+        ax.set_title("Predicted Room Layout")
+        ax.set_xlabel("Length")
+        ax.set_ylabel("Width")
+
+        self.room = ax.add_patch(patches.Rectangle((0, 0), 1, 1, fill=False, edgecolor='black', linewidth=2))
+        self.door = ax.add_patch(patches.Rectangle((0, 0), 1, 1, color='brown', alpha=0.7))
+        self.windows = [ax.add_patch(patches.Rectangle((0, 0), 1, 1, color='blue', alpha=0.7)) for _ in range(2)]
+        self.pillar = ax.add_patch(patches.Rectangle((0, 0), 1, 1, color='grey', alpha=0.8))
+        self.furniture = {}
+        for name, color in furniture_colors.items():
+            rect = ax.add_patch(patches.Rectangle((0, 0), 1, 1, edgecolor=color, facecolor='none', linewidth=2))
+            text = ax.text(0, 0, name, color=color, ha='center', va='center', fontsize=8)
+            self.furniture[name] = (rect, text)
+
+    @staticmethod
+    def _place(patch, rect):
+        patch.set_visible(rect is not None)
+        if rect is not None:
+            x, y, w, h = rect
+            patch.set_xy((x, y))
+            patch.set_width(w)
+            patch.set_height(h)
+
+    def update(self, sample, stage=None, only=None):
+        """
+        Moves the patches to match sample. With only (an iterable of furniture names and/or
+        'room', 'door', 'windows', 'pillar'), the other patches are left untouched.
+        """
+        with span("render.update"):
+            self._update(sample, stage, only)
+
+    def _update(self, sample, stage, only):
+        geometry = layout_geometry(sample, stage)
+        if only is None or 'room' in only:
+            self._place(self.room, geometry['room'])
+            self.ax.set_xlim(-1, sample['room_length'] + 1)
+            self.ax.set_ylim(-1, sample['room_width'] + 1)
+        if only is None or 'door' in only:
+            self._place(self.door, geometry['door'])
+        if only is None or 'windows' in only:
+            for i, patch in enumerate(self.windows):
+                self._place(patch, geometry['windows'][i] if i < len(geometry['windows']) else None)
+        if only is None or 'pillar' in only:
+            self._place(self.pillar, geometry['pillar'])
+        for name, (rect, text) in self.furniture.items():
+            if only is not None and name not in only:
+                continue
+            box = geometry['furniture'].get(name)
+            self._place(rect, box)
+            text.set_visible(box is not None)
+            if box is not None:
+                text.set_position((box[0] + box[2]/2, box[1] + box[3]/2))
+
+    def save(self, target):
+        """
+        Writes the current frame as PNG to a path or a binary file object.
+        """
+        with span("render.savefig"):
+            self.fig.savefig(target, format='png')
+        count("render.images")
+
+    def render(self, sample, stage=None):
+        """
+        Returns the PNG bytes for one layout.
+        """
+        import io
+
+        self.update(sample, stage)
+        buf = io.BytesIO()
+        self.save(buf)
+        return buf.getvalue()
+
+
+_worker_renderer = None
+
+
+def _get_worker_renderer():
+    global _worker_renderer
+    if _worker_renderer is None:
+        _worker_renderer = LayoutRenderer()
+    return _worker_renderer
+
+
+def _render_chunk(args):
+    samples, stage, paths = args
+    renderer = _get_worker_renderer()
+    if paths is None:
+        return [renderer.render(sample, stage) for sample in samples]
+    for sample, path in zip(samples, paths):
+        renderer.update(sample, stage)
+        renderer.save(path)
+    return paths
+
+
+def iter_render_batch(samples, stage=None, save_path=None, names=None, n_workers=1, chunk_size=32):
+    """
+    Renders many layouts, yielding PNG bytes (or the written file paths when save_path is given)
+    in input order. Each worker process keeps a single LayoutRenderer.
+    """
+    samples = list(samples)
+    paths = None
+    if save_path is not None:
+        os.makedirs(save_path, exist_ok=True)
+        names = names or [f"layout_{i}" for i in range(len(samples))]
+        paths = [os.path.join(save_path, f"{name}.png") for name in names]
+    tasks = [(samples[i:i + chunk_size], stage, paths[i:i + chunk_size] if paths else None)
+             for i in range(0, len(samples), chunk_size)]
+
+    if n_workers <= 1:
+        for task in tasks:
+            yield from _render_chunk(task)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        for result in pool.map(_render_chunk, tasks):
+            yield from result
+
+
+def render_batch(samples, stage=None, save_path=None, names=None, n_workers=1, chunk_size=32):
+    """
+    List-returning form of iter_render_batch.
+    """
+    return list(iter_render_batch(samples, stage, save_path, names, n_workers, chunk_size))
+
+
+if __name__ == '__main__':
+    import argparse
+    import tempfile
+    import time
+    from helper_dataset import generate_dataset, to_frame
+
+    parser = argparse.ArgumentParser(description="Compare per-sample and batch rendering throughput")
+    parser.add_argument('--samples', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    samples = [row.to_dict() for _, row in to_frame(generate_dataset(args.samples, stage=2)).iterrows()]
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        for i, sample in enumerate(samples):
+            visualize_layout_stage2(sample, name=f"layout_{i}", save_path=tmp + os.sep)
+        baseline = len(samples) / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        render_batch(samples, save_path=tmp)
+        reused = len(samples) / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        render_batch(samples, n_workers=args.workers)
+        pooled = len(samples) / (time.perf_counter() - start)
+
+    print(f"visualize_layout_stage2:           {baseline:7.1f} images/s")
+    print(f"render_batch, 1 process (to disk): {reused:7.1f} images/s ({reused / baseline:.1f}x)")
+    print(f"render_batch, {args.workers} processes (bytes): {pooled:7.1f} images/s ({pooled / baseline:.1f}x)")
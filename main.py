@@ -1,14 +1,14 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import torch
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
 import os
-import joblib
-from helper_predict import predict_optimal_placements
-from helper_visualize import visualize_layout, visualize_layout_stage2
-from helper_placement import place_pillar_at_window
+import threading
+from helper_predict import get_predictor
+from helper_visualize import LayoutRenderer
+from helper_index import open_layout_index, predict_layout
+from helper_validate import furniture_names, validate_sample
+from helper_repair import repair_sample
+from helper_relayout import RelayoutView
+from helper_roomspec import RoomSpec
+import helper_instrument
 
 # -------------------------------
 # Global Parameters
@@ -38,129 +38,122 @@ room_length = st.sidebar.number_input("Room Length (m)", min_value=6.0, max_valu
 room_width  = st.sidebar.number_input("Room Width (m)", min_value=6.0, max_value=7.0, value=6.5, step=0.1)
 
 # Door:
-door_exist = 1 
 door_wall = st.sidebar.selectbox("Select Door Wall", options=['bottom','top', 'left', 'right'], index=0)
-if door_wall in ['left', 'right']:
-    door_pos = room_width / 2
-else:
-    door_pos = room_length / 2
 
 # Number of windows
 num_windows = st.sidebar.selectbox("Number of Windows", options=["2", "1"], index=0)
 if num_windows == "1":
-    stage = 1
-
-    if door_wall == 'bottom':
-        window_wall = 'right'
-    elif door_wall == 'top':
-        window_wall = 'left'
-    elif door_wall == 'left':
-        window_wall = 'top'
-    else:
-        window_wall = 'bottom'
-    window_exist = 1
-    if window_wall in ['top', 'bottom']:
-        window1_pos = room_length / 2
-    else:
-        window1_pos = room_width / 2
-    window2_pos = 0
-    window1_wall_left   = 1 if window_wall == 'left' else 0
-    window1_wall_right  = 1 if window_wall == 'right' else 0
-    window1_wall_top    = 1 if window_wall == 'top' else 0
-    window1_wall_bottom = 1 if window_wall == 'bottom' else 0
-    
-    window2_wall_left = window2_wall_right = window2_wall_top = window2_wall_bottom = 0
-    
-    pillar_x = pillar_y = 0
-    blocked_window_left = blocked_window_right = blocked_window_top = blocked_window_bottom = 0
+    blocked_window_choice = None
 else:
-    stage = 2
-    window_exist = 1
-    
-    if door_wall in ['left', 'right']:
-        window1_wall = 'top'
-        window2_wall = 'bottom'
-    else:
-        window1_wall = 'left'
-        window2_wall = 'right'
-    if window1_wall in ['top', 'bottom']:
-        window1_pos = room_length / 2
-    else:
-        window1_pos = room_width / 2
-    if window2_wall in ['top', 'bottom']:
-        window2_pos = room_length / 2
-    else:
-        window2_pos = room_width / 2
-    window1_wall_left   = 1 if window1_wall=='left' else 0
-    window1_wall_right  = 1 if window1_wall=='right' else 0
-    window1_wall_top    = 1 if window1_wall=='top' else 0
-    window1_wall_bottom = 1 if window1_wall=='bottom' else 0
-    window2_wall_left   = 1 if window2_wall=='left' else 0
-    window2_wall_right  = 1 if window2_wall=='right' else 0
-    window2_wall_top    = 1 if window2_wall=='top' else 0
-    window2_wall_bottom = 1 if window2_wall=='bottom' else 0
-
-    
     blocked_window_choice = st.sidebar.selectbox("Which window is blocked by a pillar?", options=["Window 1", "Window 2"])
-    if blocked_window_choice == "Window 1":
-        blocked_wall = window1_wall
-    else:
-        blocked_wall = window2_wall
-    
-    pillar_x, pillar_y = place_pillar_at_window(room_length, room_width, blocked_wall, margin)
-    blocked_window_left   = 1 if blocked_wall=='left' else 0
-    blocked_window_right  = 1 if blocked_wall=='right' else 0
-    blocked_window_top    = 1 if blocked_wall=='top' else 0
-    blocked_window_bottom = 1 if blocked_wall=='bottom' else 0
+
+engine_label = st.sidebar.selectbox("Placement engine", options=["MLP model", "Grid solver", "Rules (incremental)"],
+                                    index=0)
+engine = {"MLP model": 'model', "Grid solver": 'grid', "Rules (incremental)": 'rules'}[engine_label]
+repair_layouts = st.sidebar.checkbox("Repair invalid layouts", value=True)
+
+# The input feature vector is built from these values by RoomSpec.from_ui
+# (helper_roomspec.py), in the same order as used during training.
+stage = 1 if num_windows == "1" else 2
 
 
 # -------------------------------
-# Input Feature Vector
+# Shared resources and result cache
 # -------------------------------
-training_input = {
-    # "stage": stage,
-    "room_length": room_length,
-    "room_width": room_width,
-    "door_exist": door_exist,
-    "door_wall_left": 1 if door_wall=="left" else 0,
-    "door_wall_right": 1 if door_wall=="right" else 0,
-    "door_wall_top": 1 if door_wall=="top" else 0,
-    "door_wall_bottom": 1 if door_wall=="bottom" else 0,
-    "door_pos": door_pos,
-    "window_exist": window_exist,
-    "window1_wall_left": window1_wall_left,
-    "window1_wall_right": window1_wall_right,
-    "window1_wall_top": window1_wall_top,
-    "window1_wall_bottom": window1_wall_bottom,
-    "window2_wall_left": window2_wall_left if stage==2 else 0,
-    "window2_wall_right": window2_wall_right if stage==2 else 0,
-    "window2_wall_top": window2_wall_top if stage==2 else 0,
-    "window2_wall_bottom": window2_wall_bottom if stage==2 else 0,
-    "window1_pos": window1_pos,
-    "window2_pos": window2_pos if stage==2 else 0,
-    "pillar_x": pillar_x,
-    "pillar_y": pillar_y,
-    "blocked_window_left": blocked_window_left,
-    "blocked_window_right": blocked_window_right,
-    "blocked_window_top": blocked_window_top,
-    "blocked_window_bottom": blocked_window_bottom
-}
+@st.cache_resource
+def load_resources():
+    """
+    Loads the model, the layout index and one renderer once per server process.
+    """
+    renderer = LayoutRenderer()
+    return get_predictor(), open_layout_index(), renderer, threading.Lock()
+
+
+@st.cache_data(max_entries=256)
+def predict_and_render(room_length, room_width, door_wall, num_windows, blocked_window_choice, repair=True,
+                       engine='model', model_artifacts=None):
+    """
+    Memoized (inputs -> placements, PNG bytes, {piece: metres moved by the repair}), shared by all
+    sessions and bounded to 256 entries. model_artifacts ((path, mtime) pairs from
+    Predictor.loaded_artifacts()) is only part of the cache key, so a retrained model is not answered
+    from entries of the old one.
+    """
+    helper_instrument.count("app.cache_misses")
+    _, layout_index, renderer, render_lock = load_resources()
+    # Sidebar values on the precomputed grid are answered from the layout index
+    # (built with `python helper_index.py`); anything else falls back to the model.
+    # The grid solver (helper_grid_solver.py) computes every layout directly.
+    sample_full, pred_outputs, layout_png = predict_layout(room_length, room_width, door_wall, num_windows,
+                                                           blocked_window_choice, index=layout_index, engine=engine)
+    moved = {}
+    if repair:
+        # Invalid predictions are moved the least needed to pass helper_validate (helper_repair.py).
+        sample_full, pred_outputs, report = repair_sample(sample_full)
+        moved = {name: float(m) for name, m in zip(furniture_names, report.moved_m[0]) if m > 0}
+        if moved:
+            layout_png = None
+    if layout_png is None:
+        # The renderer holds one figure, so sessions take turns drawing into it.
+        with render_lock:
+            layout_png = renderer.render(sample_full, 1 if num_windows == "1" else 2)
+    return sample_full, pred_outputs, layout_png, moved
+
+
+def relayout_and_render(room_length, room_width, door_wall, num_windows, blocked_window_choice, repair=True,
+                        engine='rules'):
+    """
+    Rule layouts kept per session (helper_relayout.py): a changed input only recomputes and redraws
+    the pieces that depend on it. Same return value as predict_and_render.
+    """
+    if "relayout_view" not in st.session_state:
+        st.session_state["relayout_view"] = RelayoutView()
+    spec = RoomSpec.from_ui(room_length, room_width, door_wall, num_windows, blocked_window_choice)
+    return st.session_state["relayout_view"].show(spec, repair=repair)
+
 
 # -------------------------------
 # Prediction Button
 # -------------------------------
+request = (room_length, room_width, door_wall, num_windows, blocked_window_choice, repair_layouts, engine)
 if st.sidebar.button("Predict Layout"):
+    st.session_state["layout_request"] = request
 
-    if stage == 1:
-        sample_full, pred_outputs = predict_optimal_placements(training_input, stage, door_wall, window_wall, window1_wall=None, window2_wall=None, blocked_window_choice=None)
-    else:
-        sample_full, pred_outputs = predict_optimal_placements(training_input, stage, door_wall, window_wall=None, window1_wall=window1_wall, window2_wall=window2_wall, blocked_window_choice=blocked_window_choice)
+# The result stays on screen across reruns (e.g. the download button) until an input changes.
+if st.session_state.get("layout_request") == request:
+    # Picks up a retrained model or scalers; the layout index stops answering once they change.
+    predictor = load_resources()[0]
+    predictor.reload_if_changed()
+
+    # FURNITURE_PROFILE=cprofile|pyinstrument profiles this request (bypassing the cache).
+    profile_mode = os.environ.get("FURNITURE_PROFILE")
+    with helper_instrument.span("app.request"):
+        if engine == 'rules':
+            handler, model_key = relayout_and_render, {}
+        else:
+            handler = predict_and_render.__wrapped__ if profile_mode else predict_and_render
+            model_key = {"model_artifacts": tuple(sorted(predictor.loaded_artifacts().items()))}
+        if profile_mode:
+            (sample_full, pred_outputs, layout_png, moved), profile_report = helper_instrument.profile_call(
+                handler, *request, mode=profile_mode, **model_key)
+        else:
+            sample_full, pred_outputs, layout_png, moved = handler(*request, **model_key)
+    helper_instrument.count("app.requests")
     
     st.write("Predicted Sample:")
     st.json(pred_outputs)
+    if moved:
+        st.info("Repaired layout: moved " + ", ".join(f"{name} {m:.2f} m" for name, m in moved.items()))
+
+    # The model regresses raw centres, so check the layout before showing it as valid.
+    violations = validate_sample(sample_full)
+    if not violations.valid[0]:
+        st.warning("Layout check: " + "; ".join(violations.describe(0)))
     
-    sample_df = pd.DataFrame([sample_full])
-    sample_df.to_csv("predicted_sample.csv", index=False)
+    # Like torch and matplotlib, pandas is only imported once there is a layout to show.
+    import pandas as pd
+
+    st.download_button("Download CSV", data=pd.DataFrame([sample_full]).to_csv(index=False),
+                       file_name="predicted_sample.csv", mime="text/csv")
     
     if stage == 1:
         st.markdown("""
@@ -173,8 +166,7 @@ if st.sidebar.button("Predict Layout"):
         - These placements guarantee that each piece serves its function without interference.
         - The model learns these patterns from the synthetic data.
         """)
-        visualize_layout(sample_full, name="predicted_sample", save_path="visualizations_stage1/")
-        st.image("visualizations_stage1/predicted_sample.png", caption="Predicted Room Layout")
+        st.image(layout_png, caption="Predicted Room Layout")
     else:
         st.markdown("""
         **Explanation:**
@@ -185,5 +177,11 @@ if st.sidebar.button("Predict Layout"):
         - The layout is further optimized so the bed isn’t placed in front of the dresser, ensuring functional accessibility.
         - The model learns these patterns from the synthetic data.
         """)
-        visualize_layout_stage2(sample_full, name="predicted_sample", save_path="visualizations_stage2/")
-        st.image("visualizations_stage2/predicted_sample.png", caption="Predicted Room Layout")
+        st.image(layout_png, caption="Predicted Room Layout")
+
+    if profile_mode:
+        with st.expander("Profile"):
+            st.text(profile_report)
+    if helper_instrument.is_enabled():
+        with st.expander("Timing spans"):
+            st.json(helper_instrument.snapshot())
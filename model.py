@@ -1,15 +1,25 @@
 import torch
 
 class MLP(torch.nn.Module):
-    def __init__(self, input_dim, output_dim):
+    def __init__(self, input_dim, output_dim, hidden_sizes=(64, 64)):
         super(MLP, self).__init__()
-        self.net = torch.nn.Sequential(
-            torch.nn.Linear(input_dim, 64),
-            torch.nn.ReLU(),
-            torch.nn.Linear(64, 64),
-            torch.nn.ReLU(),
-            torch.nn.Linear(64, output_dim)
-        )
-    
+        layers = []
+        for size in hidden_sizes:
+            layers += [torch.nn.Linear(input_dim, size), torch.nn.ReLU()]
+            input_dim = size
+        # Linear layers stay at net.0, net.2, ... so 64-64 checkpoints keep their keys.
+        self.net = torch.nn.Sequential(*layers, torch.nn.Linear(input_dim, output_dim))
+
     def forward(self, x):
-        return self.net(x)
\ No newline at end of file
+        return self.net(x)
+
+
+def load_mlp(state_dict):
+    """
+    An MLP with the layer sizes of state_dict (read from its net.<i>.weight shapes), with its weights loaded.
+    """
+    layer_ids = sorted(int(k.split('.')[1]) for k in state_dict if k.startswith('net.') and k.endswith('.weight'))
+    weights = [state_dict[f'net.{i}.weight'] for i in layer_ids]
+    model = MLP(weights[0].shape[1], weights[-1].shape[0], tuple(w.shape[0] for w in weights[:-1]))
+    model.load_state_dict(state_dict)
+    return model
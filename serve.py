@@ -0,0 +1,240 @@
+import asyncio
+import collections
+import json
+import time
+import numpy as np
+import helper_instrument
+from helper_predict import get_predictor, input_features, output_features
+
+# -------------------------------
+# Inference HTTP service
+# -------------------------------
+# POST /predict  body: one room spec shaped like main.py's training_input, or a
+#                list of them. Returns the pred_outputs dict (or a list of them).
+# GET  /metrics  queue depth, batch size distribution and p50/p99 latency.
+# GET  /metrics/prometheus  helper_instrument spans and counters (FURNITURE_INSTRUMENT=1).
+# GET  /healthz
+#
+# Concurrent requests are coalesced by MicroBatcher into one batched MLP
+# forward pass, bounded by max_batch_size rows and max_wait_ms of waiting.
+
+
+class MicroBatcher:
+    """
+    Collects single-row requests and runs them through predict_fn in batches.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=256, max_wait_ms=2.0, latency_window=10000):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue = asyncio.Queue()
+        self.batch_sizes = collections.Counter()
+        self.latencies = collections.deque(maxlen=latency_window)
+        self.requests = 0
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, rows):
+        """
+        Queues an (n, 23) array of rows and waits for its (n, 10) predictions.
+        """
+        future = asyncio.get_running_loop().create_future()
+        start = time.perf_counter()
+        await self.queue.put((rows, future))
+        result = await future
+        self.latencies.append(time.perf_counter() - start)
+        self.requests += 1
+        return result
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        carry = None
+        while True:
+            pending = [carry if carry is not None else await self.queue.get()]
+            carry = None
+            size = len(pending[0][0])
+            deadline = loop.time() + self.max_wait
+            while size < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if size + len(item[0]) > self.max_batch_size:
+                    # Multi-row requests that would overflow the batch start the next one.
+                    carry = item
+                    break
+                pending.append(item)
+                size += len(item[0])
+
+            X = np.concatenate([rows for rows, _ in pending])
+            self.batch_sizes[len(X)] += 1
+            try:
+                # The forward pass runs in a thread so the event loop keeps accepting requests.
+                pred = await loop.run_in_executor(None, self.predict_fn, X)
+            except Exception as exc:
+                for _, future in pending:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+            offset = 0
+            for rows, future in pending:
+                if not future.done():
+                    future.set_result(pred[offset:offset + len(rows)])
+                offset += len(rows)
+
+    def metrics(self):
+        latencies = np.array(self.latencies) * 1000
+        batches = sum(self.batch_sizes.values())
+        return {
+            "queue_depth": self.queue.qsize(),
+            "requests": self.requests,
+            "batches": batches,
+            "mean_batch_size": (sum(k * v for k, v in self.batch_sizes.items()) / batches) if batches else 0.0,
+            "batch_size_distribution": {str(k): v for k, v in sorted(self.batch_sizes.items())},
+            "latency_ms": {
+                "p50": float(np.percentile(latencies, 50)) if len(latencies) else None,
+                "p99": float(np.percentile(latencies, 99)) if len(latencies) else None,
+                "window": len(latencies)
+            }
+        }
+
+
+def rooms_to_array(rooms):
+    """
+    Orders room spec dicts by input_features. Raises ValueError naming any missing keys or
+    non-finite values (json.loads accepts NaN and Infinity).
+    """
+    missing = sorted({f for room in rooms for f in input_features if f not in room})
+    if missing:
+        raise ValueError(f"missing input features: {', '.join(missing)}")
+    X = np.array([[float(room[f]) for f in input_features] for room in rooms], dtype=np.float64)
+    bad = ~np.isfinite(X)
+    if bad.any():
+        row, col = np.argwhere(bad)[0]
+        raise ValueError(f"room {row}: {input_features[col]} must be finite, got {X[row, col]}")
+    return X
+
+
+_reasons = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+def _response(status, payload, keep_alive):
+    if isinstance(payload, str):
+        body, content_type = payload.encode(), "text/plain; version=0.0.4"
+    else:
+        body, content_type = json.dumps(payload).encode(), "application/json"
+    headers = [
+        f"HTTP/1.1 {status} {_reasons[status]}",
+        f"Content-Type: {content_type}",
+        f"Content-Length: {len(body)}",
+        f"Connection: {'keep-alive' if keep_alive else 'close'}",
+    ]
+    return ("\r\n".join(headers) + "\r\n\r\n").encode() + body
+
+
+class LayoutService:
+    """
+    Minimal HTTP/1.1 server (keep-alive, Content-Length bodies) in front of a MicroBatcher.
+    """
+
+    def __init__(self, batcher):
+        self.batcher = batcher
+
+    async def handle(self, method, path, body):
+        if path == "/healthz":
+            return 200, {"status": "ok"}
+        if path == "/metrics":
+            return 200, self.batcher.metrics()
+        if path == "/metrics/prometheus":
+            return 200, helper_instrument.to_prometheus()
+        if path != "/predict":
+            return 404, {"error": f"unknown path {path}"}
+        if method != "POST":
+            return 405, {"error": "use POST"}
+        try:
+            payload = json.loads(body or b"null")
+            single = isinstance(payload, dict)
+            rooms = [payload] if single else payload
+            if not isinstance(rooms, list) or not rooms or not all(isinstance(r, dict) for r in rooms):
+                raise ValueError("body must be a room spec object or a non-empty list of them")
+            X = rooms_to_array(rooms)
+        except (ValueError, TypeError) as exc:
+            return 400, {"error": str(exc)}
+        pred = await self.batcher.submit(X)
+        outputs = [dict(zip(output_features, row.tolist())) for row in pred]
+        return 200, outputs[0] if single else outputs
+
+    async def serve_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                try:
+                    status, payload = await self.handle(method, path.split('?', 1)[0], body)
+                except Exception as exc:
+                    status, payload = 500, {"error": repr(exc)}
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+async def run_server(host="127.0.0.1", port=8000, max_batch_size=256, max_wait_ms=2.0, predict_fn=None):
+    """
+    Starts the service and returns (server, batcher); the caller owns the event loop.
+    """
+    if predict_fn is None:
+        predict_fn = get_predictor().predict_batch
+    batcher = MicroBatcher(predict_fn, max_batch_size, max_wait_ms)
+    batcher.start()
+    service = LayoutService(batcher)
+    server = await asyncio.start_server(service.serve_connection, host, port)
+    return server, batcher
+
+
+async def _main(args):
+    server, _ = await run_server(args.host, args.port, args.max_batch_size, args.max_wait_ms)
+    print(f"Serving on http://{args.host}:{args.port} (max batch {args.max_batch_size}, max wait {args.max_wait_ms} ms)")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Layout prediction HTTP service with micro-batching")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--max-batch-size', type=int, default=256)
+    parser.add_argument('--max-wait-ms', type=float, default=2.0)
+    args = parser.parse_args()
+    asyncio.run(_main(args))
@@ -0,0 +1,432 @@
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+import numpy as np
+
+# -------------------------------
+# Hyperparameter sweep
+# -------------------------------
+# python sweep.py [--hidden 64,64 128,128 64,64,64] [--batch-size 64 256] [--lr 0.001 0.003] [--workers 4]
+#
+# Trains one MLP per combination of hidden widths (their count is the depth),
+# batch size and learning rate, in parallel worker processes. The dataset is
+# generated once (the train.py streams: disjoint train / validation / test
+# rooms of both stages) or read once from a helper_shards directory. It is
+# scaled once and placed in shared memory, and every worker trains on the same
+# pages, so nothing is copied, re-read or re-generated per configuration.
+# `python helper_shards.py --from-csv combined_output.csv` makes shards from the
+# notebook's CSV.
+#
+# Each worker is pinned to its own CPUs and runs torch with that many threads,
+# so workers do not compete for cores. A run stops early when the validation
+# loss has not improved by min_delta for patience epochs, and keeps its best
+# epoch. Test accuracy is the share of test rooms with every coordinate within
+# tolerance of the rules. Once all runs are done, the per-room (batch 1) and
+# batch-4096 latency of each network is measured one at a time.
+#
+# out/leaderboard.csv (and .json) ranks the runs by validation loss. pareto
+# marks the runs that no other run beats on both accuracy and latency. Runs
+# whose validation loss is never finite are listed last as failed. The
+# winner, with the lowest validation loss within --max-latency-us, is written
+# as out/best_model.pth + scaler_X.joblib + scaler_y.joblib, which
+# helper_predict.Predictor loads whatever the hidden widths.
+
+default_grid = {
+    'hidden_sizes': [(32, 32), (64, 64), (128, 128), (64, 64, 64)],
+    'batch_size': [64, 256],
+    'lr': [0.001, 0.003]
+}
+splits = ('train', 'val', 'test')
+
+
+def configs(grid=None, seed=0):
+    """
+    One config dict per combination of the grid's hidden_sizes, batch_size and lr values.
+    """
+    grid = dict(default_grid, **(grid or {}))
+    return [{'hidden_sizes': tuple(hidden), 'batch_size': batch_size, 'lr': lr, 'seed': seed}
+            for hidden, batch_size, lr in itertools.product(grid['hidden_sizes'], grid['batch_size'], grid['lr'])]
+
+
+# -------------------------------
+# Shared-memory dataset
+# -------------------------------
+class SharedArrays:
+    """
+    Named NumPy arrays in multiprocessing.shared_memory blocks. create() copies arrays in;
+    attach(specs()) maps the same blocks in another process without copying.
+    """
+
+    def __init__(self, blocks, arrays):
+        self._blocks = blocks
+        self.arrays = arrays
+
+    @classmethod
+    def create(cls, arrays):
+        from multiprocessing import shared_memory
+
+        blocks, views = {}, {}
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            views[name] = np.ndarray(array.shape, array.dtype, buffer=block.buf)
+            views[name][...] = array
+            blocks[name] = block
+        return cls(blocks, views)
+
+    @classmethod
+    def attach(cls, specs):
+        from multiprocessing import shared_memory
+
+        blocks, views = {}, {}
+        for name, (block_name, shape, dtype) in specs.items():
+            # Pool workers share the creator's resource tracker, which unlinks the blocks if the creator dies.
+            block = shared_memory.SharedMemory(name=block_name)
+            views[name] = np.ndarray(shape, np.dtype(dtype), buffer=block.buf)
+            blocks[name] = block
+        return cls(blocks, views)
+
+    def specs(self):
+        return {name: (self._blocks[name].name, array.shape, array.dtype.str) for name, array in self.arrays.items()}
+
+    def nbytes(self):
+        return sum(array.nbytes for array in self.arrays.values())
+
+    def close(self, unlink=False):
+        self.arrays = {}
+        for block in self._blocks.values():
+            block.close()
+            if unlink:
+                block.unlink()
+
+
+def load_dataset(samples=200000, val_samples=20000, test_samples=20000, stage1_fraction=0.5, seed=0,
+                 shards=None):
+    """
+    {split: (X, y)} float32 arrays, generated from the train.py streams or read from a helper_shards directory.
+    """
+    if shards is not None:
+        from helper_shards import open_shards
+
+        parts = open_shards(shards).split()
+        return {split: (np.concatenate([X for X, _ in parts[split]]).astype(np.float32),
+                        np.concatenate([y for _, y in parts[split]]).astype(np.float32)) for split in splits}
+    from train import TRAIN, TEST, VAL, fixed_split
+
+    sizes = {'train': (samples, TRAIN), 'val': (val_samples, VAL), 'test': (test_samples, TEST)}
+    return {split: fixed_split(n, seed, stream, stage1_fraction) for split, (n, stream) in sizes.items()}
+
+
+def share_dataset(dataset):
+    """
+    Fits the scalers on the training split and puts the scaled splits in shared memory.
+    Returns (SharedArrays, scaler_X, scaler_y); the test targets are also kept in metres.
+    """
+    from sklearn.preprocessing import StandardScaler
+
+    X_train, y_train = dataset['train']
+    scaler_X, scaler_y = StandardScaler().fit(X_train), StandardScaler().fit(y_train)
+    arrays = {}
+    for split, (X, y) in dataset.items():
+        arrays[f'X_{split}'] = scaler_X.transform(X).astype(np.float32)
+        arrays[f'y_{split}'] = scaler_y.transform(y).astype(np.float32)
+    arrays['y_test_m'] = dataset['test'][1].astype(np.float32)
+    return SharedArrays.create(arrays), scaler_X, scaler_y
+
+
+# -------------------------------
+# Workers
+# -------------------------------
+_data = None
+_scale_y = None
+
+
+def _init_worker(specs, scale_y, cpu_queue, threads):
+    # Attaches the shared dataset, pins this process to its CPUs and sizes torch's thread pool to match.
+    global _data, _scale_y
+    import torch
+
+    _data = SharedArrays.attach(specs)
+    _scale_y = scale_y
+    if cpu_queue is not None and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpu_queue.get())
+    torch.set_num_threads(threads)
+
+
+def _evaluate(model, X, y, batch_size=8192):
+    import torch
+
+    model.eval()
+    total = 0.0
+    with torch.no_grad():
+        for start in range(0, len(X), batch_size):
+            pred = model(torch.from_numpy(X[start:start + batch_size]))
+            total += torch.nn.functional.mse_loss(pred, torch.from_numpy(y[start:start + batch_size]),
+                                                  reduction='sum').item()
+    return total / max(y.size, 1)
+
+
+def train_config(config, max_epochs=30, patience=3, min_delta=1e-4, tolerance=0.05):
+    """
+    Trains one config on the shared dataset with early stopping. Returns its metrics and
+    the state_dict of its best epoch (as NumPy arrays). A config whose validation loss is never
+    finite (e.g. it diverges to NaN) comes back with failed=True, best_val_loss=inf and no state_dict.
+    """
+    import torch
+    from model import MLP
+
+    start = time.perf_counter()
+    data = _data.arrays
+    X, y = data['X_train'], data['y_train']
+    torch.manual_seed(config['seed'])
+    rng = np.random.default_rng(config['seed'])
+    model = MLP(X.shape[1], y.shape[1], config['hidden_sizes'])
+    criterion = torch.nn.MSELoss()
+    optimizer = torch.optim.Adam(model.parameters(), lr=config['lr'])
+    batch_size = config['batch_size']
+
+    best_val_loss, best_state, best_epoch, history = float('inf'), None, 0, []
+    for epoch in range(max_epochs):
+        model.train()
+        order = rng.permutation(len(X))
+        for begin in range(0, len(X), batch_size):
+            rows = order[begin:begin + batch_size]
+            optimizer.zero_grad()
+            loss = criterion(model(torch.from_numpy(X[rows])), torch.from_numpy(y[rows]))
+            loss.backward()
+            optimizer.step()
+        val_loss = _evaluate(model, data['X_val'], data['y_val'])
+        history.append(val_loss)
+        if val_loss < best_val_loss - min_delta:
+            best_val_loss, best_epoch = val_loss, epoch + 1
+            best_state = {k: v.detach().clone() for k, v in model.state_dict().items()}
+        elif epoch + 1 - best_epoch >= patience:
+            break
+
+    if best_state is None:
+        return dict(config, **{
+            "epochs": len(history), "best_epoch": 0, "stopped_early": len(history) < max_epochs,
+            "best_val_loss": float('inf'), "test_mae_m": float('nan'), "test_max_error_m": float('nan'),
+            "test_accuracy": float('nan'), "params": sum(v.numel() for v in model.parameters()),
+            "train_seconds": time.perf_counter() - start, "state_dict": None, "failed": True
+        })
+
+    model.load_state_dict(best_state)
+    model.eval()
+    with torch.no_grad():
+        pred = model(torch.from_numpy(data['X_test'])).numpy()
+    mean_y, scale_y = _scale_y
+    error = np.abs(pred * scale_y + mean_y - data['y_test_m'])
+    return dict(config, **{
+        "epochs": len(history),
+        "best_epoch": best_epoch,
+        "stopped_early": len(history) < max_epochs,
+        "best_val_loss": best_val_loss,
+        "test_mae_m": float(error.mean()),
+        "test_max_error_m": float(error.max()),
+        "test_accuracy": float((error.max(axis=1) <= tolerance).mean()),
+        "params": sum(v.numel() for v in best_state.values()),
+        "train_seconds": time.perf_counter() - start,
+        "state_dict": {k: v.numpy() for k, v in best_state.items()},
+        "failed": False
+    })
+
+
+def measure_latency(state_dict, repeat=200, batch_size=4096):
+    """
+    (median microseconds for one room, rooms/s at batch_size) of the eager model on one thread.
+    """
+    import torch
+    from model import load_mlp
+
+    model = load_mlp({k: torch.from_numpy(v) for k, v in state_dict.items()}).eval()
+    input_dim = model.net[0].in_features
+    threads = torch.get_num_threads()
+    torch.set_num_threads(1)
+    try:
+        with torch.no_grad():
+            one, batch = torch.zeros(1, input_dim), torch.zeros(batch_size, input_dim)
+            model(one)
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                model(one)
+                timings.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            for _ in range(10):
+                model(batch)
+            batch_seconds = (time.perf_counter() - start) / 10
+    finally:
+        torch.set_num_threads(threads)
+    return float(np.median(timings)) * 1e6, batch_size / batch_seconds
+
+
+def pareto_front(results):
+    """
+    Indices of the results that no other result beats on both test accuracy and latency.
+    """
+    front = []
+    for i, a in enumerate(results):
+        dominated = any(b["test_accuracy"] >= a["test_accuracy"] and b["latency_us"] <= a["latency_us"]
+                        and (b["test_accuracy"], b["latency_us"]) != (a["test_accuracy"], a["latency_us"])
+                        for b in results)
+        if not dominated:
+            front.append(i)
+    return front
+
+
+def _cpu_sets(n_workers):
+    cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+    threads = max(1, len(cpus) // n_workers)
+    # With more workers than CPUs, workers share CPUs round robin.
+    return [{cpus[(i * threads + k) % len(cpus)] for k in range(threads)} for i in range(n_workers)], threads
+
+
+# -------------------------------
+# Sweep
+# -------------------------------
+leaderboard_columns = ["rank", "hidden_sizes", "batch_size", "lr", "epochs", "best_epoch", "stopped_early",
+                       "best_val_loss", "test_mae_m", "test_max_error_m", "test_accuracy", "latency_us",
+                       "rows_per_s", "params", "train_seconds", "pareto", "failed"]
+
+
+def sweep(grid=None, out_dir="sweep_results", n_workers=None, max_epochs=30, patience=3, min_delta=1e-4,
+          tolerance=0.05, max_latency_us=None, seed=0, log=sys.stderr, **data_options):
+    """
+    Trains every config of grid (see default_grid) and writes the leaderboard and the winner to out_dir.
+    data_options go to load_dataset. Returns the leaderboard (a list of dicts, best first).
+    """
+    import joblib
+    import torch
+
+    todo = configs(grid, seed)
+    start = time.perf_counter()
+    shared, scaler_X, scaler_y = share_dataset(load_dataset(seed=seed, **data_options))
+    print(f"Shared {len(shared.arrays['X_train'])} training rooms ({shared.nbytes() / 1e6:.1f} MB) "
+          f"in {time.perf_counter() - start:.2f} s", file=log)
+
+    n_workers = n_workers or min(len(todo), os.cpu_count() or 1)
+    cpu_sets, threads = _cpu_sets(n_workers)
+    scale_y = (scaler_y.mean_.astype(np.float32), scaler_y.scale_.astype(np.float32))
+    options = {"max_epochs": max_epochs, "patience": patience, "min_delta": min_delta, "tolerance": tolerance}
+    results = []
+
+    def finished(result):
+        results.append(result)
+        outcome = ("no finite validation loss" if result['failed'] else
+                   f"val loss {result['best_val_loss']:.5f}, test accuracy {result['test_accuracy']:.3f}")
+        print(f"[{len(results)}/{len(todo)}] hidden={'-'.join(map(str, result['hidden_sizes']))} "
+              f"batch={result['batch_size']} lr={result['lr']:g}: {outcome} after {result['epochs']} epochs "
+              f"({result['train_seconds']:.1f} s)", file=log)
+
+    try:
+        if n_workers <= 1:
+            _init_worker(shared.specs(), scale_y, None, threads)
+            for config in todo:
+                finished(train_config(config, **options))
+        else:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor, as_completed
+
+            context = multiprocessing.get_context()
+            cpu_queue = context.SimpleQueue()
+            for cpus in cpu_sets:
+                cpu_queue.put(cpus)
+            with ProcessPoolExecutor(max_workers=n_workers, mp_context=context, initializer=_init_worker,
+                                     initargs=(shared.specs(), scale_y, cpu_queue, threads)) as pool:
+                futures = [pool.submit(train_config, config, **options) for config in todo]
+                for future in as_completed(futures):
+                    finished(future.result())
+    finally:
+        if _data is not None:
+            _data.close()
+        shared.close(unlink=True)
+
+    # Latency is measured after training, one network at a time, so the runs do not slow each other down.
+    # Failed runs have no weights to time; they rank last and never win or join the Pareto front.
+    for result in results:
+        result["latency_us"], result["rows_per_s"] = (float('nan'), float('nan')) if result["failed"] else \
+            measure_latency(result["state_dict"])
+    results.sort(key=lambda r: r["best_val_loss"])
+    trained = [r for r in results if not r["failed"]]
+    for i in pareto_front(trained):
+        trained[i]["pareto"] = True
+    for rank, result in enumerate(results, 1):
+        result["rank"] = rank
+        result.setdefault("pareto", False)
+
+    if not trained:
+        raise ValueError("no configuration reached a finite validation loss")
+    eligible = [r for r in trained if max_latency_us is None or r["latency_us"] <= max_latency_us]
+    if not eligible:
+        raise ValueError(f"no configuration runs within {max_latency_us} us per room")
+    winner = eligible[0]
+
+    os.makedirs(out_dir, exist_ok=True)
+    leaderboard = [{key: r[key] for key in leaderboard_columns} for r in results]
+    with open(os.path.join(out_dir, "leaderboard.json"), "w") as f:
+        json.dump({"winner": winner["rank"], "tolerance_m": tolerance, "leaderboard": leaderboard}, f, indent=2)
+    with open(os.path.join(out_dir, "leaderboard.csv"), "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=leaderboard_columns)
+        writer.writeheader()
+        for row in leaderboard:
+            writer.writerow(dict(row, hidden_sizes="-".join(map(str, row["hidden_sizes"]))))
+
+    # The same three files train.py writes, so helper_predict / export_models.py pick the winner up as is.
+    torch.save({k: torch.from_numpy(v) for k, v in winner["state_dict"].items()},
+               os.path.join(out_dir, "best_model.pth"))
+    joblib.dump(scaler_X, os.path.join(out_dir, "scaler_X.joblib"))
+    joblib.dump(scaler_y, os.path.join(out_dir, "scaler_y.joblib"))
+    return leaderboard
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Train MLP configurations in parallel and export the best one")
+    parser.add_argument('--hidden', nargs='+', default=None, help="hidden widths per config, e.g. 64,64 128,128,128")
+    parser.add_argument('--batch-size', nargs='+', type=int, default=None)
+    parser.add_argument('--lr', nargs='+', type=float, default=None)
+    parser.add_argument('--workers', type=int, default=None, help="parallel trainings (default: one per CPU)")
+    parser.add_argument('--max-epochs', type=int, default=30)
+    parser.add_argument('--patience', type=int, default=3, help="epochs without improvement before stopping")
+    parser.add_argument('--min-delta', type=float, default=1e-4)
+    parser.add_argument('--tolerance', type=float, default=0.05, help="metres a coordinate may be off and count")
+    parser.add_argument('--max-latency-us', type=float, default=None, help="only export a model at least this fast")
+    parser.add_argument('--samples', type=int, default=200000, help="training rooms to generate")
+    parser.add_argument('--val-samples', type=int, default=20000)
+    parser.add_argument('--test-samples', type=int, default=20000)
+    parser.add_argument('--stage1-fraction', type=float, default=0.5)
+    parser.add_argument('--shards', default=None, help="use the 80/10/10 split of a helper_shards directory instead")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='sweep_results')
+    args = parser.parse_args()
+
+    grid = {}
+    if args.hidden:
+        grid['hidden_sizes'] = [tuple(int(size) for size in spec.split(',')) for spec in args.hidden]
+    if args.batch_size:
+        grid['batch_size'] = args.batch_size
+    if args.lr:
+        grid['lr'] = args.lr
+    try:
+        leaderboard = sweep(grid, args.out, args.workers, args.max_epochs, args.patience, args.min_delta,
+                            args.tolerance, args.max_latency_us, args.seed, samples=args.samples,
+                            val_samples=args.val_samples, test_samples=args.test_samples,
+                            stage1_fraction=args.stage1_fraction, shards=args.shards)
+    except ValueError as exc:
+        sys.exit(f"error: {exc}")
+    print(f"{'rank':>4} {'hidden':>12} {'batch':>5} {'lr':>7} {'epochs':>6} {'val loss':>9} {'accuracy':>8} "
+          f"{'MAE m':>7} {'us/room':>8} {'rooms/s':>10}")
+    for row in leaderboard:
+        print(f"{row['rank']:>4} {'-'.join(map(str, row['hidden_sizes'])):>12} {row['batch_size']:>5} "
+              f"{row['lr']:>7g} {row['epochs']:>6} {row['best_val_loss']:>9.5f} {row['test_accuracy']:>8.3f} "
+              f"{row['test_mae_m']:>7.3f} {row['latency_us']:>8.1f} {row['rows_per_s']:>10,.0f}"
+              f"{'  *' if row['pareto'] else ''}{'  failed' if row['failed'] else ''}")
+    winner = next(row for row in leaderboard if not row['failed']
+                  and (args.max_latency_us is None or row['latency_us'] <= args.max_latency_us))
+    print(f"Winner (rank {winner['rank']}{' within the latency budget' if args.max_latency_us else ''}) written to "
+          f"{args.out}/best_model.pth; * = accuracy / latency Pareto front")
@@ -0,0 +1,16 @@
+import pytest
+
+import bench
+
+# pytest-benchmark entry point for the bench.py cases:
+#   python -m pytest tests/test_bench.py --benchmark-only [-k cold]
+# Plain pytest runs skip them, since the suite takes minutes.
+pytest.importorskip("pytest_benchmark")
+
+
+@pytest.mark.parametrize("name", list(bench.cases))
+def test_bench(benchmark, request, name):
+    if not request.config.getoption("benchmark_only"):
+        pytest.skip("benchmarks run with --benchmark-only")
+    setup, repeat, number = bench.cases[name]
+    benchmark.pedantic(setup(), rounds=repeat, iterations=number)
@@ -0,0 +1,69 @@
+import io
+import os
+
+import numpy as np
+import pytest
+
+import bulk
+from helper_dataset import generate_dataset, to_frame
+from helper_predict import input_features
+
+
+def _write_rooms(path, n=5):
+    frame = to_frame(generate_dataset(n, 2, seed=7))[input_features]
+    frame.insert(0, "room_id", [f"{i:04d}" for i in range(n)])
+    frame.to_csv(path, index=False)
+    return frame
+
+
+def _run(tmp_path, **kwargs):
+    kwargs.setdefault("chunk_size", 2)
+    return bulk.run(str(tmp_path / "rooms.csv"), str(tmp_path / "out"), engine='rules', log=io.StringIO(),
+                    **kwargs)
+
+
+def test_csv_extra_columns_stay_strings(tmp_path):
+    _write_rooms(tmp_path / "rooms.csv")
+    records = list(bulk.read_records(str(tmp_path / "rooms.csv")))
+    assert records[0]["room_id"] == "0000"
+    assert isinstance(records[0]["room_length"], float)
+
+    _run(tmp_path)
+    results = list(bulk.iter_results(str(tmp_path / "out")))
+    assert [r["room_id"] for r in results] == ["0000", "0001", "0002", "0003", "0004"]
+
+
+def test_resume_redoes_only_missing_chunks(tmp_path):
+    _write_rooms(tmp_path / "rooms.csv")
+    summary = _run(tmp_path)
+    assert (summary["chunks"], summary["rows"]) == (3, 5)
+    first = list(bulk.iter_results(str(tmp_path / "out")))
+
+    os.remove(tmp_path / "out" / "part-00001.jsonl")
+    summary = _run(tmp_path)
+    assert (summary["chunks"], summary["skipped_chunks"], summary["rows"]) == (1, 2, 2)
+    assert list(bulk.iter_results(str(tmp_path / "out"))) == first
+
+
+def test_checkpoint_with_other_settings_is_refused(tmp_path):
+    _write_rooms(tmp_path / "rooms.csv")
+    _run(tmp_path)
+    with pytest.raises(ValueError, match="other settings"):
+        _run(tmp_path, chunk_size=3)
+
+
+def test_room_without_layout_is_written_as_null(tmp_path, monkeypatch):
+    _write_rooms(tmp_path / "rooms.csv", n=2)
+    place = bulk.place
+
+    def place_with_failure(specs, engine='model', backend=None):
+        placements = place(specs, engine, backend)
+        placements[0] = np.nan
+        return placements
+
+    monkeypatch.setattr(bulk, "place", place_with_failure)
+    summary = _run(tmp_path, repair=True)
+    assert summary["failed"] == 1
+    failed, placed = bulk.iter_results(str(tmp_path / "out"))
+    assert failed["bed_x"] is None and "error" in failed
+    assert placed["bed_x"] is not None and "error" not in placed
@@ -0,0 +1,44 @@
+import os
+import shutil
+
+from helper_index import build_layout_index, open_layout_index
+from helper_predict import Predictor
+
+repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+artifacts = ("best_model.pth", "scaler_X.joblib", "scaler_y.joblib")
+
+
+def _predictor(tmp_path):
+    for name in artifacts:
+        shutil.copy(os.path.join(repo, name), tmp_path / name)
+    return Predictor(*(str(tmp_path / name) for name in artifacts), backend='eager')
+
+
+def test_index_goes_stale_when_the_model_changes(tmp_path):
+    predictor = _predictor(tmp_path)
+    index_dir = str(tmp_path / "layout_index")
+    build_layout_index(index_dir, predictor=predictor)
+    index = open_layout_index(index_dir)
+    assert index is not None and index.is_current()
+    assert index.lookup(6.5, 6.5, 'bottom', "1") is not None
+
+    # A retrained model lands with a new mtime.
+    model = tmp_path / "best_model.pth"
+    mtime = os.path.getmtime(model)
+    os.utime(model, (mtime + 10, mtime + 10))
+    assert not index.is_current()
+    assert index.lookup(6.5, 6.5, 'bottom', "1") is None
+    assert open_layout_index(index_dir) is None
+
+    # Rebuilding from the reloaded model makes it current again.
+    assert predictor.reload_if_changed()
+    build_layout_index(index_dir, predictor=predictor)
+    assert open_layout_index(index_dir) is not None
+
+
+def test_index_goes_stale_when_a_scaler_is_removed(tmp_path):
+    predictor = _predictor(tmp_path)
+    index_dir = str(tmp_path / "layout_index")
+    build_layout_index(index_dir, predictor=predictor)
+    os.remove(tmp_path / "scaler_y.joblib")
+    assert open_layout_index(index_dir) is None
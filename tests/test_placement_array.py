@@ -0,0 +1,54 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from helper_dataset import check_against_rules, generate_dataset, stage1_columns, stage2_columns
+from helper_placement_array import check_against_scalar, place_furniture_fixed_array, round2
+
+# Room sides at the sidebar limits (6.0, 7.0), just inside them, on rounding ties
+# (x.xx5) and well outside the range the model was trained on.
+boundary_sides = [1.0, 1.005, 2.345, 6.0, 6.005, 6.1, 6.995, 7.0, 12.0]
+
+
+def _boundary_rooms():
+    L, W, wall = (np.array(v) for v in zip(*itertools.product(boundary_sides, boundary_sides, range(4))))
+    rooms = []
+    # Door positions on, just inside and beyond both ends of the wall, and at its centre.
+    for door_pos in (np.zeros_like(L), np.full_like(L, 0.2), round2(L / 2), round2(W / 2), L - 0.2, W,
+                     np.full_like(L, -1.0), np.full_like(L, 13.0)):
+        bed_x, bed_y = place_furniture_fixed_array(L, W, 'bed', wall)
+        rooms.append((L, W, wall, door_pos, bed_x, bed_y))
+    return [np.concatenate(columns) for columns in zip(*rooms)]
+
+
+def _boundary_columns(stage):
+    L, W, door_wall = (np.array(v) for v in zip(*itertools.product(boundary_sides, boundary_sides, range(4))))
+    door_wall = door_wall.astype(np.int8)
+    if stage == 1:
+        return stage1_columns(L, W, door_wall)
+    columns = [stage2_columns(L, W, door_wall, np.full(len(L), blocks_second)) for blocks_second in (False, True)]
+    return {key: np.concatenate([c[key] for c in columns]) for key in columns[0]}
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_array_rules_match_scalar_on_random_rooms(seed):
+    mismatches = check_against_scalar(20000, seed)
+    assert not any(mismatches.values()), mismatches
+
+
+def test_array_rules_match_scalar_on_boundary_rooms():
+    mismatches = check_against_scalar(rooms=_boundary_rooms())
+    assert not any(mismatches.values()), mismatches
+
+
+@pytest.mark.parametrize("stage", [1, 2])
+def test_dataset_matches_rules_on_random_rooms(stage):
+    columns = generate_dataset(5000, stage, seed=stage)
+    assert check_against_rules(columns, n_rows=5000) == 0
+
+
+@pytest.mark.parametrize("stage", [1, 2])
+def test_dataset_matches_rules_on_boundary_rooms(stage):
+    columns = _boundary_columns(stage)
+    assert check_against_rules(columns, n_rows=len(columns['stage'])) == 0
@@ -0,0 +1,47 @@
+import numpy as np
+
+from helper_dataset import generate_dataset, room_specs, targets
+from helper_placement_array import BOTTOM
+from helper_repair import repair
+from helper_validate import LayoutArrays, furniture_names, validate
+
+table = furniture_names.index('table')
+bed = furniture_names.index('bed')
+
+
+def test_valid_layouts_are_unchanged():
+    columns = generate_dataset(5000, 2, seed=4)
+    placements = targets(columns, np.float64)
+    out, report = repair(room_specs(columns), placements)
+    assert not report.invalid_before.any()
+    assert np.array_equal(out, placements)
+    assert not report.moved_m.any()
+
+
+def test_only_failing_pieces_move():
+    columns = generate_dataset(2000, 2, seed=5)
+    specs = room_specs(columns)
+    rng = np.random.default_rng(5)
+    placements = targets(columns, np.float64) + rng.normal(0, 0.3, (len(specs), 10))
+    failing = validate(specs, placements).any
+    # One round moves each piece at most once, so nothing can be dragged in by a moved neighbour yet.
+    _, report = repair(specs, placements, max_rounds=1)
+    assert report.invalid_before.any()
+    assert not report.moved_m[~failing].any()
+
+
+def test_move_is_bounded_by_the_overlap():
+    # Push the table 0.1 m into the bed; the repair should move it back by no more than that.
+    columns = generate_dataset(2000, 2, seed=6)
+    specs = room_specs(columns)
+    placements = targets(columns, np.float64)
+    rects = LayoutArrays(specs, placements).rects
+    rows = np.nonzero(specs.door_wall == BOTTOM)[0]
+    placements[rows, 2 * table + 1] += rects[1, rows, bed] - rects[3, rows, table] + 0.1
+
+    _, report = repair(specs, placements)
+    assert report.invalid_before[rows].all()
+    assert report.valid_after.all()
+    moved = report.moved_m[rows]
+    assert (moved[:, table] <= 0.1 + 1e-9).all()
+    assert not np.delete(moved, table, axis=1).any()
@@ -0,0 +1,72 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from serve import MicroBatcher
+
+
+def _predict(X):
+    # Each output row is the sum of its input row, so results can be matched to requests.
+    return np.repeat(X.sum(axis=1, keepdims=True), 10, axis=1)
+
+
+async def _submit_all(batcher, requests):
+    batcher.start()
+    try:
+        return await asyncio.gather(*(batcher.submit(rows) for rows in requests), return_exceptions=True)
+    finally:
+        await batcher.stop()
+
+
+def test_batches_respect_max_batch_size():
+    batcher = MicroBatcher(_predict, max_batch_size=8, max_wait_ms=50)
+    requests = [np.full((n, 23), float(i)) for i, n in enumerate([3, 3, 3, 1, 5, 8, 2])]
+    results = asyncio.run(_submit_all(batcher, requests))
+
+    for i, (rows, result) in enumerate(zip(requests, results)):
+        assert result.shape == (len(rows), 10)
+        assert (result == 23.0 * i).all()
+    assert max(batcher.batch_sizes) <= 8
+    assert sum(k * v for k, v in batcher.batch_sizes.items()) == sum(len(rows) for rows in requests)
+    # Concurrent requests are coalesced rather than run one by one.
+    assert sum(batcher.batch_sizes.values()) < len(requests)
+    assert batcher.metrics()["requests"] == len(requests)
+
+
+def test_oversized_request_runs_alone():
+    batcher = MicroBatcher(_predict, max_batch_size=4, max_wait_ms=50)
+    results = asyncio.run(_submit_all(batcher, [np.ones((1, 23)), np.ones((6, 23))]))
+    assert [len(r) for r in results] == [1, 6]
+    assert batcher.batch_sizes == {1: 1, 6: 1}
+
+
+def test_errors_reach_every_request_of_the_batch():
+    def fail(X):
+        raise RuntimeError("model exploded")
+
+    batcher = MicroBatcher(fail, max_batch_size=8, max_wait_ms=50)
+    results = asyncio.run(_submit_all(batcher, [np.ones((1, 23)), np.ones((2, 23))]))
+    assert all(isinstance(r, RuntimeError) and str(r) == "model exploded" for r in results)
+
+
+def test_batcher_keeps_serving_after_an_error():
+    calls = []
+
+    def flaky(X):
+        calls.append(len(X))
+        if len(calls) == 1:
+            raise RuntimeError("first batch fails")
+        return _predict(X)
+
+    async def scenario():
+        batcher = MicroBatcher(flaky, max_batch_size=8, max_wait_ms=1)
+        batcher.start()
+        try:
+            with pytest.raises(RuntimeError):
+                await batcher.submit(np.ones((1, 23)))
+            return await batcher.submit(np.ones((2, 23)))
+        finally:
+            await batcher.stop()
+
+    assert (asyncio.run(scenario()) == 23.0).all()
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from helper_dataset import generate_dataset, room_specs, targets, to_frame
+from helper_geometry import layout_geometry
+from helper_validate import LayoutArrays, furniture_names, validate
+from test_placement_array import _boundary_columns
+
+
+@pytest.mark.parametrize("stage", [1, 2])
+def test_rule_layouts_are_valid_on_random_rooms(stage):
+    columns = generate_dataset(20000, stage, seed=stage)
+    counts = validate(room_specs(columns), targets(columns)).counts()
+    assert counts['invalid'] == 0, counts
+
+
+@pytest.mark.parametrize("stage", [1, 2])
+def test_rule_layouts_are_valid_on_boundary_rooms(stage):
+    # Rooms smaller than the furniture cannot hold a valid layout; the sidebar range starts at 6 m.
+    columns = _boundary_columns(stage)
+    keep = (columns['room_length'] >= 6.0) & (columns['room_width'] >= 6.0)
+    columns = {key: value[keep] for key, value in columns.items()}
+    counts = validate(room_specs(columns), targets(columns)).counts()
+    assert counts['invalid'] == 0, counts
+
+
+@pytest.mark.parametrize("stage", [1, 2])
+def test_rects_match_rendered_footprints(stage):
+    columns = generate_dataset(200, stage, seed=stage)
+    rects = LayoutArrays(room_specs(columns), targets(columns, np.float64)).rects
+    for i, sample in enumerate(to_frame(columns).to_dict('records')):
+        for name, (x, y, w, h) in layout_geometry(sample, stage)['furniture'].items():
+            assert np.allclose(rects[:, i, furniture_names.index(name)], [x, y, x + w, y + h])
+
+
+def _broken(name, dx=0.0, dy=0.0, to=None):
+    columns = generate_dataset(1, 2, seed=3)
+    specs = room_specs(columns)
+    placements = targets(columns, np.float64)
+    i = furniture_names.index(name)
+    if to is not None:
+        placements[0, 2 * i:2 * i + 2] = to
+    placements[0, 2 * i] += dx
+    placements[0, 2 * i + 1] += dy
+    return validate(specs, placements), specs, placements
+
+
+def test_detects_overlap():
+    columns = generate_dataset(1, 2, seed=3)
+    bed = targets(columns, np.float64)[0, :2]
+    violations, _, _ = _broken('table', to=bed)
+    assert violations.overlap[0, furniture_names.index('table')]
+    assert violations.overlap[0, furniture_names.index('bed')]
+    assert not violations.valid[0]
+
+
+def test_detects_out_of_bounds():
+    violations, _, _ = _broken('dresser', dx=-20.0)
+    assert violations.out_of_bounds[0, furniture_names.index('dresser')]
+    assert violations.outside_m[0, furniture_names.index('dresser')] > 10
+
+
+def test_detects_door():
+    columns = generate_dataset(1, 2, seed=3)
+    specs = room_specs(columns)
+    wall, pos = int(specs.door_wall[0]), float(specs.door_pos[0])
+    L, W = float(specs.room_length[0]), float(specs.room_width[0])
+    door = [(0.3, pos), (L - 0.3, pos), (pos, W - 0.3), (pos, 0.3)][wall]
+    violations, _, _ = _broken('nightstand', to=door)
+    assert violations.door[0, furniture_names.index('nightstand')]
+    assert not violations.valid[0]
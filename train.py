@@ -0,0 +1,281 @@
+import os
+import tempfile
+import time
+import joblib
+import numpy as np
+import torch
+from sklearn.preprocessing import StandardScaler
+from torch.utils.data import DataLoader, IterableDataset, get_worker_info
+from helper_dataset import generate_mixed, room_specs, targets
+from model import MLP
+
+# -------------------------------
+# Streaming training
+# -------------------------------
+# python train.py [--epochs 50] [--samples-per-epoch 200000] [--workers 2] [--out-dir train_results]
+#
+# Scriptable version of the training cell in train.ipynb. Instead of writing
+# the stage CSVs, concatenating them and reading them back, samples are
+# generated on the fly by helper_dataset (equal parts Stage 1 and Stage 2 by
+# default) and streamed through a DataLoader. Every epoch draws fresh rooms, so
+# the amount of training data is not bounded by memory or disk.
+#
+# Random streams are seeded from SeedSequence([seed, stream, epoch, chunk]),
+# which keeps the statistics, training, validation and test rooms disjoint
+# streams. An epoch holds the same rooms for any number of DataLoader workers;
+# only the order in which the workers' batches interleave changes.
+
+STATS, TRAIN, VAL, TEST = range(4)
+
+
+def sample_chunk(n, rng, stage1_fraction=0.5):
+    """
+    Generates n shuffled rooms of both stages. Returns (X, y) as float32 arrays of shape (n, 23) / (n, 10).
+    """
+    columns = generate_mixed(n, rng, stage1_fraction)
+    return room_specs(columns).encode(dtype=np.float32), targets(columns)
+
+
+def _stream_rng(seed, stream, epoch, chunk):
+    return np.random.default_rng(np.random.SeedSequence([seed, stream, epoch, chunk]))
+
+
+class SyntheticLayoutStream(IterableDataset):
+    """
+    Yields (X, y) batches of unscaled float32 tensors, generated chunk by chunk.
+    samples_per_epoch=None streams forever. With DataLoader workers, worker k
+    generates chunks k, k + num_workers, ... so no rows are duplicated.
+    Use it with DataLoader(stream, batch_size=None) since it already batches.
+    """
+
+    def __init__(self, samples_per_epoch=None, batch_size=64, chunk_size=65536, stage1_fraction=0.5, seed=0,
+                 stream=TRAIN):
+        self.samples_per_epoch = samples_per_epoch
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.stage1_fraction = stage1_fraction
+        self.seed = seed
+        self.stream = stream
+        self.epoch = 0
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    def _chunks(self):
+        worker = get_worker_info()
+        worker_id, num_workers = (worker.id, worker.num_workers) if worker is not None else (0, 1)
+        chunk = worker_id
+        while True:
+            start = chunk * self.chunk_size
+            if self.samples_per_epoch is not None and start >= self.samples_per_epoch:
+                return
+            n = self.chunk_size
+            if self.samples_per_epoch is not None:
+                n = min(n, self.samples_per_epoch - start)
+            yield sample_chunk(n, _stream_rng(self.seed, self.stream, self.epoch, chunk), self.stage1_fraction)
+            chunk += num_workers
+
+    def __iter__(self):
+        for X, y in self._chunks():
+            for start in range(0, len(X), self.batch_size):
+                yield torch.from_numpy(X[start:start + self.batch_size]), torch.from_numpy(y[start:start + self.batch_size])
+
+
+def fit_scalers(chunks):
+    """
+    Fits scaler_X / scaler_y incrementally (StandardScaler.partial_fit) over an iterable of (X, y) array chunks.
+    """
+    scaler_X = StandardScaler()
+    scaler_y = StandardScaler()
+    for X, y in chunks:
+        scaler_X.partial_fit(X)
+        scaler_y.partial_fit(y)
+    return scaler_X, scaler_y
+
+
+def stats_chunks(n_samples, seed=0, chunk_size=65536, stage1_fraction=0.5):
+    """
+    Yields n_samples generated rooms for fit_scalers, from their own random stream.
+    """
+    for chunk, start in enumerate(range(0, n_samples, chunk_size)):
+        yield sample_chunk(min(chunk_size, n_samples - start), _stream_rng(seed, STATS, 0, chunk), stage1_fraction)
+
+
+def shard_chunks(parts, chunk_size=1_000_000):
+    """
+    Yields (X, y) slices of memory-mapped shard views for fit_scalers.
+    """
+    for X, y in parts:
+        for start in range(0, len(X), chunk_size):
+            yield np.asarray(X[start:start + chunk_size]), np.asarray(y[start:start + chunk_size])
+
+
+class ShardBatches:
+    """
+    Yields (X, y) batches as zero-copy slices of shard tensors (ShardSet.split(as_tensors=True)).
+    Rows are already shuffled within a shard, so each epoch only shuffles the order of the
+    batch-sized blocks.
+    """
+
+    def __init__(self, parts, batch_size=64, seed=0):
+        self.parts = parts
+        self.batch_size = batch_size
+        self.seed = seed
+        self.epoch = 0
+        self.blocks = np.array([(p, start) for p, (X, _) in enumerate(parts) for start in range(0, len(X), batch_size)],
+                               dtype=np.int64).reshape(-1, 2)
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    def __iter__(self):
+        order = _stream_rng(self.seed, TRAIN, self.epoch, 0).permutation(len(self.blocks))
+        for p, start in self.blocks[order].tolist():
+            X, y = self.parts[p]
+            yield X[start:start + self.batch_size], y[start:start + self.batch_size]
+
+
+def fixed_split(n_samples, seed, stream, stage1_fraction=0.5):
+    """
+    A held-out set of n_samples rooms kept in memory (validation and test are small).
+    """
+    return sample_chunk(n_samples, _stream_rng(seed, stream, 0, 0), stage1_fraction)
+
+
+class _Scaling:
+    # StandardScaler statistics as float32 tensors, applied per batch.
+    def __init__(self, scaler):
+        self.mean = torch.tensor(scaler.mean_, dtype=torch.float32)
+        self.scale = torch.tensor(scaler.scale_, dtype=torch.float32)
+
+    def __call__(self, t):
+        return (t - self.mean) / self.scale
+
+
+def evaluate(model, parts, scale_X, scale_y, criterion, batch_size=8192):
+    """
+    Returns the mean loss in scaled units over a list of (X, y) arrays or tensors.
+    """
+    model.eval()
+    total = 0.0
+    rows = 0
+    with torch.no_grad():
+        for X, y in parts:
+            for start in range(0, len(X), batch_size):
+                inputs = scale_X(torch.as_tensor(X[start:start + batch_size]))
+                targets = scale_y(torch.as_tensor(y[start:start + batch_size]))
+                total += criterion(model(inputs), targets).item() * len(inputs)
+                rows += len(inputs)
+    return total / max(rows, 1)
+
+
+def save_artifacts(out_dir, state_dict, scaler_X, scaler_y):
+    """
+    Writes best_model.pth, scaler_X.joblib and scaler_y.joblib to a temporary directory inside out_dir,
+    then moves them into place, so an interrupted run never leaves a half-written file in out_dir.
+    """
+    with tempfile.TemporaryDirectory(dir=out_dir) as tmp:
+        torch.save(state_dict, os.path.join(tmp, "best_model.pth"))
+        joblib.dump(scaler_X, os.path.join(tmp, "scaler_X.joblib"))
+        joblib.dump(scaler_y, os.path.join(tmp, "scaler_y.joblib"))
+        for name in ("scaler_X.joblib", "scaler_y.joblib", "best_model.pth"):
+            os.replace(os.path.join(tmp, name), os.path.join(out_dir, name))
+
+
+def train(epochs=50, samples_per_epoch=200000, batch_size=64, lr=0.001, workers=0, stats_samples=200000,
+          val_samples=20000, test_samples=20000, stage1_fraction=0.5, chunk_size=65536, seed=0,
+          out_dir="train_results", shards=None, hidden_sizes=(64, 64)):
+    """
+    Trains the MLP and, once training ends, writes best_model.pth (lowest validation loss), scaler_X.joblib
+    and scaler_y.joblib to out_dir. Raises RuntimeError if no epoch has a finite validation loss.
+    With shards (a helper_shards directory) the model trains on its memory-mapped 80/10/10 train/val/test
+    split instead of streamed rooms, and the samples_per_epoch, stats, val and test sizes are ignored.
+    hidden_sizes are the MLP's hidden widths (e.g. a sweep.py winner).
+    Returns a dict with the loss history and the test loss of the best model.
+    """
+    torch.manual_seed(seed)
+    os.makedirs(out_dir, exist_ok=True)
+
+    start = time.perf_counter()
+    if shards is not None:
+        from helper_shards import open_shards
+
+        splits = open_shards(shards).split(as_tensors=True)
+        scaler_X, scaler_y = fit_scalers(shard_chunks(splits['train']))
+        val, test = splits['val'], splits['test']
+        train_data = stream = ShardBatches(splits['train'], batch_size, seed)
+    else:
+        scaler_X, scaler_y = fit_scalers(stats_chunks(stats_samples, seed, chunk_size, stage1_fraction))
+        val = [fixed_split(val_samples, seed, VAL, stage1_fraction)]
+        test = [fixed_split(test_samples, seed, TEST, stage1_fraction)]
+        stream = SyntheticLayoutStream(samples_per_epoch, batch_size, chunk_size, stage1_fraction, seed)
+        train_data = DataLoader(stream, batch_size=None, num_workers=workers)
+    print(f"Fitted scalers on {int(scaler_X.n_samples_seen_)} rooms in {time.perf_counter() - start:.2f} s")
+    scale_X, scale_y = _Scaling(scaler_X), _Scaling(scaler_y)
+
+    model = MLP(scaler_X.n_features_in_, scaler_y.n_features_in_, hidden_sizes)
+    criterion = torch.nn.MSELoss()
+    optimizer = torch.optim.Adam(model.parameters(), lr=lr)
+
+    best_val_loss = float('inf')
+    best_state = None
+    history = []
+    for epoch in range(epochs):
+        stream.set_epoch(epoch)
+        epoch_start = time.perf_counter()
+        model.train()
+        train_loss = 0.0
+        seen = 0
+        for inputs, targets in train_data:
+            inputs, targets = scale_X(inputs), scale_y(targets)
+            optimizer.zero_grad()
+            loss = criterion(model(inputs), targets)
+            loss.backward()
+            optimizer.step()
+            train_loss += loss.item() * len(inputs)
+            seen += len(inputs)
+        train_loss /= max(seen, 1)
+        val_loss = evaluate(model, val, scale_X, scale_y, criterion)
+        elapsed = time.perf_counter() - epoch_start
+        history.append({"epoch": epoch + 1, "train_loss": train_loss, "val_loss": val_loss, "seconds": elapsed})
+        print(f"Epoch {epoch+1}/{epochs} - Train Loss: {train_loss:.4f} - Val Loss: {val_loss:.4f} "
+              f"({seen / elapsed:,.0f} rows/s)")
+
+        if val_loss < best_val_loss:
+            best_val_loss = val_loss
+            best_state = {k: v.detach().clone() for k, v in model.state_dict().items()}
+
+    if best_state is None:
+        raise RuntimeError(f"no epoch reached a finite validation loss (did the loss go NaN?); "
+                           f"nothing written to {out_dir}")
+    model.load_state_dict(best_state)
+    save_artifacts(out_dir, best_state, scaler_X, scaler_y)
+    test_loss = evaluate(model, test, scale_X, scale_y, criterion)
+    print(f"Test Loss: {test_loss:.4f}")
+    return {"history": history, "best_val_loss": best_val_loss, "test_loss": test_loss}
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Train the placement MLP on streamed synthetic rooms")
+    parser.add_argument('--epochs', type=int, default=50)
+    parser.add_argument('--samples-per-epoch', type=int, default=200000, help="fresh rooms generated per epoch")
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--lr', type=float, default=0.001)
+    parser.add_argument('--workers', type=int, default=0, help="DataLoader worker processes generating data")
+    parser.add_argument('--stats-samples', type=int, default=200000, help="rooms used to fit the scalers")
+    parser.add_argument('--val-samples', type=int, default=20000)
+    parser.add_argument('--test-samples', type=int, default=20000)
+    parser.add_argument('--stage1-fraction', type=float, default=0.5)
+    parser.add_argument('--chunk-size', type=int, default=65536)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out-dir', default='train_results',
+                        help="where best_model.pth and the scalers are written (use . to replace the app's model)")
+    parser.add_argument('--shards', default=None, help="train on a helper_shards directory instead of streamed rooms")
+    parser.add_argument('--hidden', default='64,64', help="hidden layer widths, e.g. 128,128,128")
+    args = parser.parse_args()
+
+    train(args.epochs, args.samples_per_epoch, args.batch_size, args.lr, args.workers, args.stats_samples,
+          args.val_samples, args.test_samples, args.stage1_fraction, args.chunk_size, args.seed, args.out_dir,
+          args.shards, tuple(int(size) for size in args.hidden.split(',')))